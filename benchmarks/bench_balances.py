@@ -0,0 +1,61 @@
+from services import money
+from services.balance_engine import calculate_balances
+from timeit import default_timer
+import argparse
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+ACCOUNTS = ['Checking', 'Savings', 'Credit Card', 'Brokerage', 'Cash']
+PAYEES = ['Grocery Store', 'Landlord', 'Employer', 'Utility', 'Restaurant', 'Pharmacy', 'Airline', 'Bookstore']
+
+
+def make_transactions(rows, seed=0):
+    rng = np.random.RandomState(seed)
+    names = np.array(ACCOUNTS + PAYEES)
+    frm = names[rng.randint(0, len(names), rows)]
+    to = names[rng.randint(0, len(names), rows)]
+    amounts = np.round(rng.uniform(0.01, 2000.0, rows), 2)
+    return pd.DataFrame({'From': frm, 'To': to, 'Amount': amounts.astype(str)})
+
+
+def iterrows_balances(balances, transactions):
+    balances = dict(balances)
+    for index, trans in transactions.iterrows():
+        if trans['From'] in balances.keys():
+            balances[trans['From']] -= float(trans['Amount'])
+        if trans['To'] in balances.keys():
+            balances[trans['To']] += float(trans['Amount'])
+    return balances
+
+
+def time_call(function, *args):
+    start = default_timer()
+    result = function(*args)
+    return default_timer() - start, result
+
+
+def run(sizes):
+    starting_balances = {account: 1000.0 for account in ACCOUNTS}
+    print('%10s %14s %14s %10s %8s' % ('rows', 'iterrows (s)', 'grouped (s)', 'speedup', 'equal'))
+    for rows in sizes:
+        transactions = make_transactions(rows)
+        loop_time, loop_result = time_call(iterrows_balances, starting_balances, transactions)
+        # The engine works in cents, as the ledger holds amounts once they are read.
+        in_cents = transactions.assign(Amount=money.to_cents(transactions['Amount']))
+        starting_cents = {account: int(balance * money.CENTS) for account, balance in starting_balances.items()}
+        engine_time, engine_result = time_call(calculate_balances, starting_cents, in_cents)
+        equal = all(round(loop_result[account], 2) == engine_result[account] / money.CENTS for account in ACCOUNTS)
+        print('%10d %14.3f %14.3f %9.1fx %8s' % (rows, loop_time, engine_time, loop_time / engine_time, equal))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the iterrows balance loop with the grouped balance engine.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    args = parser.parse_args()
+    run(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
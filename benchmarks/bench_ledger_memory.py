@@ -0,0 +1,47 @@
+from benchmarks.bench_balances import DEFAULT_SIZES, make_transactions
+from services import ledger_dtypes, money
+import argparse
+import numpy as np
+import pandas as pd
+
+
+MEMOS = ['Rent', 'Groceries', 'Paycheck', 'Coffee', 'Transfer', 'Electric bill', 'Dinner', 'Books']
+CATEGORIES = ['Food', 'Housing', 'Salary', 'Transfer', 'Utilities', 'Travel']
+
+
+def make_ledger(rows, seed=0):
+    # A ledger as it used to be held: a Python string per name, a date object per row and float dollars.
+    rng = np.random.RandomState(seed)
+    transactions = make_transactions(rows, seed)
+    days = rng.randint(0, 3650, rows)
+    transactions.insert(0, 'Date', (pd.Timestamp('2010-01-01') + pd.to_timedelta(days, unit='D')).date)
+    transactions.insert(3, 'Memo', np.array(MEMOS, dtype=object)[rng.randint(0, len(MEMOS), rows)])
+    transactions['Category1'] = np.array(CATEGORIES, dtype=object)[rng.randint(0, len(CATEGORIES), rows)]
+    transactions['Amount'] = transactions['Amount'].astype(float)
+    for col in ['From', 'To']:
+        transactions[col] = transactions[col].astype(object)
+    return transactions
+
+
+def megabytes(transactions):
+    return transactions.memory_usage(deep=True, index=False).sum() / 2 ** 20
+
+
+def run(sizes):
+    print('%10s %14s %14s %10s' % ('rows', 'objects (MB)', 'compact (MB)', 'ratio'))
+    for rows in sizes:
+        ledger = make_ledger(rows)
+        compact = ledger_dtypes.compact(ledger.assign(Amount=money.to_cents(ledger['Amount'])))
+        before, after = megabytes(ledger), megabytes(compact)
+        print('%10d %14.1f %14.1f %9.1fx' % (rows, before, after, before / after))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the memory held by an object ledger and a compact one.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    args = parser.parse_args()
+    run(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+from benchmarks.bench_reporting_queue import make_category_tree
+from services.report_scheduler import run_reports, yearly_jobs
+from timeit import default_timer
+import argparse
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+
+
+DEFAULT_WORKERS = [1, 2, 4, 8]
+ACCOUNTS = ['Checking', 'Savings', 'Credit Card', 'Brokerage']
+
+
+def make_ledger(leaves, years, seed=0):
+    # A category tree spread over `years` years, paid out of and into a handful of accounts.
+    rng = np.random.RandomState(seed)
+    transactions = make_category_tree(leaves, seed=seed)
+    days = rng.randint(0, 365 * years, len(transactions))
+    transactions.insert(0, 'Date', (pd.Timestamp('2000-01-01') + pd.to_timedelta(days, unit='D')).date)
+    income = rng.uniform(size=len(transactions)) < 0.2
+    accounts = np.array(ACCOUNTS)[rng.randint(0, len(ACCOUNTS), len(transactions))]
+    transactions.insert(1, 'From', np.where(income, transactions['To'], accounts))
+    transactions['To'] = np.where(income, accounts, transactions['To'])
+    return transactions
+
+
+def run(worker_counts, leaves, years):
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('./reports')
+    transactions = make_ledger(leaves, years)
+    jobs = yearly_jobs(transactions, ACCOUNTS)
+    print('%d rows, %d reports on %d cores' % (len(transactions), len(jobs), os.cpu_count()))
+    print('%10s %12s %10s' % ('workers', 'reports (s)', 'speed-up'))
+    baseline = None
+    for workers in worker_counts:
+        start = default_timer()
+        run_reports(transactions, ACCOUNTS, jobs, workers=workers, quiet=True)
+        elapsed = default_timer() - start
+        baseline = baseline or elapsed
+        print('%10d %12.3f %10.2f' % (workers, elapsed, baseline / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time yearly and per-account reports over a pool of workers.')
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS)
+    parser.add_argument('--leaves', type=int, default=5000)
+    parser.add_argument('--years', type=int, default=10)
+    args = parser.parse_args()
+    run(args.workers, args.leaves, args.years)
+
+
+if __name__ == '__main__':
+    main()
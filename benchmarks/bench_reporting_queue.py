@@ -0,0 +1,51 @@
+from services.reporting_queue import ReportingQueue
+from timeit import default_timer
+import argparse
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+
+
+DEFAULT_LEAVES = [1000, 5000, 20000]
+DEPTH = 3
+ROWS_PER_LEAF = 5
+PAYEES = ['Grocery Store', 'Landlord', 'Utility', 'Restaurant', 'Pharmacy', 'Airline', 'Bookstore']
+
+
+def make_category_tree(leaves, depth=DEPTH, rows_per_leaf=ROWS_PER_LEAF, seed=0):
+    rng = np.random.RandomState(seed)
+    fan_out = int(np.ceil(leaves ** (1.0 / depth)))
+    leaf_ids = np.repeat(np.arange(leaves), rows_per_leaf)
+    rng.shuffle(leaf_ids)
+    data = {
+        'To': np.array(PAYEES)[rng.randint(0, len(PAYEES), len(leaf_ids))],
+        'Amount': rng.randint(1, 50000, len(leaf_ids)),
+    }
+    for level in range(1, depth + 1):
+        digit = (leaf_ids // fan_out ** (depth - level)) % fan_out
+        data['Category%s' % level] = np.char.add('C%s_' % level, digit.astype(str))
+    return pd.DataFrame(data)
+
+
+def run(leaf_counts):
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('./reports')
+    print('%10s %10s %12s %14s' % ('leaves', 'rows', 'report (s)', 'per leaf (ms)'))
+    for leaves in leaf_counts:
+        transactions = make_category_tree(leaves)
+        start = default_timer()
+        ReportingQueue(transactions, 'Expense').run_report()
+        elapsed = default_timer() - start
+        print('%10d %10d %12.3f %14.3f' % (leaves, len(transactions), elapsed, elapsed / leaves * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time ReportingQueue.run_report on wide category trees.')
+    parser.add_argument('--leaves', type=int, nargs='+', default=DEFAULT_LEAVES)
+    args = parser.parse_args()
+    run(args.leaves)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+from benchmarks.bench_balances import ACCOUNTS, make_transactions
+from timeit import default_timer
+import argparse
+import numpy as np
+import os
+import pandas as pd
+import subprocess
+import sys
+import tempfile
+
+
+BUDGET_MS = 150
+DEFAULT_ROWS = 1000000
+FINANCE_MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'finance_main.py')
+
+
+def make_records(rows):
+    # A working directory holding a ledger of `rows` transactions, as finance_main.py expects to find it.
+    directory = tempfile.mkdtemp()
+    os.makedirs(os.path.join(directory, 'balances'))
+    os.makedirs(os.path.join(directory, 'transactions'))
+    pd.DataFrame({'Account': ACCOUNTS, 'Starting Balance': 1000.0}).to_csv(
+        os.path.join(directory, 'balances', 'initial_balances.csv'), index=False)
+    transactions = make_transactions(rows)
+    days = np.random.RandomState(0).randint(0, 3650, rows)
+    transactions.insert(0, 'Date', (pd.Timestamp('2010-01-01') + pd.to_timedelta(days, unit='D')).date)
+    transactions.insert(3, 'Memo', 'Memo')
+    transactions.to_csv(os.path.join(directory, 'transactions', 'transactions.csv'), index=False)
+    return directory
+
+
+def time_to_prompt(directory):
+    # Seconds from launching a fresh interpreter until the action prompt has been written.
+    start = default_timer()
+    process = subprocess.Popen([sys.executable, FINANCE_MAIN], cwd=directory, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, universal_newlines=True)
+    line = process.stdout.readline()
+    elapsed = default_timer() - start
+    assert line.startswith('Available actions'), line
+    process.communicate('quit\n')
+    return elapsed
+
+
+def run(rows, repeats):
+    directory = make_records(rows)
+    time_to_prompt(directory)
+    timings = sorted(time_to_prompt(directory) for _ in range(repeats))
+    median = timings[len(timings) // 2] * 1000
+    print('%d-row ledger: median %.1f ms, best %.1f ms to the first prompt (budget %d ms): %s' %
+          (rows, median, timings[0] * 1000, BUDGET_MS, 'ok' if median <= BUDGET_MS else 'OVER BUDGET'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time a cold start of finance_main.py to its first prompt.')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    parser.add_argument('--repeats', type=int, default=9)
+    args = parser.parse_args()
+    run(args.rows, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+from benchmarks.bench_startup import make_records
+from services.financial_records import FinancialRecords
+from services.streaming import DEFAULT_CHUNKSIZE
+from timeit import default_timer
+import argparse
+import os
+import tracemalloc
+
+
+DEFAULT_SIZES = [100000, 1000000]
+
+
+def recalculate(chunksize):
+    # Seconds and peak traced megabytes to recalculate the balances, and the balances themselves.
+    tracemalloc.start()
+    start = default_timer()
+    balances = FinancialRecords(chunksize=chunksize)._recalculate_transactions(quiet=True)
+    elapsed = default_timer() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, peak, balances
+
+
+def run(sizes, chunksize):
+    print('%10s %14s %14s %14s %14s %8s' % ('rows', 'memory (s)', 'memory (MB)', 'streamed (s)', 'streamed (MB)',
+                                            'equal'))
+    cwd = os.getcwd()
+    for rows in sizes:
+        os.chdir(make_records(rows))
+        try:
+            memory_time, memory_peak, expected = recalculate(None)
+            stream_time, stream_peak, actual = recalculate(chunksize)
+        finally:
+            os.chdir(cwd)
+        print('%10d %14.2f %14.1f %14.2f %14.1f %8s' % (rows, memory_time, memory_peak, stream_time, stream_peak,
+                                                        expected.equals(actual)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare recalculating balances in memory and streamed in chunks.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+    run(args.sizes, args.chunksize)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+from benchmarks.synthetic_ledger import LedgerShape, write_records
+from services import recurring, write_behind
+from services.financial_records import FinancialRecords
+from services.reporting_queue import ReportingQueue
+from services.transactions import Transaction
+from timeit import default_timer
+import argparse
+import json
+import os
+import pandas as pd
+import shutil
+import tempfile
+import tracemalloc
+
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+STAGED = 100
+LOOKUPS = 1000
+SEARCHES = 20
+
+
+# Each target is set up on a fresh copy of the synthetic records and returns the operation to measure.
+#  Balances are measured from a cold start, as the first action of a session; the others start from a
+#  session that has already read the ledger.
+def calculate_balances(shape):
+    records = FinancialRecords()
+    return lambda: records._calculate_balances(quiet=True)
+
+
+def recalculate_transactions(shape):
+    records = FinancialRecords()
+    return lambda: records._recalculate_transactions(quiet=True)
+
+
+def run_report(shape):
+    records = FinancialRecords()
+    expenses = records._expense_transactions(records._sorted_transactions())
+    return lambda: ReportingQueue(expenses, 'Expense').run_report()
+
+
+def report_after_append(shape):
+    # The whole-ledger reports run again after one more transaction, with the earlier run in the report cache.
+    records = FinancialRecords()
+    records._run_report(quiet=True)
+    records._CACHE.append(records._TRANSACTIONS.iloc[[-1]].drop(columns=['ID']))
+    return lambda: records._run_report(quiet=True)
+
+
+def search(shape):
+    # A one-off search, as the search command makes: the first search of a column in a session, of Memo and
+    #  of Amount.
+    records = FinancialRecords()
+    records._TRANSACTIONS
+    return lambda: (records._find_transactions('Memo', 'Memo 12'), records._find_transactions('Amount', '29.81'))
+
+
+def repeated_search(shape):
+    # The Memo searches of a long edit session, building the index, and saving its tree, on the way; every
+    #  run starts from a copy of the records without a saved tree.
+    records = FinancialRecords()
+    records._TRANSACTIONS
+    return lambda: [records._find_transactions('Memo', 'Memo %s' % number) for number in range(SEARCHES)]
+
+
+def edit_transaction(shape):
+    # An edit once the transaction has been found: its row voided, the new row appended and the balances moved.
+    #  The first edit of a ledger written without IDs rewrites it once to add them, so it is made beforehand.
+    records = FinancialRecords()
+    records._calculate_balances(quiet=True)
+    replacement = records._TRANSACTIONS.iloc[[0]].drop(columns=['ID']).assign(Amount=1)
+    records._void_transaction(1, replacement)
+    return lambda: records._void_transaction(0, replacement)
+
+
+def balance_on(shape):
+    # Point-in-time balances from the balance history, one lookup per tracked account and date.
+    records = FinancialRecords()
+    history = records._CACHE.balance_history(records._ACCOUNTS)
+    dates = pd.date_range('2000-01-01', periods=LOOKUPS // len(records._ACCOUNTS), freq='7D')
+    return lambda: [history.balance(account, date) for date in dates for account in records._ACCOUNTS]
+
+
+def add_recurring(shape):
+    # A year of weekly occurrences of one memorized transaction per payee, validated once each and recorded.
+    records = FinancialRecords()
+    records._calculate_balances(quiet=True)
+    for number, payee in enumerate(shape.PAYEES):
+        recurring.add_template({'Name': payee, 'Schedule': 'weekly', 'Start': '01/%02d/2021' % (number % 28 + 1),
+                                'From': shape.ACCOUNTS[0], 'To': payee, 'Memo': 'Memo %s' % number, 'Amount': '12.34'})
+    return lambda: records._add_recurring_transactions('01/01/2021', '12/31/2021')
+
+
+def infer_name(shape):
+    # The check each name entered for a new transaction goes through, with names already in the ledger.
+    records = FinancialRecords()
+    transaction = Transaction(records._ACCOUNTS, ledger_cache=records._CACHE)
+    transaction.VOCABULARY
+    names = [('To', shape.PAYEES[number % len(shape.PAYEES)]) for number in range(LOOKUPS)]
+    return lambda: [transaction._infer_name(name, col) for col, name in names]
+
+
+TARGETS = {
+    'calculate_balances': calculate_balances,
+    'recalculate_transactions': recalculate_transactions,
+    'run_report': run_report,
+    'report_after_append': report_after_append,
+    'search': search,
+    'repeated_search': repeated_search,
+    'edit_transaction': edit_transaction,
+    'balance_on': balance_on,
+    'add_recurring': add_recurring,
+    'infer_name': infer_name,
+}
+
+
+def measure(target, records, shape, trace_memory):
+    # Seconds for the operation, or with `trace_memory`, the peak megabytes it allocated.  Memory is traced
+    #  on a separate run, as tracing slows everything down.
+    directory = tempfile.mkdtemp()
+    shutil.copytree(records, directory, dirs_exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        operation = TARGETS[target](shape)
+        if trace_memory:
+            tracemalloc.start()
+        start = default_timer()
+        operation()
+        elapsed = default_timer() - start
+        if trace_memory:
+            elapsed = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        return elapsed
+    finally:
+        write_behind.flush()
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+
+def run(sizes, targets, shape, repeats, baseline=None, save=None):
+    baseline = baseline if baseline is not None else dict()
+    results = dict((target, dict()) for target in targets)
+    print('%-26s %10s %10s %10s %10s %10s' % ('target', 'rows', 'seconds', 'peak MB', 'time vs', 'memory vs'))
+    for rows in sizes:
+        records = write_records(tempfile.mkdtemp(), rows, staged=STAGED, shape=shape)
+        try:
+            for target in targets:
+                seconds = min(measure(target, records, shape, False) for _ in range(repeats))
+                peak = measure(target, records, shape, True)
+                results[target][str(rows)] = {'seconds': seconds, 'peak_mb': peak}
+                before = baseline.get(target, dict()).get(str(rows))
+                print('%-26s %10d %10.3f %10.1f %10s %10s' % (
+                    target, rows, seconds, peak, _ratio(seconds, before, 'seconds'), _ratio(peak, before, 'peak_mb')))
+        finally:
+            shutil.rmtree(records)
+    if save is not None:
+        with open(save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return results
+
+
+def _ratio(value, before, key):
+    # Against the baseline run: below 1.00x is faster or smaller.
+    if before is None or not before[key]:
+        return '-'
+    return '%.2fx' % (value / before[key])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the main operations, and their peak memory, on synthetic '
+                                                 'ledgers of each size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS.keys()), default=list(TARGETS.keys()))
+    parser.add_argument('--repeats', type=int, default=3, help='the best of this many timings is reported')
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--payees', type=int, default=50)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fan-out', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write the results to this JSON file, to compare later runs against')
+    parser.add_argument('--baseline', help='a JSON file written by --save to compare against')
+    args = parser.parse_args()
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    run(args.sizes, args.targets, LedgerShape(args.accounts, args.payees, args.depth, args.fan_out, args.seed),
+        args.repeats, baseline=baseline, save=args.save)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+from services.ledger_store import CsvLedgerStore
+from services.staging import StagingJournal
+import argparse
+import numpy as np
+import os
+import pandas as pd
+
+
+ACCOUNTS = ['Checking', 'Savings', 'Credit Card', 'Brokerage', 'Cash']
+EMPLOYERS = ['Employer', 'Side Job']
+START = '2000-01-01'
+YEARS = 20
+MEMOS = 200
+# Rows are generated, and written, this many at a time.  Each batch has its own seed, so any batch can be
+#  generated on its own and a ledger is the same for the same seed and length however it is written.
+BATCH_ROWS = 1000000
+# Shares of income (employer to account) and transfers (account to account); the rest are expenses.
+INCOME = 0.1
+TRANSFERS = 0.1
+
+
+class LedgerShape:
+    # Sizes of the synthetic ledger: tracked accounts, payees, and a category tree `depth` levels deep with
+    #  `fan_out` sub-categories under each category.  Rows stop at a random depth of the tree, so reports
+    #  have payees at every level.
+    def __init__(self, accounts=len(ACCOUNTS), payees=50, depth=3, fan_out=4, seed=0):
+        self.ACCOUNTS = ACCOUNTS[:accounts] + ['Account %s' % number for number in range(len(ACCOUNTS), accounts)]
+        self.PAYEES = ['Payee %s' % number for number in range(payees)]
+        self.DEPTH = depth
+        self.FAN_OUT = fan_out
+        self.SEED = seed
+
+    def transactions(self, start, stop, total):
+        # Rows `start` up to `stop` of a `total`-row ledger, in cents, dated evenly over YEARS years from START
+        #  in ledger order.
+        return pd.concat([self._batch(batch, total).iloc[max(start - batch * BATCH_ROWS, 0):
+                                                         stop - batch * BATCH_ROWS]
+                          for batch in range(start // BATCH_ROWS, (stop - 1) // BATCH_ROWS + 1)],
+                         ignore_index=True)
+
+    def _batch(self, batch, total):
+        rng = np.random.RandomState([self.SEED, batch])
+        positions = np.arange(batch * BATCH_ROWS, min((batch + 1) * BATCH_ROWS, max(total, 1)))
+        rows = len(positions)
+        days = (positions * (YEARS * 365.25) / max(total, 1)).astype(np.int64)
+        accounts = np.array(self.ACCOUNTS)
+        kind = rng.uniform(size=rows)
+        income, transfer = kind < INCOME, (kind >= INCOME) & (kind < INCOME + TRANSFERS)
+        account = accounts[rng.randint(0, len(accounts), rows)]
+        frm = np.where(income, np.array(EMPLOYERS)[rng.randint(0, len(EMPLOYERS), rows)], account)
+        to = np.where(transfer, accounts[rng.randint(0, len(accounts), rows)],
+                      np.array(self.PAYEES)[rng.randint(0, len(self.PAYEES), rows)])
+        to = np.where(income, account, to)
+        transactions = pd.DataFrame({
+            'Date': pd.Timestamp(START) + pd.to_timedelta(days, unit='D'),
+            'From': frm,
+            'To': to,
+            'Memo': np.char.add('Memo ', rng.randint(0, MEMOS, rows).astype(str)),
+            'Amount': np.round(rng.lognormal(8, 1.5, rows)).astype(np.int64) + 1,
+        })
+        leaf = rng.randint(0, self.FAN_OUT ** self.DEPTH, rows)
+        depth = rng.randint(1, self.DEPTH + 1, rows)
+        for level in range(1, self.DEPTH + 1):
+            digit = (leaf // self.FAN_OUT ** (self.DEPTH - level)) % self.FAN_OUT
+            names = np.char.add('C%s_' % level, digit.astype(str)).astype(object)
+            transactions['Category%s' % level] = np.where(depth >= level, names, None)
+        return transactions
+
+
+def write_records(directory, rows, staged=0, shape=None):
+    # Writes initial_balances.csv and transactions.csv under `directory`, as finance_main.py expects to find
+    #  them, and `staged` further transactions to the unreconciled journal, dated after the ledger.
+    shape = shape if shape is not None else LedgerShape()
+    for path in ['balances', 'reports', os.path.join('transactions', 'unreconciled')]:
+        os.makedirs(os.path.join(directory, path), exist_ok=True)
+    pd.DataFrame({'Account': shape.ACCOUNTS, 'Starting Balance': 1000.0}).to_csv(
+        os.path.join(directory, 'balances', 'initial_balances.csv'), index=False)
+    ledger = CsvLedgerStore(os.path.join(directory, 'transactions', 'transactions.csv'))
+    for start in range(0, rows, BATCH_ROWS):
+        ledger.append(shape.transactions(start, min(start + BATCH_ROWS, rows), rows + staged))
+    if staged:
+        StagingJournal(os.path.join(directory, 'transactions', 'unreconciled')).stage(
+            _staged(shape.transactions(rows, rows + staged, rows + staged)))
+    return directory
+
+
+def _staged(transactions):
+    # As Transaction saves them: text fields, a MM/DD/YYYY date, dollars, and only the categories entered.
+    transactions = transactions.assign(Date=transactions['Date'].dt.strftime('%m/%d/%Y'),
+                                       Amount=(transactions['Amount'] / 100).astype(str))
+    return [dict((key, value) for key, value in row.items() if pd.notnull(value))
+            for row in transactions.to_dict('records')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a reproducible synthetic ledger to a directory.')
+    parser.add_argument('directory')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--staged', type=int, default=0, help='transactions to leave unreconciled')
+    parser.add_argument('--accounts', type=int, default=len(ACCOUNTS))
+    parser.add_argument('--payees', type=int, default=50)
+    parser.add_argument('--depth', type=int, default=3, help='levels of categories')
+    parser.add_argument('--fan-out', type=int, default=4, help='sub-categories under each category')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_records(args.directory, args.rows, staged=args.staged,
+                  shape=LedgerShape(args.accounts, args.payees, args.depth, args.fan_out, args.seed))
+
+
+if __name__ == '__main__':
+    main()
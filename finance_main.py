@@ -1,9 +1,123 @@
-from services.financial_records import FinancialRecords
+from services import headless, instrumentation
+from services.financial_records import FinancialRecords, SEARCH_LIMIT
+from services.monthly_cube import PERIOD_MONTHS
+from services.recurring import SCHEDULES
+from services.timing import PhaseTimer
+from services.lazy_imports import lazy_import
+import argparse
+import sys
+
+pd = lazy_import('pandas')
+
+
+CHUNKSIZE_HELP = 'read the ledger this many rows at a time instead of loading all of it'
 
 
 def main():
-    fr = FinancialRecords()
-    fr.interact_with_user()
+    args = parse_args()
+    if args.trace is not None:
+        instrumentation.start(args.trace, profile=args.profile)
+    try:
+        run(args)
+    finally:
+        instrumentation.stop()
+
+
+def run(args):
+    if args.command is None:
+        fr = FinancialRecords()
+        fr.interact_with_user()
+        return
+
+    timer = PhaseTimer()
+    try:
+        run_command(args, timer)
+    except headless.InputError as error:
+        sys.exit('error: %s' % error)
+    if args.timings:
+        print(timer.summary(), file=sys.stderr)
+
+
+def run_command(args, timer):
+    if args.command == 'balance':
+        print(headless.balance(as_of=args.as_of, timer=timer).to_string(index=False))
+    elif args.command == 'recalculate':
+        print(headless.recalculate(chunksize=args.chunksize, timer=timer).to_string(index=False))
+    elif args.command == 'report':
+        for path in headless.report(period=args.period, as_of=args.as_of, yearly=args.yearly,
+                                    workers=args.workers, chunksize=args.chunksize, timer=timer):
+            print(path)
+    elif args.command == 'import':
+        headless.import_statement(args.path, account=args.account, allow_refunds=args.allow_refunds, timer=timer)
+    elif args.command == 'search':
+        rows = headless.search(args.column, args.value, limit=args.limit, timer=timer)
+        print(rows.fillna('').to_string(index=False))
+    elif args.command == 'statement':
+        print(headless.statement(args.account, start=args.start, end=args.end, timer=timer))
+    elif args.command == 'delete':
+        print(headless.delete(args.id, timer=timer).to_string(index=False))
+    elif args.command == 'memorize':
+        headless.memorize(args.id, args.name, args.schedule, timer=timer)
+    elif args.command == 'recurring':
+        headless.recurring(start=args.start, end=args.end, stage=args.stage, timer=timer)
+
+
+def parse_date(text):
+    # Dates are checked while the arguments are parsed, so a mistyped one is reported as a usage error.
+    try:
+        return pd.Timestamp(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid date %s" % text)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Track personal finances.  Run without a command to be '
+                                                 'prompted for actions.')
+    parser.add_argument('--timings', action='store_true', help='print the time taken by each phase to stderr')
+    parser.add_argument('--trace', metavar='PATH', help='append a JSON line per timed span to PATH')
+    parser.add_argument('--profile', choices=instrumentation.PROFILES,
+                        help='with --trace, also profile the run with cProfile (written to PATH.prof) or record '
+                             'the peak memory of each span with tracemalloc')
+    commands = parser.add_subparsers(dest='command')
+    balance = commands.add_parser('balance', help='reconcile new transactions and print current balances')
+    balance.add_argument('--as-of', type=parse_date, help='print the balances at the end of this date instead')
+    recalculate = commands.add_parser('recalculate',
+                                      help='recalculate current balances from the initial balances')
+    recalculate.add_argument('--chunksize', type=int, help=CHUNKSIZE_HELP)
+    report = commands.add_parser('report', help='run income and expense reports')
+    report.add_argument('--period', choices=list(PERIOD_MONTHS.keys()))
+    report.add_argument('--as-of', type=parse_date, help='a date in the period to report on (default today)')
+    report.add_argument('--yearly', action='store_true', help='report on every year and account')
+    report.add_argument('--workers', type=int, help='number of processes to run reports in (default all cores)')
+    report.add_argument('--chunksize', type=int, help=CHUNKSIZE_HELP)
+    import_parser = commands.add_parser('import', help='import transactions from a CSV or OFX statement')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--account', help='the account a statement with a Payee column is for')
+    import_parser.add_argument('--allow-refunds', action='store_true')
+    search = commands.add_parser('search', help='find transactions close to a value in a column')
+    search.add_argument('column')
+    search.add_argument('value')
+    search.add_argument('--limit', type=int, default=SEARCH_LIMIT,
+                        help='the most matches to show (default %(default)s)')
+    statement = commands.add_parser('statement', help="write an account's transactions with its running balance")
+    statement.add_argument('account')
+    statement.add_argument('--start', type=parse_date, help='the first date to list (default the first transaction)')
+    statement.add_argument('--end', type=parse_date, help='the last date to list (default the latest transaction)')
+    delete = commands.add_parser('delete', help='delete a transaction, by the ID search shows for it')
+    delete.add_argument('id', type=int)
+    memorize = commands.add_parser('memorize', help='memorize a transaction, by its ID, to repeat on a schedule')
+    memorize.add_argument('id', type=int)
+    memorize.add_argument('name')
+    memorize.add_argument('schedule', choices=list(SCHEDULES.keys()))
+    recurring = commands.add_parser('recurring', help='record the memorized transactions falling between two dates')
+    recurring.add_argument('--start', type=parse_date, help='the first date to record (default today)')
+    recurring.add_argument('--end', type=parse_date, help='the last date to record (default today)')
+    recurring.add_argument('--stage', action='store_true',
+                           help='stage them, to be reconciled with the next balance, instead of recording them')
+    args = parser.parse_args()
+    if args.profile is not None and args.trace is None:
+        parser.error('--profile needs --trace')
+    return args
 
 
 if __name__ == "__main__":
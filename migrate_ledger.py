@@ -0,0 +1,35 @@
+from services.ledger_store import COLUMNAR_LEDGER_PATH, TRANSACTIONS_CSV_PATH, ColumnarLedgerStore, \
+    CsvLedgerStore, add_id_columns, migrate
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a CSV ledger into the columnar ledger format.')
+    parser.add_argument('--source', default=TRANSACTIONS_CSV_PATH)
+    parser.add_argument('--destination', default=COLUMNAR_LEDGER_PATH)
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--add-ids', action='store_true',
+                        help='instead, add the ID and Void columns to the CSV ledger at --source in place, so '
+                             'that no later edit or deletion has to rewrite it')
+    args = parser.parse_args()
+
+    if args.add_ids:
+        if not os.path.exists(args.source):
+            raise SystemExit('%s does not exist' % args.source)
+        rows = add_id_columns(CsvLedgerStore(args.source))
+        print('%s already has IDs' % args.source if rows is None else 'Added IDs to %s transactions' % rows)
+        return
+
+    destination = ColumnarLedgerStore(args.destination)
+    if destination.exists():
+        raise SystemExit('%s already contains a columnar ledger' % args.destination)
+    if not os.path.exists(args.source):
+        raise SystemExit('%s does not exist' % args.source)
+    rows = migrate(CsvLedgerStore(args.source), destination, chunksize=args.chunksize)
+    print('Migrated %s transactions to %s.  %s is no longer updated once the columnar ledger exists.' %
+          (rows, args.destination, args.source))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from services.transaction_ids import VOID, voids
+
+
+def calculate_balances(balances, transactions):
+    # Applies every transaction in one pass: money leaving an account is the grouped sum of Amount over
+    #  From, money arriving is the grouped sum over To.  Names that aren't tracked accounts are ignored.
+    #  Balances and amounts are both in cents, so the sums are exact.
+    new_balances = dict(balances)
+    if transactions.empty:
+        return new_balances
+    debits, credits = account_flows(transactions)
+    for account in new_balances.keys():
+        new_balances[account] += int(credits.get(account, 0)) - int(debits.get(account, 0))
+    return new_balances
+
+
+def account_flows(transactions):
+    amounts = transactions['Amount']
+    if VOID in transactions.columns:
+        # A void row takes back the amount of the row it cancels.
+        amounts = amounts.where(~voids(transactions), -amounts)
+    debits = amounts.groupby(transactions['From'], sort=False, observed=True).sum()
+    credits = amounts.groupby(transactions['To'], sort=False, observed=True).sum()
+    return debits, credits
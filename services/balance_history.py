@@ -0,0 +1,76 @@
+from services.lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+class BalanceHistory:
+    # For each tracked account, the ledger positions of the transactions moving money in or out of it in date
+    #  order (ledger order within a day), their days, and the running sum of the money they moved, in cents.
+    #  The balance on a day is then a binary search for the last transaction on or before it, and a statement
+    #  is the running sums read in order.  Sums start from zero; the caller adds the starting balance.
+    def __init__(self, accounts, transactions=None):
+        self._ACCOUNTS = frozenset(accounts)
+        self._DAYS = dict()
+        self._POSITIONS = dict()
+        self._TOTALS = dict()
+        if transactions is not None:
+            self.add(transactions)
+
+    def accounts(self):
+        return self._ACCOUNTS
+
+    def __len__(self):
+        return sum(len(days) for days in self._DAYS.values())
+
+    def add(self, transactions):
+        # `transactions` are indexed by ledger position, and usually dated on or after everything already
+        #  added, so they go on the end; earlier dates are merged in and the sums after them redone.
+        if transactions.empty:
+            return
+        days = pd.to_datetime(transactions['Date']).values.astype('datetime64[D]')
+        positions = transactions.index.values.astype(np.int64)
+        amounts = transactions['Amount'].values.astype(np.int64)
+        for col, sign in [('From', -1), ('To', 1)]:
+            names = np.asarray(transactions[col].astype(object))
+            for account in self._ACCOUNTS.intersection(pd.unique(names[pd.notnull(names)])):
+                mine = names == account
+                self._add_flows(account, days[mine], positions[mine], sign * amounts[mine])
+
+    def _add_flows(self, account, days, positions, amounts):
+        order = np.lexsort((positions, days))
+        days, positions, amounts = days[order], positions[order], amounts[order]
+        if account not in self._DAYS:
+            self._DAYS[account], self._POSITIONS[account] = days, positions
+            self._TOTALS[account] = np.cumsum(amounts)
+            return
+        old_days, old_positions, old_totals = self._DAYS[account], self._POSITIONS[account], self._TOTALS[account]
+        if (days[0], positions[0]) > (old_days[-1], old_positions[-1]):
+            self._DAYS[account] = np.concatenate([old_days, days])
+            self._POSITIONS[account] = np.concatenate([old_positions, positions])
+            self._TOTALS[account] = np.concatenate([old_totals, old_totals[-1] + np.cumsum(amounts)])
+            return
+        old_amounts = np.diff(old_totals, prepend=0)
+        days, positions = np.concatenate([old_days, days]), np.concatenate([old_positions, positions])
+        order = np.lexsort((positions, days))
+        self._DAYS[account], self._POSITIONS[account] = days[order], positions[order]
+        self._TOTALS[account] = np.cumsum(np.concatenate([old_amounts, amounts])[order])
+
+    def balance(self, account, date):
+        # Money moved into `account` by the end of `date`, less money moved out.
+        if account not in self._DAYS:
+            return 0
+        found = np.searchsorted(self._DAYS[account], np.datetime64(pd.Timestamp(date), 'D'), side='right')
+        return int(self._TOTALS[account][found - 1]) if found else 0
+
+    def statement(self, account, start=None, end=None):
+        # The ledger positions of `account`'s transactions from `start` to `end`, inclusive, in date order,
+        #  with the running sum after each and the sum before the first.
+        if account not in self._DAYS:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), 0
+        days, totals = self._DAYS[account], self._TOTALS[account]
+        first = 0 if start is None else np.searchsorted(days, np.datetime64(pd.Timestamp(start), 'D'))
+        last = len(days) if end is None else np.searchsorted(days, np.datetime64(pd.Timestamp(end), 'D'),
+                                                             side='right')
+        opening = int(totals[first - 1]) if first else 0
+        return self._POSITIONS[account][first:last], totals[first:last], opening
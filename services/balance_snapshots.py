@@ -0,0 +1,27 @@
+from services import write_behind
+from services.lazy_imports import lazy_import
+import os
+
+pd = lazy_import('pandas')
+
+
+BALANCE_SNAPSHOT_CSV_PATH = './balances/balance_snapshot.csv'
+HIGH_WATER_MARK = 'High Water Mark'
+
+
+# A snapshot records the balances together with the number of ledger rows ("high-water mark") that were
+#  applied to produce them.  The ledger is append-only between snapshots, so any rows past the mark are
+#  the only ones that still have to be applied.
+def read_snapshot():
+    write_behind.flush(BALANCE_SNAPSHOT_CSV_PATH)
+    if not os.path.exists(BALANCE_SNAPSHOT_CSV_PATH):
+        return None, 0
+    snapshot = pd.read_csv(BALANCE_SNAPSHOT_CSV_PATH)
+    high_water_mark = int(snapshot[HIGH_WATER_MARK].max()) if not snapshot.empty else 0
+    return snapshot[['Account', 'Starting Balance']], high_water_mark
+
+
+def write_snapshot(balances_csv, high_water_mark):
+    snapshot = balances_csv[['Account', 'Starting Balance']].copy()
+    snapshot[HIGH_WATER_MARK] = high_water_mark
+    write_behind.write(BALANCE_SNAPSHOT_CSV_PATH, lambda f: snapshot.to_csv(f, index=False))
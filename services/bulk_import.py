@@ -0,0 +1,191 @@
+from services import money
+from services.transactions import Transaction
+from services.lazy_imports import lazy_import
+import editdistance
+import re
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+CHUNKSIZE = 10000
+OFX_EXTENSIONS = ('.ofx', '.qfx')
+OFX_FIELD = re.compile(r'<([A-Z0-9.]+)>([^<\r\n]*)')
+
+
+class StatementError(ValueError):
+    # A statement that can't be read as transactions at all, as opposed to lines that are rejected.
+    pass
+
+
+def import_statement(path, accounts, vocabulary, account=None, allow_refunds=False, duplicates=None,
+                     ledger_ids=None, chunksize=CHUNKSIZE):
+    # Returns the accepted transactions, ready for the ledger, and the rejected statement lines with a
+    #  Reason column.  Nothing is written; the caller appends the accepted rows in one go.  With a
+    #  DuplicateIndex of the ledger, lines that were already recorded are rejected too, naming the
+    #  transaction by its ID in `ledger_ids`, the ledger's ID column, or else by its position.
+    accepted = list()
+    rejected = list()
+    for chunk in read_statement(path, account=account, chunksize=chunksize):
+        good, bad = validate_transactions(chunk, accounts, vocabulary, allow_refunds=allow_refunds,
+                                          duplicates=duplicates, ledger_ids=ledger_ids)
+        accepted.append(good)
+        rejected.append(bad)
+    if not accepted:
+        return pd.DataFrame(), pd.DataFrame()
+    return pd.concat(accepted, sort=False, ignore_index=True), pd.concat(rejected, sort=False, ignore_index=True)
+
+
+def read_statement(path, account=None, chunksize=CHUNKSIZE):
+    # Statements are either ledger-shaped (From and To columns, positive amounts) or bank-shaped (a Payee
+    #  column and signed amounts, relative to `account`).  OFX files are always bank-shaped.
+    if path.lower().endswith(OFX_EXTENSIONS):
+        chunks = _read_ofx(path, chunksize)
+    else:
+        chunks = pd.read_csv(path, chunksize=chunksize, dtype=str)
+    line = 1
+    try:
+        for chunk in chunks:
+            chunk = _to_ledger_columns(chunk.reset_index(drop=True), account)
+            chunk['Line'] = range(line, line + len(chunk))
+            line += len(chunk)
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def _read_ofx(path, chunksize):
+    rows = list()
+    buffer = ''
+    with open(path) as f:
+        for block in iter(lambda: f.read(65536), ''):
+            buffer += block
+            start = buffer.find('<STMTTRN>')
+            end = buffer.find('</STMTTRN>', start)
+            while start >= 0 and end >= 0:
+                rows.append(_ofx_transaction(buffer[start + len('<STMTTRN>'):end]))
+                buffer = buffer[end + len('</STMTTRN>'):]
+                if len(rows) == chunksize:
+                    yield pd.DataFrame(rows)
+                    rows = list()
+                start = buffer.find('<STMTTRN>')
+                end = buffer.find('</STMTTRN>', start)
+            # Keep only what might be the start of a transaction split across blocks.
+            buffer = buffer[start:] if start >= 0 else buffer[-len('<STMTTRN>'):]
+    if rows:
+        yield pd.DataFrame(rows)
+
+
+def _ofx_transaction(text):
+    fields = dict((tag, value.strip()) for tag, value in OFX_FIELD.findall(text))
+    posted = fields.get('DTPOSTED', '')
+    return {
+        'Date': '%s/%s/%s' % (posted[4:6], posted[6:8], posted[:4]) if len(posted) >= 8 else posted,
+        'Payee': fields.get('NAME', fields.get('PAYEE', '')),
+        'Memo': fields.get('MEMO', fields.get('NAME', '')),
+        'Amount': fields.get('TRNAMT', ''),
+    }
+
+
+def _to_ledger_columns(chunk, account):
+    if 'From' in chunk.columns and 'To' in chunk.columns:
+        return chunk
+    if 'Payee' not in chunk.columns:
+        raise StatementError("Statement needs either From and To columns or a Payee column")
+    if account is None:
+        raise StatementError("An account is needed to import a statement with a Payee column")
+    chunk = chunk.copy()
+    amounts = pd.to_numeric(chunk['Amount'], errors='coerce')
+    outflow = amounts < 0
+    chunk['From'] = chunk['Payee'].where(~outflow, account)
+    chunk['To'] = chunk['Payee'].where(outflow, account)
+    chunk['Amount'] = amounts.abs().where(amounts.notnull(), chunk['Amount'])
+    if 'Memo' not in chunk.columns:
+        chunk['Memo'] = chunk['Payee']
+    del chunk['Payee']
+    return chunk
+
+
+def parse_dates(dates):
+    # Column-wise version of Transaction._validate_date; unparseable dates come back as NaT.
+    dates = dates.astype(str).str.replace('-', '/').str.replace('_', '/')
+    parsed = pd.Series(pd.NaT, index=dates.index)
+    for date_format in Transaction.DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(dates, format=date_format, errors='coerce'))
+    return parsed
+
+
+def validate_transactions(chunk, accounts, vocabulary, allow_refunds=False, duplicates=None, ledger_ids=None):
+    # Applies the rules of Transaction's _validate_* steps to whole columns.  Each rejected line keeps the
+    #  first rule it broke as its Reason.
+    chunk = chunk.copy()
+    reasons = pd.Series('', index=chunk.index)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == '')] = reason
+
+    dates = parse_dates(chunk['Date'])
+    reject(dates.isnull(), 'invalid date')
+    amounts = pd.to_numeric(chunk['Amount'], errors='coerce')
+    reject(amounts.isnull(), 'invalid amount')
+    amounts = pd.Series(money.to_cents(amounts), index=chunk.index)
+    reject(amounts == 0, 'zero amount')
+    if not allow_refunds:
+        reject(amounts < 0, 'negative amount needs to be confirmed as a refund')
+
+    for col in ['From', 'To']:
+        chunk[col] = _map_names(chunk[col], col, accounts, vocabulary)
+        reject(chunk[col].fillna('') == '', 'missing %s' % col)
+        reject(_looks_like_an_account(chunk[col], col, accounts, vocabulary), '%s looks like an account' % col)
+    reject(chunk['From'] == chunk['To'], 'From and To are the same')
+    reject(~chunk['From'].isin(accounts) & ~chunk['To'].isin(accounts), 'neither From nor To is an account')
+    if 'Memo' not in chunk.columns:
+        chunk['Memo'] = ''
+    reject(chunk['Memo'].fillna('') == '', 'missing memo')
+
+    categories = [col for col in chunk.columns if col.startswith('Category')]
+    for col in categories:
+        chunk[col] = _map_names(chunk[col], col, accounts, vocabulary)
+
+    valid = reasons == ''
+    if duplicates is not None and valid.any():
+        keys = chunk.loc[valid, ['From', 'To', 'Memo']].assign(Date=dates[valid], Amount=amounts[valid])
+        positions = duplicates.find(keys)
+        positions = positions[positions >= 0]
+        ids = positions.values if ledger_ids is None else np.asarray(ledger_ids)[positions.values]
+        reasons[positions.index] = ['likely duplicate of transaction %s' % transaction_id for transaction_id in ids]
+        valid = reasons == ''
+    accepted = chunk.loc[valid, ['From', 'To', 'Memo'] + categories]
+    accepted.insert(0, 'Date', dates[valid])
+    accepted.insert(4, 'Amount', amounts[valid])
+    rejected = chunk[~valid].copy()
+    rejected['Reason'] = reasons[~valid]
+    return accepted, rejected
+
+
+def _map_names(names, col, accounts, vocabulary):
+    # Each distinct name is resolved once: exact accounts and known values are kept, and a name that only
+    #  differs in case from an account or a known value takes that spelling.
+    accounts_by_case = dict((account.lower(), account) for account in accounts)
+    mapping = dict()
+    for name in names.dropna().unique():
+        if name in accounts or vocabulary.contains(col, name):
+            continue
+        if name.lower() in accounts_by_case:
+            mapping[name] = accounts_by_case[name.lower()]
+        elif vocabulary.case_variants(col, name):
+            mapping[name] = vocabulary.case_variants(col, name)[0]
+    return names.replace(mapping) if mapping else names
+
+
+def _looks_like_an_account(names, col, accounts, vocabulary):
+    # The interactive "Did you mean" account check can't be answered here, so a new name that looks like an
+    #  account is rejected instead of being guessed at.
+    suspicious = list()
+    for name in names.dropna().unique():
+        if name in accounts or vocabulary.contains(col, name):
+            continue
+        if any(Transaction._similar_to_an_account(name, account, editdistance.eval(name, account))
+               for account in accounts):
+            suspicious.append(name)
+    return names.isin(suspicious)
@@ -0,0 +1,87 @@
+from services.ledger_dtypes import text_values
+from services.lazy_imports import lazy_import
+from collections import defaultdict
+import editdistance
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+KEY_COLUMNS = ['Date', 'From', 'To', 'Amount']
+
+
+class DuplicateIndex:
+    # Hashes ledger rows by their (Date, From, To, Amount in cents) so an incoming transaction only has to be
+    #  compared against the rows sharing that key.  Among those, a row is a likely duplicate when its memo
+    #  is also close; a bank rarely repeats a day, payee and amount with a different description.  Rows are
+    #  only hashed once a transaction on their day is looked up, so a lookup costs in proportion to the new
+    #  transactions and the ledger rows on their days, not to the whole ledger.
+    def __init__(self, transactions=None):
+        self._ROWS = defaultdict(list)
+        self._LENGTH = 0
+        # Days whose rows are hashed, and (first position, days, rows) of the rows added, to be hashed once
+        #  their days are looked up.
+        self._INDEXED_DAYS = set()
+        self._ADDED = list()
+        if transactions is not None:
+            self.add(transactions)
+
+    def __len__(self):
+        return self._LENGTH
+
+    def add(self, transactions):
+        days = self._days(transactions)
+        self._ADDED.append((self._LENGTH, days, transactions))
+        self._LENGTH += len(transactions)
+        if self._INDEXED_DAYS:
+            self._index(self._LENGTH - len(transactions), days, transactions, self._INDEXED_DAYS)
+
+    def find(self, transactions):
+        # Returns, for each transaction, the position of the first ledger row it likely duplicates, or -1.
+        days = self._days(transactions)
+        new_days = set(days.tolist()) - self._INDEXED_DAYS
+        if new_days:
+            for first, added_days, added in self._ADDED:
+                self._index(first, added_days, added, new_days)
+            self._INDEXED_DAYS |= new_days
+        duplicates = list()
+        for key, memo in zip(self._keys(transactions, days), self._memos(transactions)):
+            duplicate = -1
+            for position, ledger_memo in self._ROWS.get(key, list()):
+                if self._similar_memos(memo, ledger_memo):
+                    duplicate = position
+                    break
+            duplicates.append(duplicate)
+        return pd.Series(duplicates, index=transactions.index, dtype=np.int64)
+
+    def _index(self, first, days, transactions, wanted):
+        # Hashes the rows of `transactions`, added at position `first`, that fall on the `wanted` days.
+        rows = np.flatnonzero(np.isin(days, np.fromiter(wanted, dtype=np.int64, count=len(wanted))))
+        if not len(rows):
+            return
+        transactions = transactions.iloc[rows]
+        memos = self._memos(transactions)
+        for position, key, memo in zip((rows + first).tolist(), self._keys(transactions, days[rows]), memos):
+            self._ROWS[key].append((position, memo))
+
+    @staticmethod
+    def _days(transactions):
+        if transactions.empty:
+            return np.zeros(0, dtype=np.int64)
+        # Dates arrive as strings, dates or timestamps, so they are normalized to days.
+        return pd.to_datetime(transactions['Date']).values.astype('datetime64[D]').astype(np.int64)
+
+    @staticmethod
+    def _keys(transactions, days):
+        cents = transactions['Amount'].values.astype(np.int64)
+        return zip(days.tolist(), transactions['From'].tolist(), transactions['To'].tolist(), cents.tolist())
+
+    @staticmethod
+    def _memos(transactions):
+        if 'Memo' not in transactions.columns:
+            return [''] * len(transactions)
+        return [memo.lower() for memo in text_values(transactions['Memo'])]
+
+    @staticmethod
+    def _similar_memos(memo, other):
+        return editdistance.eval(memo, other) <= max(len(memo), len(other)) // 4
@@ -1,11 +1,21 @@
-from services import set_up_directories
+from services import balance_snapshots, bulk_import, instrumentation, ledger_dtypes, ledger_store, money, \
+    monthly_cube, recurring, report_cache, set_up_directories, streaming, transaction_ids, write_behind
+from services.balance_engine import calculate_balances
+from services.ledger_cache import LedgerCache
+from services.report_scheduler import ReportJob, REPORT_TYPES, report_mask, run_reports, yearly_jobs
 from services.transactions import Transaction
 from services.reporting_queue import ReportingQueue
+from services.staging import StagingJournal
+from services.lazy_imports import lazy_import
 from collections import namedtuple
+import csv
+from datetime import datetime
 import editdistance
-import pandas as pd
+import math
 import os
-import json
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
 
 Action = namedtuple("Action", ['function', 'description'])
@@ -13,58 +23,111 @@ Action = namedtuple("Action", ['function', 'description'])
 
 CURRENT_BALANCES_CSV_PATH = './balances/current_balances.csv'
 INITIAL_BALANCES_CSV_PATH = './balances/initial_balances.csv'
-TRANSACTIONS_CSV_PATH = './transactions/transactions.csv'
+SEARCH_INDEX_PATH = './transactions/search_index'
+# How many of the closest matches a search offers.
+SEARCH_LIMIT = 10
 
 
 class FinancialRecords:
-    def __init__(self):
+    def __init__(self, ledger=None, report_workers=None, chunksize=None):
+        # `report_workers` is the number of processes reports are run in; None uses every core.  With a
+        #  `chunksize`, recalculation and the whole-ledger and yearly reports read the ledger that many rows at
+        #  a time instead of loading all of it.
         set_up_directories.set_up_directories()
-        self._set_balances(self._read_balances())
+        self._LEDGER = ledger if ledger is not None else ledger_store.open_ledger()
+        self._REPORT_WORKERS = report_workers
+        self._CHUNKSIZE = chunksize
+        self._CACHE = LedgerCache(self._LEDGER, prepare=self._set_transaction_columns,
+                                  search_index_path=SEARCH_INDEX_PATH)
+        self._STAGING = StagingJournal()
+        self._SEARCHED_COLUMNS = set()
+        self._ACCOUNT_BALANCES = None
         self._ACCOUNTS = self._get_accounts()
-        self._ACTIONS = self._set_up_actions()
-        self._TRANSACTIONS = self._read_transactions()
 
-    @staticmethod
-    def _get_accounts():
-        df = pd.read_csv(INITIAL_BALANCES_CSV_PATH)
-        return list(set(df['Account'].tolist()))
+    @classmethod
+    def _get_accounts(cls):
+        # Read with the csv module so the first prompt doesn't wait for pandas to import.
+        write_behind.flush(INITIAL_BALANCES_CSV_PATH)
+        if not os.path.exists(INITIAL_BALANCES_CSV_PATH):
+            cls._set_blank_balances_csv()
+        with open(INITIAL_BALANCES_CSV_PATH, newline='') as f:
+            return list(set(row['Account'] for row in csv.DictReader(f)))
+
+    @property
+    def _TRANSACTIONS(self):
+        return self._CACHE.transactions()
+
+    @property
+    def _BALANCES(self):
+        self._load_balances()
+        return self._ACCOUNT_BALANCES
+
+    @_BALANCES.setter
+    def _BALANCES(self, balances):
+        self._ACCOUNT_BALANCES = balances
+
+    def _load_balances(self):
+        # Balances are read, and caught up with the ledger, the first time an action needs them.  That must
+        #  happen before anything is appended to the ledger, or the new rows would be counted twice.
+        if self._ACCOUNT_BALANCES is None:
+            self._set_balances(self._read_balances())
+
+    def _set_balances(self, balances_csv, high_water_mark=None):
+        if high_water_mark is None:
+            high_water_mark = self._CACHE.rows()
+        # Written in the background; the balances in memory are the ones in use.
+        write_behind.write(CURRENT_BALANCES_CSV_PATH, lambda f: balances_csv.to_csv(f, index=False))
+        balance_snapshots.write_snapshot(balances_csv, high_water_mark)
+        self._BALANCES = dict(zip(balances_csv['Account'], money.to_cents(balances_csv['Starting Balance']).tolist()))
 
     @staticmethod
-    def _read_transactions():
-        if os.path.exists(TRANSACTIONS_CSV_PATH):
-            return pd.read_csv(TRANSACTIONS_CSV_PATH)
-        return pd.DataFrame()
-
-    def _set_balances(self, balances_csv):
-        balances_csv.to_csv(CURRENT_BALANCES_CSV_PATH, index=False)
-        balances_dict = dict()
-        for index, row in balances_csv.iterrows():
-            balances_dict[row['Account']] = float(row['Starting Balance'])
-        self._BALANCES = balances_dict
+    def _set_blank_balances_csv():
+        header = ['Account', 'Starting Balance']
+        write_behind.write_atomically(INITIAL_BALANCES_CSV_PATH,
+                                      lambda f: csv.writer(f, lineterminator='\n').writerow(header))
 
     @staticmethod
-    def _set_blank_balances_csv():
-        balances_csv = pd.DataFrame()
-        balances_csv['Account'] = []
-        balances_csv['Starting Balance'] = []
-        balances_csv.to_csv(INITIAL_BALANCES_CSV_PATH, index=False)
+    def _read_balances_csv(path):
+        write_behind.flush(path)
+        return pd.read_csv(path)
 
     def _read_balances(self):
+        snapshot, high_water_mark = balance_snapshots.read_snapshot()
+        if snapshot is not None:
+            return self._apply_transactions_since(snapshot, high_water_mark)
+        write_behind.flush(CURRENT_BALANCES_CSV_PATH)
         if os.path.exists(CURRENT_BALANCES_CSV_PATH):
-            return pd.read_csv(CURRENT_BALANCES_CSV_PATH)
+            return self._read_balances_csv(CURRENT_BALANCES_CSV_PATH)
         if os.path.exists(INITIAL_BALANCES_CSV_PATH):
-            return pd.read_csv(INITIAL_BALANCES_CSV_PATH)
+            return self._read_balances_csv(INITIAL_BALANCES_CSV_PATH)
         self._set_blank_balances_csv()
         return self._read_balances()
 
+    def _apply_transactions_since(self, balances_csv, high_water_mark):
+        if high_water_mark >= self._CACHE.rows():
+            return balances_csv
+        balances = dict(zip(balances_csv['Account'], money.to_cents(balances_csv['Starting Balance']).tolist()))
+        balances = calculate_balances(balances, self._CACHE.rows_since(high_water_mark))
+        return self._balances_frame(balances)
+
+    @staticmethod
+    def _balances_frame(balances):
+        return pd.DataFrame({'Account': list(balances.keys()),
+                             'Starting Balance': money.to_dollars(list(balances.values()))})
+
     def interact_with_user(self):
+        # The actions and prompt are only needed interactively, so they aren't built for headless use.
+        self._ACTIONS = self._set_up_actions()
         action = 'initial'
         prompt = self._create_prompt()
 
         while action != 'quit':
             if action in self._ACTIONS.keys():
-                self._ACTIONS[action].function()
+                with instrumentation.span('action.%s' % action):
+                    self._ACTIONS[action].function()
             action = input(prompt).lower()
+        # Anything still being written in the background is on disk before the session ends.
+        write_behind.flush()
 
     def _set_up_actions(self):
         # Must be function to use _add_new_transaction as object
@@ -76,12 +139,26 @@ class FinancialRecords:
             'quit': Action(function='', description='Quit script'),
             'report': Action(function=self._run_report,
                              description='Run expense report'),
+            'period': Action(function=self._run_period_report,
+                             description='Run monthly, quarterly or year-to-date reports'),
+            'yearly': Action(function=self._run_yearly_reports,
+                             description='Run reports for every year, and every account within each year'),
             'edit': Action(function=self._search_for_transaction,
                            description='Edit transaction'),
             'recalculate': Action(function=self._recalculate_transactions,
                                   description='Recalculate current balances'),
+            'history': Action(function=self._show_balances_on,
+                              description='Show balances at the end of a past date'),
+            'statement': Action(function=self._run_statement,
+                                description="Write an account's statement with its running balance"),
             'account': Action(function=self._add_account,
-                              description="Add a new account")
+                              description="Add a new account"),
+            'import': Action(function=self._import_transactions,
+                             description="Import transactions from a CSV or OFX statement"),
+            'memorize': Action(function=self._memorize_transaction,
+                               description="Memorize a transaction to repeat on a schedule"),
+            'recurring': Action(function=self._add_recurring_transactions,
+                                description="Record memorized transactions falling between two dates")
         }
         return actions
 
@@ -93,41 +170,65 @@ class FinancialRecords:
         return prompt
 
     def _add_new_transaction(self):
-        transaction = Transaction(self._ACCOUNTS)
+        transaction = Transaction(self._ACCOUNTS, ledger_cache=self._CACHE, staging=self._STAGING)
         return transaction.create_new_transaction()
 
     def _update_list_of_transactions(self):
+        # The ledger is kept in reconciliation order so new transactions can be appended to the end of it
+        #  instead of rewriting it.
+        self._load_balances()
         new_transactions = self._get_new_transactions()
-        self._TRANSACTIONS = pd.concat([self._TRANSACTIONS, new_transactions], sort=False)
-        self._set_transaction_columns()
-        self._TRANSACTIONS.to_csv('./transactions/transactions.csv', index=False)
+        if new_transactions.empty:
+            return new_transactions
+        new_transactions = self._set_transaction_columns(new_transactions)
+        self._flag_duplicates(new_transactions)
+        self._CACHE.append(new_transactions, counted=True)
+        return new_transactions
+
+    def _flag_duplicates(self, new_transactions):
+        # Likely duplicates are still recorded, since two identical purchases on one day do happen, but are
+        #  pointed out, by the IDs they will have and that they have, so they can be removed with "edit".
+        duplicates = self._CACHE.duplicate_index().find(new_transactions)
+        ids = self._TRANSACTIONS[transaction_ids.ID].values
+        for transaction_id, duplicate in enumerate(duplicates.tolist(), self._CACHE.next_id()):
+            if duplicate >= 0:
+                print("Transaction %s looks like a duplicate of transaction %s:" % (transaction_id, ids[duplicate]))
+                print(ledger_dtypes.for_display(self._TRANSACTIONS.iloc[[duplicate]]).to_string(index=False,
+                                                                                                header=False))
+        return duplicates
+
+    def _get_new_transactions(self):
+        return self._staged_frame(self._STAGING.begin_reconciliation())
 
     @staticmethod
-    def _get_new_transactions():
-        unreconciled_transactions = os.listdir('./transactions/unreconciled')
-        new_transactions = list()
-        for trans in unreconciled_transactions:
-            with open(os.path.join('./transactions/unreconciled', trans)) as f:
-                trans = json.load(f)
-            new_transactions.append(trans)
-        new_transactions = pd.DataFrame(new_transactions)
+    def _staged_frame(transactions):
+        # Transactions as they are staged, with amounts in dollars, as a frame with amounts in cents.
+        new_transactions = pd.DataFrame(transactions)
+        if not new_transactions.empty:
+            new_transactions['Amount'] = money.to_cents(new_transactions['Amount'])
         return new_transactions
 
-    @staticmethod
-    def _clear_unreconciled_transactions():
-        unreconciled_transactions = os.listdir('./transactions/unreconciled')
-        for trans in unreconciled_transactions:
-            os.remove(os.path.join('./transactions/unreconciled', trans))
+    def _clear_unreconciled_transactions(self):
+        self._STAGING.end_reconciliation()
 
-    def _set_transaction_columns(self):
-        df = self._TRANSACTIONS
+    def _set_transaction_columns(self, df):
         columns = df.columns
         categories = self._get_list_of_categories(columns)
-        columns = ['Date', 'From', 'To', 'Memo', 'Amount'] + categories
-        df = df[columns]
-        df['Date'] = pd.to_datetime(df['Date']).dt.date
-        df.sort_values(['Date', 'From', 'To', 'Amount'], ascending=False, inplace=True)
-        self._TRANSACTIONS = df
+        ids = [col for col in [transaction_ids.ID] if col in columns]
+        voids = [col for col in [transaction_ids.VOID] if col in columns]
+        columns = ids + ['Date', 'From', 'To', 'Memo', 'Amount'] + categories + voids
+        return ledger_dtypes.compact(df[columns].copy())
+
+    def _report_transactions(self):
+        # What the whole-ledger and yearly reports are run over: the ledger in report order, or when
+        #  streaming, its summary, which gives the same reports.
+        if self._CHUNKSIZE is not None:
+            return streaming.report_summary(self._LEDGER, self._CHUNKSIZE)
+        return self._sorted_transactions()
+
+    def _sorted_transactions(self):
+        return self._TRANSACTIONS.sort_values(['Date', 'From', 'To', 'Amount'], ascending=False,
+                                              key=ledger_dtypes.lexical_order)
 
     @staticmethod
     def _get_list_of_categories(columns):
@@ -137,50 +238,163 @@ class FinancialRecords:
         categories = ['Category%s' % str(cat) for cat in categories]
         return categories
 
-    def _recalculate_transactions(self):
-        self._set_balances(pd.read_csv(INITIAL_BALANCES_CSV_PATH))
-        self._calculate_balances(full=True)
+    def _recalculate_transactions(self, quiet=False):
+        if self._CHUNKSIZE is not None:
+            return self._stream_balances(quiet=quiet)
+        self._set_balances(self._read_balances_csv(INITIAL_BALANCES_CSV_PATH), high_water_mark=0)
+        return self._calculate_balances(full=True, quiet=quiet)
+
+    def _initial_balances(self):
+        initial = self._read_balances_csv(INITIAL_BALANCES_CSV_PATH)
+        return dict(zip(initial['Account'], money.to_cents(initial['Starting Balance']).tolist()))
+
+    def _stream_balances(self, quiet=False):
+        # The balances are recalculated from scratch over the ledger, and then staged transactions are
+        #  appended straight to it, without the duplicate check, which needs the whole ledger in memory.  They
+        #  take their IDs from the rows counted.
+        balances = self._initial_balances()
+        balances, rows = streaming.stream_balances(self._LEDGER, balances, self._CHUNKSIZE)
+        new_transactions = self._get_new_transactions()
+        if not new_transactions.empty:
+            new_transactions = transaction_ids.number(self._set_transaction_columns(new_transactions), rows, rows)
+            self._LEDGER.append(new_transactions)
+            balances = calculate_balances(balances, new_transactions)
+            rows += len(new_transactions)
+        self._clear_unreconciled_transactions()
+        return self._show_balances(balances, high_water_mark=rows, quiet=quiet)
 
     def _calculate_balances(self, full=False, quiet=False):
-        self._update_list_of_transactions()
-        if not full:
-            new_transactions = self._get_new_transactions()
-        else:
-            new_transactions = self._TRANSACTIONS.copy()
+        new_transactions = self._update_list_of_transactions()
+        if full:
+            new_transactions = self._TRANSACTIONS
         self._clear_unreconciled_transactions()
-        for index, trans in new_transactions.iterrows():
-            if trans['From'] in self._BALANCES.keys():
-                self._BALANCES[trans['From']] -= float(trans['Amount'])
-            if trans['To'] in self._BALANCES.keys():
-                self._BALANCES[trans['To']] += float(trans['Amount'])
-        balances = list()
-        for key in self._ACCOUNTS:
-            balances.append(round(float(self._BALANCES[key]), 2))
-        balances = pd.DataFrame([self._ACCOUNTS, balances]).transpose()
-        balances.columns = ['Account', 'Starting Balance']
-        self._set_balances(balances)
+        with instrumentation.span('balances.apply', rows=len(new_transactions)):
+            self._BALANCES = calculate_balances(self._BALANCES, new_transactions)
+        return self._show_balances(self._BALANCES, quiet=quiet)
+
+    def _show_balances(self, balances, high_water_mark=None, quiet=False):
+        # Saves the tracked accounts' balances, in cents, and prints them unless `quiet`.
+        balances_csv = self._balances_frame(dict((key, balances[key]) for key in self._ACCOUNTS))
+        self._set_balances(balances_csv, high_water_mark=high_water_mark)
         if not quiet:
-            print(balances)
-            print("Net worth: ", balances['Starting Balance'].sum())
-
-    def _run_report(self):
-        self._TRANSACTIONS['Amount'] = self._TRANSACTIONS['Amount'].apply(float)
-        self._run_income_report()
-        self._run_expense_report()
-
-    def _run_income_report(self):
-        df = self._TRANSACTIONS.copy()
-        df = df[df['To'].isin(self._ACCOUNTS)]
-        df = df[~df['From'].isin(self._ACCOUNTS)]
-        report = ReportingQueue(df, 'Income')
-        report.run_report()
-
-    def _run_expense_report(self):
-        df = self._TRANSACTIONS.copy()
-        df = df[df['From'].isin(self._ACCOUNTS)]
-        df = df[~df['To'].isin(self._ACCOUNTS)]
-        report = ReportingQueue(df, 'Expense')
-        report.run_report()
+            print(balances_csv)
+            print("Net worth: ", sum(balances[key] for key in self._ACCOUNTS) / money.CENTS)
+        return balances_csv
+
+    def _run_report(self, quiet=False):
+        jobs = [ReportJob(category, None, None, None, None) for category in REPORT_TYPES]
+        transactions = self._report_transactions()
+        return run_reports(transactions, self._ACCOUNTS, jobs, workers=self._REPORT_WORKERS, quiet=quiet,
+                           row_hashes=self._report_row_hashes(transactions))
+
+    def _run_yearly_reports(self, quiet=False):
+        transactions = self._report_transactions()
+        return run_reports(transactions, self._ACCOUNTS, yearly_jobs(transactions, self._ACCOUNTS),
+                           workers=self._REPORT_WORKERS, quiet=quiet,
+                           row_hashes=self._report_row_hashes(transactions))
+
+    def _report_row_hashes(self, transactions):
+        # The cache keeps the ledger's row hashes up to date as it is appended to; a streamed summary is
+        #  hashed when the reports are run.
+        if self._CHUNKSIZE is not None:
+            return None
+        return self._CACHE.row_hashes().reindex(transactions.index).values
+
+    def _income_transactions(self, transactions):
+        return transactions[report_mask(transactions, 'Income', self._ACCOUNTS)]
+
+    def _expense_transactions(self, transactions):
+        return transactions[report_mask(transactions, 'Expense', self._ACCOUNTS)]
+
+    def _run_period_report(self, period=None, as_of=None):
+        # Reports on one month, quarter or year to date from the monthly cube, along with a comparison to
+        #  the period before it.
+        while period not in monthly_cube.PERIOD_MONTHS:
+            period = input("Enter period to report on (%s): " % ', '.join(monthly_cube.PERIOD_MONTHS)).lower()
+        while as_of is None:
+            response = input("Enter a date in the period (MM/DD/YYYY, leave blank for today): ")
+            as_of = bulk_import.parse_dates(pd.Series([response])).iloc[0] if response else datetime.today()
+            as_of = None if pd.isnull(as_of) else as_of
+        self._calculate_balances(quiet=True)
+        reports = list()
+        for date in [as_of, monthly_cube.previous_period(period, as_of)]:
+            start, end, label = monthly_cube.period_months(period, date)
+            cells = self._CACHE.monthly_cube().cells(start, end)
+            income, expense = self._income_transactions(cells), self._expense_transactions(cells)
+            reports.append([ReportingQueue(income, 'Income', period=label, row_hashes=report_cache.row_hashes(income)),
+                            ReportingQueue(expense, 'Expense', period=label,
+                                           row_hashes=report_cache.row_hashes(expense))])
+        paths = list()
+        for current, previous in zip(*reports):
+            paths.append(current.run_report())
+            current.run_comparison(previous)
+        return paths
+
+    def _show_balances_on(self, date=None, quiet=False):
+        # Each tracked account's balance at the end of `date`: its initial balance plus the running sum of its
+        #  transactions up to then, found by binary search in the balance history.  On or after the latest
+        #  transaction this is the recalculated balance.
+        if date is None:
+            date = self._input_date("Enter date (MM/DD/YYYY, leave blank for today): ") or datetime.today()
+        self._calculate_balances(quiet=True)
+        history = self._CACHE.balance_history(self._ACCOUNTS)
+        initial = self._initial_balances()
+        balances_csv = self._balances_frame(dict((account, initial.get(account, 0) + history.balance(account, date))
+                                                 for account in self._ACCOUNTS))
+        if not quiet:
+            print(balances_csv)
+        return balances_csv
+
+    def _run_statement(self, account=None, start=None, end=None):
+        # Prompts for what it isn't given; a blank start or end date leaves the statement open on that side.
+        while account not in self._ACCOUNTS:
+            account = input("Enter account for the statement (%s): " % ', '.join(sorted(self._ACCOUNTS)))
+            start = self._input_date("Enter first date (MM/DD/YYYY, leave blank for the first transaction): ")
+            end = self._input_date("Enter last date (MM/DD/YYYY, leave blank for the latest transaction): ")
+        return self._write_statement(account, start, end)
+
+    @staticmethod
+    def _input_date(message):
+        # A date typed in any of the formats transactions are entered in, or None if left blank.
+        while True:
+            response = input(message)
+            if not response:
+                return None
+            date = bulk_import.parse_dates(pd.Series([response])).iloc[0]
+            if not pd.isnull(date):
+                return date
+
+    def _write_statement(self, account, start=None, end=None):
+        # Writes `account`'s transactions from `start` to `end` in date order, each with the amount it moved
+        #  into the account (negative when out) and the balance after it, to check against a bank statement.
+        #  The rows are read from the balance history in order and written a chunk at a time.
+        self._calculate_balances(quiet=True)
+        positions, totals, opening = self._CACHE.balance_history(self._ACCOUNTS).statement(account, start, end)
+        starting = self._initial_balances().get(account, 0)
+        transactions = self._TRANSACTIONS
+        path = './reports/Statement_%s_%s.csv' % (account, datetime.strftime(datetime.today(), '%Y%m%d'))
+        with instrumentation.span('statement.write', account=account, rows=len(positions)), \
+                open(path, 'w', newline='') as f:
+            pd.DataFrame({'ID': [''], 'Date': ['' if start is None else pd.Timestamp(start).strftime('%Y-%m-%d')],
+                          'From': [''], 'To': [''], 'Memo': ['Opening balance'], 'Amount': [''],
+                          'Balance': money.format_dollars([starting + opening])}).to_csv(f, index=False)
+            previous = opening
+            for first in range(0, len(positions), streaming.DEFAULT_CHUNKSIZE):
+                chunk = slice(first, first + streaming.DEFAULT_CHUNKSIZE)
+                rows = transactions.loc[positions[chunk]]
+                amounts = np.diff(totals[chunk], prepend=previous)
+                previous = totals[chunk][-1]
+                pd.DataFrame({
+                    'ID': rows[transaction_ids.ID].values,
+                    'Date': rows['Date'].dt.strftime('%Y-%m-%d').values,
+                    'From': ledger_dtypes.text_values(rows['From']),
+                    'To': ledger_dtypes.text_values(rows['To']),
+                    'Memo': ledger_dtypes.text_values(rows['Memo']),
+                    'Amount': money.format_dollars(amounts),
+                    'Balance': money.format_dollars(starting + totals[chunk]),
+                }).to_csv(f, header=False, index=False)
+        print("Wrote %s" % path)
+        return path
 
     def _search_for_transaction(self):
         self._calculate_balances(quiet=True)
@@ -198,40 +412,148 @@ class FinancialRecords:
         message = 'Enter search key: '
         search_val = input(message)
 
-        df = self._TRANSACTIONS.copy().fillna('')
-        df['Key'] = range(len(df))
-        for col in column_dict.values():
-            df[col] = df[col].apply(str)
-
-        df['editdistance'] = len(search_val)
-        if search_col != 'amount':
-            df['editdistance'] = df[search_col].apply(
-                lambda x: editdistance.eval(x, search_val))
-        df_list = df[df['editdistance'] < max(len(search_val) - 2.0, len(search_val) / 2)].copy()
-        del df['editdistance']
-
-        if len(df_list) == 0:
+        candidates = self._find_transactions(search_col, search_val, limit=SEARCH_LIMIT)
+        if not candidates:
             print("Search key not found")
 
-        df_list.sort_values(by=['editdistance'], ascending=[True], inplace=True)
-
-        for index, row in df_list.iterrows():
+        for distance, position in candidates:
+            transaction_id = int(self._TRANSACTIONS[transaction_ids.ID].iloc[position])
+            row = ledger_dtypes.for_display(self._TRANSACTIONS.iloc[[position]]).iloc[0]
             response = 'notyn'
-            while response not in ['y', 'n']:
-                response = input('Is this the transaction you are looking to edit?: \n %s ' % row).lower()
+            while response not in ['y', 'n', 'delete']:
+                response = input('Is this the transaction you are looking to edit? (y/n, or "delete" to delete '
+                                 'it): \n %s ' % row).lower()
 
+            if response == 'delete':
+                self._void_transaction(transaction_id)
+                break
             if response == 'y':
-                df = df[df['Key'] != row['Key']]
-                del df['Key']
-                successful = self._add_new_transaction()
+                transaction = Transaction(self._ACCOUNTS, ledger_cache=self._CACHE, staging=self._STAGING)
+                successful = transaction.create_new_transaction(stage=False)
                 print(successful)
                 if successful:
-                    self._TRANSACTIONS = df.copy()
-                    self._calculate_balances(quiet=True)
+                    # The replacement is never staged, so nothing staged meanwhile, by another process, can be
+                    #  taken for it.
+                    replacement = self._set_transaction_columns(self._staged_frame([transaction.INFORMATION]))
+                    self._void_transaction(transaction_id, replacement)
                 else:
                     print("Something went wrong.  Not saving changes")
                 break
 
+    def _void_transaction(self, transaction_id, replacement=None):
+        # Deletes a transaction, or edits it to the one-row `replacement`, and moves the balances by the old
+        #  row's amount taken back and the new row's added, without a reconciliation pass.  Raises KeyError
+        #  for an unknown transaction.
+        self._load_balances()
+        rows = self._CACHE.void(transaction_id, replacement)
+        with instrumentation.span('balances.apply', rows=len(rows)):
+            self._BALANCES = calculate_balances(self._BALANCES, rows)
+        return self._show_balances(self._BALANCES, quiet=True)
+
+    def _import_transactions(self, path=None, account=None, allow_refunds=False):
+        if path is None:
+            path = input("Enter path of the statement to import: ")
+            account = input("Enter the account the statement is for (leave blank if it has From and To "
+                            "columns): ") or None
+        accepted, rejected = bulk_import.import_statement(path, self._ACCOUNTS, self._CACHE.vocabulary(),
+                                                          account=account, allow_refunds=allow_refunds,
+                                                          duplicates=self._CACHE.duplicate_index(),
+                                                          ledger_ids=self._CACHE.column(transaction_ids.ID))
+        self._append_transactions(accepted)
+        print("Imported %s transactions" % len(accepted))
+        if not rejected.empty:
+            rejected_path = './reports/Rejected_%s.csv' % datetime.strftime(datetime.today(), '%Y%m%d')
+            rejected.to_csv(rejected_path, index=False)
+            print("Rejected %s lines; see %s" % (len(rejected), rejected_path))
+        return accepted, rejected
+
+    def _append_transactions(self, transactions):
+        # Appends validated transactions, in cents, to the ledger and catches the balances up with them.
+        self._load_balances()
+        high_water_mark = self._CACHE.rows()
+        if not transactions.empty:
+            self._CACHE.append(self._set_transaction_columns(transactions))
+            self._set_balances(self._apply_transactions_since(self._balances_frame(self._BALANCES),
+                                                              high_water_mark))
+
+    def _memorize_transaction(self, transaction_id=None, name=None, schedule=None):
+        # Saves a recorded transaction as a template repeating on `schedule` from its date.  Raises KeyError
+        #  for an unknown transaction and recurring.TemplateError for an unknown schedule or a name already in use.
+        if transaction_id is None:
+            while transaction_id not in self._CACHE.transaction_index():
+                response = input("Enter the ID of the transaction to memorize, as edit shows it: ")
+                transaction_id = int(response) if response.isdigit() else None
+            names = recurring.read_templates()['Name'].tolist()
+            while not name or name in names:
+                name = input("Enter a name for it, different from %s: " % names if names else "Enter a name for it: ")
+            while schedule not in recurring.SCHEDULES:
+                schedule = input("Enter how often it repeats (%s): " % ', '.join(recurring.SCHEDULES)).lower()
+        row = self._TRANSACTIONS.loc[self._CACHE.transaction_index().position(transaction_id)]
+        categories = [col for col in self._TRANSACTIONS.columns if col.startswith('Category')]
+        template = {'Name': name, 'Schedule': schedule, 'Start': row['Date'].strftime('%m/%d/%Y'),
+                    'From': row['From'], 'To': row['To'], 'Memo': row['Memo'],
+                    'Amount': money.format_dollars([row['Amount']])[0]}
+        template.update((col, row[col]) for col in categories if not pd.isnull(row[col]) and row[col] != '')
+        return recurring.add_template(template)
+
+    def _add_recurring_transactions(self, start=None, end=None, stage=False):
+        # Records every occurrence of the memorized transactions from `start` to `end`, inclusive, in the
+        #  ledger, or with `stage`, in the unreconciled journal.  Occurrences already in the ledger are
+        #  skipped, so overlapping ranges can be run.  Returns the transactions recorded and the templates
+        #  that failed validation, with a Reason column.
+        if start is None and end is None:
+            start = self._input_date("Enter first date (MM/DD/YYYY, leave blank for today): ")
+            end = self._input_date("Enter last date (MM/DD/YYYY, leave blank for today): ")
+        start = start if start is not None else datetime.today()
+        end = end if end is not None else datetime.today()
+        accepted, rejected = recurring.validate_templates(recurring.read_templates(), self._ACCOUNTS,
+                                                          self._CACHE.vocabulary())
+        with instrumentation.span('recurring.materialize', templates=len(accepted)) as fields:
+            transactions = recurring.materialize(accepted, start, end)
+            if not transactions.empty:
+                transactions = transactions[self._CACHE.duplicate_index().find(transactions).values < 0]
+            fields.update(rows=len(transactions))
+        if stage:
+            self._STAGING.stage(recurring.staged(transactions))
+        else:
+            self._append_transactions(transactions)
+        print("%s %s memorized transactions" % ('Staged' if stage else 'Recorded', len(transactions)))
+        for _, template in rejected.iterrows():
+            print("Skipped memorized transaction %s: %s" % (template['Name'], template['Reason']))
+        return transactions, rejected
+
+    def _find_transactions(self, search_col, search_val, limit=None):
+        # Returns (edit distance, row position) pairs, closest first, for values within the search tolerance;
+        #  with `limit`, only that many of the closest.
+        max_distance = int(math.ceil(max(len(search_val) - 2.0, len(search_val) / 2))) - 1
+        # A column's first search in a session is answered by a scan, which is quicker than reading or building
+        #  its index; the index pays off from the next search on, as in an edit session.
+        indexed = search_col in ['Memo', 'From', 'To'] or 'ategory' in search_col
+        searched = search_col in self._SEARCHED_COLUMNS
+        self._SEARCHED_COLUMNS.add(search_col)
+        if indexed and searched:
+            index = self._CACHE.search_index(search_col)
+            with instrumentation.span('search.index', column=search_col) as fields:
+                found = index.search(search_val, max_distance, limit=limit)
+                fields['matches'] = len(found)
+            return found
+        values = self._CACHE.column(search_col)
+        with instrumentation.span('search.scan', column=search_col, rows=len(values)) as fields:
+            found = self._scan(values, search_col, search_val, max_distance)[:limit]
+            fields['matches'] = len(found)
+        return found
+
+    @staticmethod
+    def _scan(values, search_col, search_val, max_distance):
+        if search_col == 'Amount':
+            values = money.to_dollars(values)
+        elif search_col == 'Date':
+            values = np.datetime_as_string(values, unit='D')
+        values = pd.Series(ledger_dtypes.text_values(values))
+        distances = values.apply(lambda x: editdistance.eval(x, search_val)).values
+        positions = np.flatnonzero(distances <= max_distance)
+        return sorted(zip(distances[positions].tolist(), positions.tolist()))
+
     def _add_account(self):
         yn_response = 'notaresponse'
         account = None
@@ -245,13 +567,18 @@ class FinancialRecords:
         row = list()
         row.append({'Account': account, 'Starting Balance': initial_balance})
 
+        self._load_balances()
+
+        frames = dict()
         for balance_type_path in [INITIAL_BALANCES_CSV_PATH, CURRENT_BALANCES_CSV_PATH]:
-            if balance_type_path in os.listdir('./balances'):
+            write_behind.flush(balance_type_path)
+            if os.path.exists(balance_type_path):
                 df = pd.read_csv(balance_type_path)
             else:
                 df = pd.DataFrame()
-            df = pd.concat([df, pd.DataFrame(row)])
-            df.to_csv(balance_type_path, index=False)
+            frames[balance_type_path] = pd.concat([df, pd.DataFrame(row)], ignore_index=True)
 
-        self._set_balances(self._read_balances())
+        write_behind.write_atomically(INITIAL_BALANCES_CSV_PATH,
+                                      lambda f: frames[INITIAL_BALANCES_CSV_PATH].to_csv(f, index=False))
+        self._set_balances(frames[CURRENT_BALANCES_CSV_PATH])
         self._ACCOUNTS = self._get_accounts()
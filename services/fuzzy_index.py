@@ -0,0 +1,146 @@
+from services import write_behind
+from services.ledger_dtypes import text_values
+from services.lazy_imports import lazy_import
+import editdistance
+import json
+import os
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+# Bumped whenever the layout of a saved tree changes.
+VERSION = 1
+
+
+class BKTree:
+    # Burkhard-Keller tree over distinct strings.  Edit distance is a metric, so a search for everything
+    #  within `max_distance` of a query only has to descend into children whose edge distance is within
+    #  `max_distance` of the current node's distance to the query.
+    def __init__(self):
+        self._ROOT = None
+        self._CHILDREN = dict()
+
+    def __len__(self):
+        return len(self._CHILDREN)
+
+    def __contains__(self, value):
+        return value in self._CHILDREN
+
+    def add(self, value):
+        if self._ROOT is None:
+            self._ROOT = value
+            self._CHILDREN[value] = dict()
+            return
+        node = self._ROOT
+        while True:
+            distance = editdistance.eval(value, node)
+            if distance == 0:
+                return
+            child = self._CHILDREN[node].get(distance)
+            if child is None:
+                self._CHILDREN[node][distance] = value
+                self._CHILDREN[value] = dict()
+                return
+            node = child
+
+    def search(self, query, max_distance):
+        if self._ROOT is None:
+            return list()
+        matches = list()
+        stack = [self._ROOT]
+        while stack:
+            node = stack.pop()
+            distance = editdistance.eval(query, node)
+            if distance <= max_distance:
+                matches.append((distance, node))
+            for edge, child in self._CHILDREN[node].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches)
+
+    def dump(self):
+        # The values in the order they were added, which puts every node after its parent, with the
+        #  position of each one's parent and its edge distance; the root has neither.
+        numbers = dict((value, number) for number, value in enumerate(self._CHILDREN))
+        parents = [[-1, 0]] * len(numbers)
+        for node, children in self._CHILDREN.items():
+            for edge, child in children.items():
+                parents[numbers[child]] = [numbers[node], edge]
+        return {'values': list(numbers), 'parents': parents}
+
+    @classmethod
+    def load(cls, dumped):
+        tree = cls()
+        values = dumped['values']
+        tree._CHILDREN = dict((value, dict()) for value in values)
+        tree._ROOT = values[0] if values else None
+        for value, (parent, edge) in zip(values[1:], dumped['parents'][1:]):
+            tree._CHILDREN[values[parent]][edge] = value
+        return tree
+
+
+# A tree only depends on the distinct values it was given, not on where they are in the ledger, so one saved
+#  by an earlier session serves any later one: values appended since are added to it, and values that are no
+#  longer in the ledger only match rows that aren't there.  The trees are kept one file per column.
+def read_tree(directory, col):
+    # The saved tree for `col`, or None.
+    path = os.path.join(directory, col + '.json')
+    write_behind.flush(path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        dumped = json.load(f)
+    return BKTree.load(dumped) if dumped.get('version') == VERSION else None
+
+
+def write_tree(directory, col, tree):
+    # Written in the background; a later read waits for it.
+    os.makedirs(directory, exist_ok=True)
+    dumped = dict(tree.dump(), version=VERSION)
+    write_behind.write(os.path.join(directory, col + '.json'), lambda f: f.write(json.dumps(dumped)))
+
+
+class FuzzyIndex:
+    # Maps every distinct value of one ledger column to the row positions holding it.  The rows are kept as
+    #  frames of positions grouped by value, one per batch added, so building the index for a ledger only
+    #  adds to the tree the values it doesn't have yet.
+    def __init__(self, values=None, tree=None):
+        self._TREE = tree if tree is not None else BKTree()
+        # (value -> group number, positions sorted by group, first of each group) for each batch.
+        self._BATCHES = list()
+        self._ROWS = 0
+        if values is not None:
+            self.add(values)
+
+    def __len__(self):
+        return self._ROWS
+
+    def add(self, values):
+        values = text_values(values)
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+        groups = dict((value, number) for number, value in enumerate(uniques.tolist()))
+        for value in groups:
+            if value not in self._TREE:
+                self._TREE.add(value)
+        self._BATCHES.append((groups, order + self._ROWS, starts))
+        self._ROWS += len(values)
+
+    def _positions(self, value):
+        positions = list()
+        for groups, order, starts in self._BATCHES:
+            number = groups.get(value)
+            if number is not None:
+                positions.extend(order[starts[number]:starts[number + 1]].tolist())
+        return positions
+
+    def search(self, query, max_distance, limit=None):
+        # Returns (distance, position) pairs, closest first.
+        candidates = list()
+        for distance, value in self._TREE.search(query, max_distance):
+            if limit is not None and len(candidates) >= limit and distance > candidates[-1][0]:
+                break
+            candidates.extend((distance, position) for position in self._positions(value))
+        return sorted(candidates)[:limit]
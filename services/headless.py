@@ -0,0 +1,148 @@
+from services import ledger_dtypes, write_behind
+from services.bulk_import import StatementError
+from services.financial_records import FinancialRecords, SEARCH_LIMIT
+from services.monthly_cube import PERIOD_MONTHS
+from services.recurring import TemplateError
+from services.timing import PhaseTimer
+from services.lazy_imports import lazy_import
+from contextlib import contextmanager
+
+pd = lazy_import('pandas')
+
+
+class InputError(Exception):
+    # An operation was asked for something that doesn't exist or can't be done; the message says what.
+    pass
+
+
+# Each operation runs without prompting.  Pass a PhaseTimer to get the wall-clock time of each phase;
+#  'load' covers reading the ledger and catching the balances up with it, unless the ledger is streamed.
+
+
+def balance(as_of=None, timer=None):
+    # Reconciles staged transactions and returns the current balances, or with `as_of`, the balances at the
+    #  end of that day.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer)
+    with _phase(timer, 'balance'):
+        if as_of is not None:
+            return records._show_balances_on(as_of, quiet=True)
+        return records._calculate_balances(quiet=True)
+
+
+def statement(account, start=None, end=None, timer=None):
+    # Writes `account`'s transactions from `start` to `end`, each with the balance after it, and returns the
+    #  path of the statement.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer)
+    with _phase(timer, 'statement'):
+        if account not in records._ACCOUNTS:
+            raise InputError("Unknown account %s; expected one of %s" % (account, sorted(records._ACCOUNTS)))
+        return records._write_statement(account, start, end)
+
+
+def recalculate(chunksize=None, timer=None):
+    # Recomputes the current balances from the initial balances and the whole ledger, reading it `chunksize`
+    #  rows at a time if given.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer, chunksize=chunksize)
+    with _phase(timer, 'recalculate'):
+        return records._recalculate_transactions(quiet=True)
+
+
+def report(period=None, as_of=None, yearly=False, workers=None, chunksize=None, timer=None):
+    # Runs the income and expense reports, for the whole ledger, for every year and account (`yearly`), or
+    #  for the month, quarter or year to date around `as_of` (`period`).  Returns the paths of the reports.
+    #  `chunksize` streams the ledger for the whole-ledger and yearly reports.
+    if period is not None and period not in PERIOD_MONTHS:
+        raise InputError("Unknown period %s; expected one of %s" % (period, list(PERIOD_MONTHS.keys())))
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer, report_workers=workers, chunksize=chunksize)
+    with _phase(timer, 'report'):
+        if period is not None:
+            return records._run_period_report(period, as_of if as_of is not None else pd.Timestamp.today())
+        if yearly:
+            return records._run_yearly_reports(quiet=True)
+        return records._run_report(quiet=True)
+
+
+def import_statement(path, account=None, allow_refunds=False, timer=None):
+    # Returns the accepted and the rejected statement lines.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer)
+    with _phase(timer, 'import'):
+        try:
+            return records._import_transactions(path, account=account, allow_refunds=allow_refunds)
+        except StatementError as error:
+            raise InputError(str(error))
+        except FileNotFoundError:
+            raise InputError("No statement at %s" % path)
+
+
+def memorize(transaction_id, name, schedule, timer=None):
+    # Saves the transaction with ID `transaction_id` as a template repeating on `schedule` from its date, and
+    #  returns the templates.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer)
+    with _phase(timer, 'memorize'):
+        try:
+            return records._memorize_transaction(transaction_id, name, schedule)
+        except KeyError:
+            raise InputError("No transaction has ID %s" % transaction_id)
+        except TemplateError as error:
+            raise InputError(str(error))
+
+
+def recurring(start=None, end=None, stage=False, timer=None):
+    # Records the memorized transactions falling from `start` to `end` (both default today) in the ledger,
+    #  or with `stage`, stages them.  Returns the transactions recorded and the templates that were invalid.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer)
+    with _phase(timer, 'recurring'):
+        today = pd.Timestamp.today()
+        return records._add_recurring_transactions(start if start is not None else today,
+                                                   end if end is not None else today, stage=stage)
+
+
+def search(column, value, limit=SEARCH_LIMIT, timer=None):
+    # Returns the `limit` ledger rows closest to `value` in `column`, closest first, with their edit Distance;
+    #  a `limit` of None returns every row within the search tolerance.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer)
+    with _phase(timer, 'search'):
+        columns = dict((col.lower(), col) for col in records._TRANSACTIONS.columns)
+        if column.lower() not in columns:
+            raise InputError("Unknown column %s; expected one of %s" % (column, list(columns.values())))
+        candidates = records._find_transactions(columns[column.lower()], value, limit=limit)
+        rows = ledger_dtypes.for_display(records._TRANSACTIONS.iloc[[position for _, position in candidates]])
+        rows.insert(0, 'Distance', [distance for distance, _ in candidates])
+        return rows
+
+
+def delete(transaction_id, timer=None):
+    # Deletes the transaction with ID `transaction_id`, as shown by search, and returns the current balances.
+    timer = timer if timer is not None else PhaseTimer()
+    records = _load(timer)
+    with _phase(timer, 'delete'):
+        try:
+            return records._void_transaction(transaction_id)
+        except KeyError:
+            raise InputError("No transaction has ID %s" % transaction_id)
+
+
+@contextmanager
+def _phase(timer, name):
+    # Files written in the background are on disk by the time an operation returns.
+    with timer.phase(name):
+        yield
+        write_behind.flush()
+
+
+def _load(timer, **kwargs):
+    # The ledger and balances are otherwise read when first used, which would count them in the next phase.
+    with timer.phase('load'):
+        records = FinancialRecords(**kwargs)
+        if kwargs.get('chunksize') is None:
+            records._TRANSACTIONS
+            records._load_balances()
+        return records
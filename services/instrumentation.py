@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+from timeit import default_timer
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+
+PROFILES = ['cprofile', 'tracemalloc']
+
+# Set by `start`; spans cost next to nothing until then.
+_TRACE = None
+
+
+class Trace:
+    # Writes one JSON object per finished span to `path`, appending, so runs can be compared over time.  A
+    #  span records its name, the span it ran inside, the process, its start time and duration, and any
+    #  counts (rows, bytes) its caller added.  With `profile` 'tracemalloc' each span also records the peak of
+    #  traced memory while it ran; with 'cprofile' the whole run is profiled into `path` + '.prof'.
+    def __init__(self, path, profile=None):
+        if profile is not None and profile not in PROFILES:
+            raise ValueError("Unknown profile %s; expected one of %s" % (profile, PROFILES))
+        self._PATH = path
+        # Line buffered, so a forked report worker never inherits a half-written line.
+        self._FILE = open(path, 'a', buffering=1)
+        self._PROFILE = profile
+        self._STACK = list()
+        self._PROFILER = None
+        if profile == 'cprofile':
+            self._PROFILER = cProfile.Profile()
+            self._PROFILER.enable()
+        elif profile == 'tracemalloc':
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name, fields):
+        parent = self._STACK[-1] if self._STACK else None
+        if parent is not None and self._PROFILE == 'tracemalloc':
+            # Resetting the peak for this span would lose the parent's peak so far.
+            parent['peak'] = max(parent['peak'], self._traced_peak())
+        frame = {'name': name, 'peak': 0}
+        self._STACK.append(frame)
+        self._reset_peak()
+        started, start = time.time(), default_timer()
+        error = None
+        try:
+            yield fields
+        except BaseException as exception:
+            error = type(exception).__name__
+            raise
+        finally:
+            record = {'span': name, 'parent': parent['name'] if parent is not None else None, 'pid': os.getpid(),
+                      'start': round(started, 6), 'seconds': round(default_timer() - start, 6)}
+            record.update(fields)
+            self._STACK.pop()
+            if self._PROFILE == 'tracemalloc':
+                record['peak_bytes'] = max(frame['peak'], self._traced_peak())
+                if parent is not None:
+                    parent['peak'] = max(parent['peak'], record['peak_bytes'])
+            if error is not None:
+                record['error'] = error
+            self._FILE.write(json.dumps(record, default=str) + '\n')
+
+    @staticmethod
+    def _traced_peak():
+        return tracemalloc.get_traced_memory()[1]
+
+    def _reset_peak(self):
+        if self._PROFILE == 'tracemalloc':
+            tracemalloc.reset_peak()
+
+    def close(self):
+        if self._PROFILER is not None:
+            self._PROFILER.disable()
+            self._PROFILER.dump_stats(self._PATH + '.prof')
+        elif self._PROFILE == 'tracemalloc':
+            tracemalloc.stop()
+        self._FILE.close()
+
+
+def start(path, profile=None):
+    global _TRACE
+    stop()
+    _TRACE = Trace(path, profile)
+
+
+def stop():
+    global _TRACE
+    if _TRACE is not None:
+        _TRACE.close()
+    _TRACE = None
+
+
+def enabled():
+    return _TRACE is not None
+
+
+@contextmanager
+def span(name, **fields):
+    # Times the block as a span called `name`.  Yields a dict the block can add counts to, such as rows or
+    #  bytes; it is thrown away when no trace has been started.
+    if _TRACE is None:
+        yield fields
+        return
+    with _TRACE.span(name, fields) as fields:
+        yield fields
@@ -0,0 +1,17 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    # Returns the module `name` without running it; it is imported the first time one of its attributes is
+    #  used.  numpy and pandas alone take several times longer to import than the rest of the program takes
+    #  to reach its first prompt, and many actions never need them.
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,218 @@
+from services import fuzzy_index, instrumentation, ledger_dtypes, report_cache, transaction_ids
+from services.balance_history import BalanceHistory
+from services.duplicate_index import DuplicateIndex
+from services.fuzzy_index import FuzzyIndex
+from services.monthly_cube import MonthlyCube
+from services.transaction_ids import TransactionIndex
+from services.vocabulary import Vocabulary
+from services.lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+class LedgerCache:
+    # Keeps one parsed copy of the ledger, and the indexes derived from it, for the whole session.  The
+    #  copy is reloaded only when the ledger's signature (modification time and size) changes underneath
+    #  it; appends and edits made through the cache update it in place.
+    #
+    # The copy holds the live transactions, indexed by ledger position.  Void rows and the rows they cancel,
+    #  which are only needed to catch balances up with the ledger, are held apart.
+    def __init__(self, ledger, prepare=None, search_index_path=None):
+        # With `search_index_path`, the search trees are saved there and read back by later sessions.
+        self._LEDGER = ledger
+        self._PREPARE = prepare
+        self._SEARCH_INDEX_PATH = search_index_path
+        self._SIGNATURE = None
+        self._TRANSACTIONS = None
+        self._VOIDED = None
+        self._ROWS = 0
+        self._NEXT_ID = 0
+        self._TRANSACTION_INDEX = None
+        self._VOCABULARY = None
+        self._SEARCH_INDEXES = dict()
+        # Each column's search tree, which only ever gains values, so it outlives the indexes built on it.
+        self._SEARCH_TREES = dict()
+        self._DUPLICATE_INDEX = None
+        self._MONTHLY_CUBE = None
+        self._BALANCE_HISTORY = None
+        self._ROW_HASHES = None
+
+    def transactions(self):
+        if self._TRANSACTIONS is None or self._LEDGER.signature() != self._SIGNATURE:
+            self._load()
+        return self._TRANSACTIONS
+
+    def _load(self):
+        self._SIGNATURE = self._LEDGER.signature()
+        records = self._LEDGER.read()
+        if not records.empty and self._PREPARE is not None:
+            with instrumentation.span('ledger.prepare', rows=len(records)):
+                records = self._PREPARE(records)
+        self._set_records(records)
+        self._VOCABULARY = None
+
+    def _set_records(self, records):
+        self._ROWS = len(records)
+        self._TRANSACTIONS, self._VOIDED = transaction_ids.prepare(records)
+        # IDs are ledger positions, but a ledger rewritten without its void rows is shorter than its IDs.  Every
+        #  transaction may have been deleted, so the voided rows' IDs count too.
+        ids = np.concatenate([transaction_ids.ids(self._TRANSACTIONS), transaction_ids.ids(self._VOIDED)])
+        self._NEXT_ID = max(self._ROWS, int(ids.max()) + 1 if len(ids) else 0)
+        self._TRANSACTION_INDEX = None
+        self._SEARCH_INDEXES = dict()
+        self._DUPLICATE_INDEX = None
+        self._MONTHLY_CUBE = None
+        self._BALANCE_HISTORY = None
+        self._ROW_HASHES = None
+
+    def rows(self):
+        # Rows in the ledger, live or not.
+        self.transactions()
+        return self._ROWS
+
+    def next_id(self):
+        self.transactions()
+        return self._NEXT_ID
+
+    def rows_since(self, position):
+        # Every row from ledger position `position` on, in ledger order, void rows included.
+        transactions = self.transactions()
+        rows = ledger_dtypes.concat(transactions[transactions.index.values >= position],
+                                    self._VOIDED[self._VOIDED.index.values >= position])
+        return rows.sort_index(kind='mergesort')
+
+    def column(self, col):
+        values = np.asarray(self.transactions()[col]).view()
+        values.flags.writeable = False
+        return values
+
+    def vocabulary(self):
+        transactions = self.transactions()
+        if self._VOCABULARY is None:
+            with instrumentation.span('index.vocabulary', rows=len(transactions)):
+                self._VOCABULARY = Vocabulary(transactions)
+        return self._VOCABULARY
+
+    def search_index(self, col):
+        transactions = self.transactions()
+        if col not in self._SEARCH_INDEXES:
+            with instrumentation.span('index.search', column=col, rows=len(transactions)) as fields:
+                tree = self._search_tree(col)
+                values = len(tree)
+                self._SEARCH_INDEXES[col] = FuzzyIndex(transactions[col], tree=tree)
+                fields['added_values'] = len(tree) - values
+                if self._SEARCH_INDEX_PATH is not None and len(tree) > values:
+                    fuzzy_index.write_tree(self._SEARCH_INDEX_PATH, col, tree)
+        return self._SEARCH_INDEXES[col]
+
+    def _search_tree(self, col):
+        if col not in self._SEARCH_TREES:
+            tree = None
+            if self._SEARCH_INDEX_PATH is not None:
+                tree = fuzzy_index.read_tree(self._SEARCH_INDEX_PATH, col)
+            self._SEARCH_TREES[col] = tree if tree is not None else fuzzy_index.BKTree()
+        return self._SEARCH_TREES[col]
+
+    def duplicate_index(self):
+        transactions = self.transactions()
+        if self._DUPLICATE_INDEX is None:
+            with instrumentation.span('index.duplicates', rows=len(transactions)):
+                self._DUPLICATE_INDEX = DuplicateIndex(transactions)
+        return self._DUPLICATE_INDEX
+
+    def monthly_cube(self):
+        transactions = self.transactions()
+        if self._MONTHLY_CUBE is None:
+            with instrumentation.span('index.monthly_cube', rows=len(transactions)):
+                self._MONTHLY_CUBE = MonthlyCube(transactions)
+        return self._MONTHLY_CUBE
+
+    def balance_history(self, accounts):
+        # Rebuilt when the tracked accounts change.
+        transactions = self.transactions()
+        if self._BALANCE_HISTORY is None or self._BALANCE_HISTORY.accounts() != frozenset(accounts):
+            with instrumentation.span('index.balance_history', rows=len(transactions)):
+                self._BALANCE_HISTORY = BalanceHistory(accounts, transactions)
+        return self._BALANCE_HISTORY
+
+    def transaction_index(self):
+        transactions = self.transactions()
+        if self._TRANSACTION_INDEX is None:
+            with instrumentation.span('index.transactions', rows=len(transactions)):
+                self._TRANSACTION_INDEX = TransactionIndex(transactions)
+        return self._TRANSACTION_INDEX
+
+    def row_hashes(self):
+        # report_cache.row_hashes of the live transactions, indexed by ledger position.
+        transactions = self.transactions()
+        if self._ROW_HASHES is None:
+            with instrumentation.span('index.row_hashes', rows=len(transactions)):
+                self._ROW_HASHES = pd.Series(report_cache.row_hashes(transactions), index=transactions.index)
+        return self._ROW_HASHES
+
+    def _add_row_hashes(self, transactions):
+        if self._ROW_HASHES is not None:
+            self._ROW_HASHES = pd.concat([self._ROW_HASHES, pd.Series(report_cache.row_hashes(transactions),
+                                                                      index=transactions.index)])
+
+    def append(self, transactions, counted=False):
+        # `counted` transactions were already added to the vocabulary when they were saved.  Returns the
+        #  transactions with their IDs.
+        current = self.transactions()
+        transactions = transaction_ids.number(transactions, self._ROWS, self._NEXT_ID)
+        self._LEDGER.append(transactions)
+        self._SIGNATURE = self._LEDGER.signature()
+        self._TRANSACTIONS = ledger_dtypes.concat(current, transactions)
+        self._ROWS += len(transactions)
+        self._NEXT_ID += len(transactions)
+        if self._TRANSACTION_INDEX is not None:
+            self._TRANSACTION_INDEX.add(transactions)
+        for col, index in self._SEARCH_INDEXES.items():
+            index.add(transactions.reindex(columns=[col])[col])
+        if self._DUPLICATE_INDEX is not None:
+            self._DUPLICATE_INDEX.add(transactions)
+        if self._MONTHLY_CUBE is not None:
+            self._MONTHLY_CUBE.add(transactions)
+        if self._BALANCE_HISTORY is not None:
+            self._BALANCE_HISTORY.add(transactions)
+        if self._VOCABULARY is not None and not counted:
+            self._VOCABULARY.add_transactions(transactions)
+        self._add_row_hashes(transactions)
+        return transactions
+
+    def void(self, transaction_id, replacement=None):
+        # Deletes a transaction, or with a one-row `replacement`, edits it, by appending rows rather than
+        #  rewriting the ledger.  Returns the rows appended: applying them to balances takes back the old
+        #  row's amount and adds the new one's.  Raises KeyError for an unknown transaction.
+        current = self.transactions()
+        position = self.transaction_index().position(transaction_id)
+        voided = current.loc[[position]]
+        rows = voided.assign(**{transaction_ids.VOID: True})
+        if replacement is not None:
+            rows = ledger_dtypes.concat(rows, replacement.assign(**{transaction_ids.ID: transaction_id}))
+        rows = rows.set_axis(range(self._ROWS, self._ROWS + len(rows)), axis=0)
+        self._LEDGER.append(rows)
+        self._SIGNATURE = self._LEDGER.signature()
+        self._ROWS += len(rows)
+        self._NEXT_ID = max(self._NEXT_ID, self._ROWS)
+        voided = ledger_dtypes.concat(voided.assign(**{transaction_ids.VOID: False}), rows.iloc[:1])
+        self._VOIDED = ledger_dtypes.concat(self._VOIDED, voided)
+        self._TRANSACTIONS = current.drop(index=position)
+        self._TRANSACTION_INDEX.remove(transaction_id)
+        if self._ROW_HASHES is not None:
+            self._ROW_HASHES = self._ROW_HASHES.drop(index=position)
+        if replacement is not None:
+            new = rows.iloc[1:].drop(columns=[transaction_ids.VOID])
+            self._TRANSACTIONS = ledger_dtypes.concat(self._TRANSACTIONS, new)
+            self._TRANSACTION_INDEX.add(new)
+            self._add_row_hashes(new)
+        # Every later row has moved up one, so the indexes built on row order are rebuilt on next use; the
+        #  search indexes keep their trees, which don't depend on row order.  The vocabulary is kept; it only
+        #  ranks suggestions, so counts from removed rows do no harm.  The balance history is rebuilt too, so
+        #  a statement doesn't list the void row.
+        self._SEARCH_INDEXES = dict()
+        self._DUPLICATE_INDEX = None
+        self._MONTHLY_CUBE = None
+        self._BALANCE_HISTORY = None
+        return rows
@@ -0,0 +1,77 @@
+from services import money
+from services.lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+# The in-memory ledger keeps each name column as a categorical: one int code per row into a small table
+#  of distinct names, instead of one Python string per row.  Dates are datetime64 seconds, 8 bytes a row
+#  instead of a date object.
+DATE_DTYPE = 'datetime64[s]'
+NAME_COLUMNS = ['From', 'To']
+# Memos are encoded too when they repeat at least this often on average, as most do.
+MEMO_REPEATS = 2
+
+
+def is_name_column(col):
+    return col in NAME_COLUMNS or col.startswith('Category')
+
+
+def compact(transactions):
+    # Converts the columns of `transactions` in place and returns it.
+    transactions['Date'] = pd.to_datetime(transactions['Date']).astype(DATE_DTYPE)
+    for col in transactions.columns:
+        if is_name_column(col) or (col == 'Memo' and _repeats(transactions[col])):
+            transactions[col] = transactions[col].astype('category')
+    return transactions
+
+
+def _repeats(memos):
+    return isinstance(memos.dtype, pd.CategoricalDtype) or \
+        len(memos) >= MEMO_REPEATS * max(memos.nunique(), 1)
+
+
+def concat(ledger, transactions):
+    # Appends `transactions` to `ledger` keeping its categoricals and both frames' indexes.  New names are
+    #  added to the end of the ledger's categories, so the codes already in the ledger stay valid and aren't
+    #  recomputed.
+    if ledger.empty:
+        return transactions
+    ledger = ledger.copy(deep=False)
+    transactions = transactions.copy(deep=False)
+    for col in ledger.columns:
+        if not isinstance(ledger[col].dtype, pd.CategoricalDtype):
+            continue
+        values = transactions[col] if col in transactions.columns else pd.Series(np.nan, index=transactions.index)
+        new = pd.Index(values.dropna().unique()).difference(ledger[col].cat.categories)
+        if len(new):
+            ledger[col] = ledger[col].cat.add_categories(new)
+        transactions[col] = values.astype(object).astype(ledger[col].dtype)
+    combined = pd.concat([ledger, transactions], sort=False)
+    for col in combined.columns:
+        # A category level the ledger didn't have yet.
+        if is_name_column(col) and not isinstance(combined[col].dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].astype('category')
+    return combined
+
+
+def lexical_order(values):
+    # Sort key for sort_values: a categorical sorts by its categories' order, which here is the order names
+    #  were first seen, so it is ranked by the names themselves instead.
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    ranks = np.argsort(np.argsort(np.asarray(values.cat.categories, dtype=str), kind='stable'))
+    codes = values.cat.codes.values
+    return pd.Series(np.where(codes >= 0, ranks[codes], np.nan), index=values.index)
+
+
+def text_values(values):
+    # Values as plain strings with '' for missing, whether or not the column is a categorical.
+    return pd.Series(values).astype(object).fillna('').apply(str).values
+
+
+def for_display(transactions):
+    # Rows as the user entered them: dates to the day, amounts in dollars and blanks for missing values.
+    return transactions.assign(Date=transactions['Date'].dt.strftime('%Y-%m-%d'),
+                               Amount=money.to_dollars(transactions['Amount'])).astype(object).fillna('')
@@ -0,0 +1,431 @@
+from services import instrumentation, money, transaction_ids, write_behind
+from services.transaction_ids import ID, VOID
+from services.lazy_imports import lazy_import
+import csv
+import functools
+import io
+import json
+import os
+import shutil
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+TRANSACTIONS_CSV_PATH = './transactions/transactions.csv'
+COLUMNAR_LEDGER_PATH = './transactions/columnar'
+
+SCHEMA_FILE = 'schema.json'
+SEQUENCE = 'Sequence'
+TYPED_COLUMNS = {
+    'Date': 'datetime64[D]',
+    'Amount': 'int64',
+    ID: 'int64',
+    VOID: 'bool'
+}
+
+
+def open_ledger():
+    columnar = ColumnarLedgerStore()
+    if columnar.exists():
+        return columnar
+    return CsvLedgerStore()
+
+
+def _traced(operation):
+    # Runs a store's read, append or write in a 'ledger.<operation>' span counting the rows read or written,
+    #  and the bytes: the whole store for a read or write, its growth for an append.
+    def decorate(method):
+        @functools.wraps(method)
+        def traced(self, *args, **kwargs):
+            if not instrumentation.enabled():
+                return method(self, *args, **kwargs)
+            with instrumentation.span('ledger.%s' % operation, store=type(self).__name__) as fields:
+                before = self._stored_bytes()
+                result = method(self, *args, **kwargs)
+                if operation == 'read':
+                    fields.update(rows=len(result), bytes_read=before)
+                else:
+                    fields.update(rows=len(args[0]),
+                                  bytes_written=self._stored_bytes() - (before if operation == 'append' else 0))
+            return result
+        return traced
+    return decorate
+
+
+def _traced_chunks(store, chunks):
+    # One 'ledger.read_chunk' span per chunk, timing only the read, not what the caller does with it.
+    chunks = iter(chunks)
+    while True:
+        with instrumentation.span('ledger.read_chunk', store=type(store).__name__) as fields:
+            chunk = next(chunks, None)
+            fields['rows'] = len(chunk) if chunk is not None else 0
+        if chunk is None:
+            return
+        yield chunk
+
+
+class LedgerStore:
+    # Rows come back from `read` in the order they were appended.  Amount is int64 cents, in and out.
+    def exists(self):
+        raise NotImplementedError
+
+    def signature(self):
+        # Changes whenever the stored ledger does; None when there is no ledger yet.
+        raise NotImplementedError
+
+    def read(self, columns=None):
+        raise NotImplementedError
+
+    def columns(self):
+        raise NotImplementedError
+
+    def iter_chunks(self, chunksize):
+        # Yields every row once, in frames of at most `chunksize` rows indexed by the rows' ledger positions.
+        raise NotImplementedError
+
+    def append(self, transactions):
+        raise NotImplementedError
+
+    def write(self, transactions):
+        raise NotImplementedError
+
+    def _stored_bytes(self):
+        raise NotImplementedError
+
+
+class CsvLedgerStore(LedgerStore):
+    def __init__(self, path=TRANSACTIONS_CSV_PATH):
+        self._PATH = path
+
+    def exists(self):
+        return os.path.exists(self._PATH)
+
+    def signature(self):
+        return _file_signature(self._PATH)
+
+    def _stored_bytes(self):
+        return os.path.getsize(self._PATH) if self.exists() else 0
+
+    @_traced('read')
+    def read(self, columns=None):
+        if not self.exists():
+            return pd.DataFrame()
+        if columns is None:
+            return self._to_cents(pd.read_csv(self._rows(), dtype={'Amount': str}))
+        return self._to_cents(pd.read_csv(self._rows(), usecols=lambda col: col in columns, dtype={'Amount': str}))
+
+    def columns(self):
+        if not self.exists():
+            return list()
+        return list(pd.read_csv(self._PATH, nrows=0).columns)
+
+    def iter_chunks(self, chunksize):
+        if not self.exists():
+            return iter([])
+        chunks = pd.read_csv(self._rows(), chunksize=chunksize, dtype={'Amount': str})
+        return _traced_chunks(self, (self._to_cents(chunk) for chunk in chunks))
+
+    @staticmethod
+    def _to_cents(transactions):
+        # The CSV keeps amounts in dollars, so it stays readable; they are read as text and parsed once.
+        if 'Amount' in transactions.columns:
+            transactions['Amount'] = money.to_cents(transactions['Amount'])
+        return transactions
+
+    @staticmethod
+    def _to_dollars(transactions):
+        # Dates are written as plain days whether they arrive as text, datetimes or a mix of both.  IDs are
+        #  written as integers, and only void rows are marked.
+        if 'Date' in transactions.columns:
+            transactions = transactions.assign(Date=pd.to_datetime(transactions['Date'], format='mixed')
+                                               .dt.strftime('%Y-%m-%d'))
+        if ID in transactions.columns:
+            transactions = transactions.assign(**{ID: pd.to_numeric(transactions[ID]).astype('Int64')})
+        if VOID in transactions.columns:
+            void = transactions[VOID].eq(True)
+            transactions = transactions.assign(**{VOID: void.where(void)})
+        if 'Amount' not in transactions.columns:
+            return transactions
+        return transactions.assign(Amount=money.format_dollars(transactions['Amount']))
+
+    @_traced('append')
+    def append(self, transactions):
+        if not self.exists():
+            self.write(transactions)
+            return
+        self._repair_last_row()
+        columns = self.columns()
+        if not set(transactions.columns).issubset(columns):
+            # A CSV can't grow a column in place, so a deeper category level means a full rewrite.
+            self.write(pd.concat([self.read(), transactions], sort=False, ignore_index=True))
+            return
+        rows = self._to_dollars(transactions.reindex(columns=columns)).to_csv(header=False, index=False)
+        with open(self._PATH, 'a', newline='') as f:
+            f.write(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @_traced('write')
+    def write(self, transactions):
+        # Written to a temporary file first, so a crash part way leaves the previous ledger in place.
+        write_behind.write_atomically(self._PATH, lambda f: self._to_dollars(transactions).to_csv(f, index=False))
+
+    def _rows(self):
+        # The ledger up to its last newline.  A last line without one may be a row another process is still
+        #  appending, so reads leave it out, and never change the file.  It is only repaired by an append.
+        with open(self._PATH, 'rb') as f:
+            end = f.seek(0, os.SEEK_END)
+            keep = self._terminated_length(f)
+            if keep == end or not keep:
+                return self._PATH
+            f.seek(0)
+            return io.BytesIO(f.read(keep))
+
+    @staticmethod
+    def _terminated_length(f):
+        position = f.seek(0, os.SEEK_END)
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            newline = f.read(step).rfind(b'\n')
+            if newline >= 0:
+                return position - step + newline + 1
+            position -= step
+        return 0
+
+    def _repair_last_row(self):
+        # An append cut short by a crash can leave the start of a row, with no newline, at the end of the
+        #  file; it is dropped before the next append.  A last row that has all its fields but no newline, as
+        #  an editor may leave it, is kept and given one.
+        with open(self._PATH, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            keep = self._terminated_length(f)
+            if keep == end:
+                return
+            f.seek(keep)
+            last = next(csv.reader([f.read().decode()]))
+            f.seek(0)
+            header = next(csv.reader([f.readline().decode()]))
+            if keep and len(last) < len(header):
+                f.truncate(keep)
+            else:
+                f.seek(end)
+                f.write(b'\n')
+
+
+class ColumnarLedgerStore(LedgerStore):
+    # One directory per month of transaction dates, one .npy file per column.  Date, Amount (in cents), ID
+    #  and Void are stored typed; every other column is stored as int32 codes into an append-only
+    #  dictionary kept in the schema, with -1 for missing values.  A Sequence column records the append
+    #  order.  The schema is written last, so rows beyond its row count belong to an interrupted append and
+    #  are ignored.
+    def __init__(self, directory=COLUMNAR_LEDGER_PATH, memory_map=True):
+        self._DIRECTORY = directory
+        self._MMAP_MODE = 'r' if memory_map else None
+        self._restore_replaced()
+
+    def exists(self):
+        return os.path.exists(os.path.join(self._DIRECTORY, SCHEMA_FILE))
+
+    def signature(self):
+        return _file_signature(os.path.join(self._DIRECTORY, SCHEMA_FILE))
+
+    def _stored_bytes(self):
+        return sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, names in os.walk(self._DIRECTORY) for name in names)
+
+    def _read_schema(self):
+        if not self.exists():
+            return {'columns': list(), 'dictionaries': dict(), 'rows': 0}
+        with open(os.path.join(self._DIRECTORY, SCHEMA_FILE)) as f:
+            return json.load(f)
+
+    def _write_schema(self, schema):
+        path = os.path.join(self._DIRECTORY, SCHEMA_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(schema, f)
+        os.replace(path + '.tmp', path)
+
+    def partitions(self):
+        if not os.path.exists(self._DIRECTORY):
+            return list()
+        return sorted(name for name in os.listdir(self._DIRECTORY)
+                      if os.path.isdir(os.path.join(self._DIRECTORY, name)))
+
+    @_traced('read')
+    def read(self, columns=None):
+        schema = self._read_schema()
+        if not schema['rows']:
+            return pd.DataFrame()
+        columns = [col for col in schema['columns'] if columns is None or col in columns]
+        frames = [self._read_partition(partition, schema, columns) for partition in self.partitions()]
+        df = pd.concat(frames, ignore_index=True)
+        df = df[df[SEQUENCE] < schema['rows']].sort_values(SEQUENCE, kind='mergesort')
+        del df[SEQUENCE]
+        return df.reset_index(drop=True)
+
+    def columns(self):
+        return list(self._read_schema()['columns'])
+
+    def iter_chunks(self, chunksize):
+        # Partition by partition, so the chunks aren't in ledger order.  Only the rows of the current chunk
+        #  are read into memory when the partitions are memory-mapped.
+        return _traced_chunks(self, self._partition_chunks(chunksize))
+
+    def _partition_chunks(self, chunksize):
+        schema = self._read_schema()
+        for partition in self.partitions():
+            length = len(self._load_column(os.path.join(self._DIRECTORY, partition), SEQUENCE, 0, 'r'))
+            for start in range(0, length, chunksize):
+                chunk = self._read_partition(partition, schema, schema['columns'], start, start + chunksize)
+                chunk = chunk[chunk[SEQUENCE] < schema['rows']].set_index(SEQUENCE)
+                if not chunk.empty:
+                    yield chunk.rename_axis(None)
+
+    def _read_partition(self, partition, schema, columns, start=0, stop=None):
+        directory = os.path.join(self._DIRECTORY, partition)
+        sequence = np.load(os.path.join(directory, SEQUENCE + '.npy'), mmap_mode=self._MMAP_MODE)
+        data = {SEQUENCE: sequence[start:stop]}
+        for col in columns:
+            values = self._load_column(directory, col, len(sequence), self._MMAP_MODE)[start:stop]
+            if col not in TYPED_COLUMNS:
+                # The stored codes become a categorical as they are, without a string per row.
+                values = pd.Categorical.from_codes(values, categories=schema['dictionaries'][col])
+            data[col] = values
+        return pd.DataFrame(data)
+
+    def _load_column(self, directory, col, length, mmap_mode=None):
+        path = os.path.join(directory, col + '.npy')
+        if os.path.exists(path):
+            values = np.load(path, mmap_mode=mmap_mode)
+            if col == 'Amount' and values.dtype.kind == 'f':
+                # Written before amounts were kept in cents.
+                values = money.to_cents(values)
+            return values
+        # The column was added to the ledger after this partition was written.
+        return self._missing(col, length)
+
+    @staticmethod
+    def _missing(col, length):
+        if col == 'Date':
+            return np.full(length, np.datetime64('NaT'), dtype=TYPED_COLUMNS[col])
+        if col in ['Amount', VOID]:
+            return np.zeros(length, dtype=TYPED_COLUMNS[col])
+        if col == ID:
+            return np.full(length, -1, dtype=TYPED_COLUMNS[col])
+        if col == SEQUENCE:
+            return np.full(length, -1, dtype=np.int64)
+        return np.full(length, -1, dtype=np.int32)
+
+    @_traced('append')
+    def append(self, transactions):
+        if transactions.empty:
+            return
+        schema = self._read_schema()
+        os.makedirs(self._DIRECTORY, exist_ok=True)
+        for col in transactions.columns:
+            if col not in schema['columns']:
+                schema['columns'].append(col)
+        encoded = self._encode(transactions, schema)
+        encoded[SEQUENCE] = np.arange(schema['rows'], schema['rows'] + len(transactions), dtype=np.int64)
+        months = pd.Series(encoded['Date'].astype('datetime64[M]').astype(str))
+        for month, positions in months.groupby(months, sort=True).indices.items():
+            self._append_to_partition(month, {col: values[positions] for col, values in encoded.items()},
+                                      schema)
+        schema['rows'] += len(transactions)
+        self._write_schema(schema)
+
+    @staticmethod
+    def _encode(transactions, schema):
+        encoded = dict()
+        for col in transactions.columns:
+            if col == 'Date':
+                encoded[col] = pd.to_datetime(transactions[col]).values.astype(TYPED_COLUMNS[col])
+            elif col == 'Amount':
+                encoded[col] = transactions[col].values.astype(TYPED_COLUMNS[col])
+            elif col == ID:
+                encoded[col] = pd.to_numeric(transactions[col]).fillna(-1).values.astype(TYPED_COLUMNS[col])
+            elif col == VOID:
+                encoded[col] = transactions[col].eq(True).values
+            else:
+                dictionary = schema['dictionaries'].setdefault(col, list())
+                present = transactions[col].notnull().values
+                values = transactions[col][present].astype(str)
+                known = set(dictionary)
+                dictionary.extend(value for value in pd.unique(values) if value not in known)
+                codes = np.full(len(transactions), -1, dtype=np.int32)
+                codes[present] = pd.Categorical(values, categories=dictionary).codes
+                encoded[col] = codes
+        return encoded
+
+    def _append_to_partition(self, partition, encoded, schema):
+        directory = os.path.join(self._DIRECTORY, partition)
+        os.makedirs(directory, exist_ok=True)
+        sequence = self._load_column(directory, SEQUENCE, 0)
+        committed = sequence < schema['rows']
+        for col in schema['columns'] + [SEQUENCE]:
+            existing = self._load_column(directory, col, len(sequence))[committed]
+            new = encoded[col] if col in encoded else self._missing(col, len(encoded[SEQUENCE]))
+            self._save_array(os.path.join(directory, col + '.npy'), np.concatenate([existing, new]))
+
+    @staticmethod
+    def _save_array(path, values):
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, values)
+        os.replace(path + '.tmp', path)
+
+    @_traced('write')
+    def write(self, transactions):
+        # The new ledger is built beside the old one and renamed into place.  A directory with files in it
+        #  can't be replaced, so the old one is moved aside first and deleted last; there is always a whole
+        #  ledger on disk, under the real name or, for a moment, aside.
+        staging = self._DIRECTORY + '.tmp'
+        replaced = self._DIRECTORY + '.old'
+        for directory in [staging, replaced]:
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+        ColumnarLedgerStore(staging).append(transactions)
+        if os.path.exists(self._DIRECTORY):
+            os.replace(self._DIRECTORY, replaced)
+        os.replace(staging, self._DIRECTORY)
+        if os.path.exists(replaced):
+            shutil.rmtree(replaced)
+
+    def _restore_replaced(self):
+        # A write interrupted between moving the old ledger aside and moving the new one in left only the old
+        #  one, which is put back.
+        replaced = self._DIRECTORY + '.old'
+        if os.path.exists(replaced) and not os.path.exists(self._DIRECTORY):
+            os.replace(replaced, self._DIRECTORY)
+
+
+def _file_signature(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def add_id_columns(store):
+    # Rewrites a ledger written before transactions had IDs with its ID and Void columns, which a CSV ledger
+    #  otherwise gains by a rewrite on the first append that carries them.  Returns the number of rows, or
+    #  None if the ledger already has both columns.
+    columns = store.columns()
+    if ID in columns and VOID in columns:
+        return None
+    records = store.read()
+    if ID not in columns:
+        records.insert(0, ID, transaction_ids.ids(records))
+    if VOID not in columns:
+        records[VOID] = False
+    store.write(records)
+    return len(records)
+
+
+def migrate(source, destination, chunksize=100000):
+    rows = 0
+    for chunk in source.iter_chunks(chunksize):
+        destination.append(chunk)
+        rows += len(chunk)
+    return rows
@@ -0,0 +1,26 @@
+from services.lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+# Amounts are held as int64 whole cents everywhere in memory, so sums are exact and need no rounding.  They
+#  are only converted from dollars where they enter (typed or imported amounts, CSV files) and back to
+#  dollars where they are shown or written as text.
+CENTS = 100
+
+
+def to_cents(dollars):
+    # Dollar amounts, as numbers or numeric strings, to an int64 array of cents.  Missing amounts count as
+    #  zero, as they always have in sums.
+    dollars = pd.to_numeric(pd.Series(dollars)).values.astype(float)
+    return np.round(np.where(np.isnan(dollars), 0.0, dollars) * CENTS).astype(np.int64)
+
+
+def to_dollars(cents):
+    return np.asarray(cents, dtype=np.int64) / CENTS
+
+
+def format_dollars(cents):
+    # Cents as dollar strings with two decimal places, for CSV files.
+    return ['%.2f' % dollars for dollars in to_dollars(cents).tolist()]
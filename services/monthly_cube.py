@@ -0,0 +1,74 @@
+from services.ledger_dtypes import text_values
+from services.lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+MONTH = 'Month'
+ACCOUNT_COLUMNS = ['From', 'To']
+PERIOD_MONTHS = {
+    'month': 1,
+    'quarter': 3,
+    'ytd': 12
+}
+
+
+class MonthlyCube:
+    # Summed amounts, in cents, keyed by (Month, From, To, Category1..N).  A report over any run of whole
+    #  months only needs the cells of those months, which are far fewer than the transactions behind them.
+    #  Missing categories are kept as '', which ReportingQueue already treats as missing.
+    def __init__(self, transactions=None):
+        self._CELLS = pd.DataFrame({MONTH: np.array([], dtype='datetime64[M]'), 'From': [], 'To': [],
+                                    'Amount': np.array([], dtype=np.int64)})
+        if transactions is not None:
+            self.add(transactions)
+
+    def __len__(self):
+        return len(self._CELLS)
+
+    def add(self, transactions):
+        if transactions.empty:
+            return
+        cells = pd.DataFrame({MONTH: pd.to_datetime(transactions['Date']).values.astype('datetime64[M]')})
+        for col in ACCOUNT_COLUMNS + self._categories(transactions.columns):
+            cells[col] = text_values(transactions[col])
+        cells['Amount'] = transactions['Amount'].values.astype(np.int64)
+        cells = pd.concat([self._CELLS, cells], sort=False, ignore_index=True)
+        keys = [MONTH] + ACCOUNT_COLUMNS + self._categories(cells.columns)
+        cells[keys[3:]] = cells[keys[3:]].fillna('')
+        self._CELLS = cells.groupby(keys, sort=False)['Amount'].sum().reset_index()
+
+    @staticmethod
+    def _categories(columns):
+        categories = [col for col in columns if col.startswith('Category')]
+        return sorted(categories, key=lambda col: int(col[len('Category'):]))
+
+    def cells(self, start, end):
+        # Cells of the months from `start` to `end`, inclusive, most recent month first.
+        months = self._CELLS[MONTH].values
+        cells = self._CELLS[(months >= np.datetime64(start, 'M')) & (months <= np.datetime64(end, 'M'))]
+        return cells.sort_values(MONTH, ascending=False, kind='mergesort').reset_index(drop=True)
+
+
+def period_months(period, as_of):
+    # Returns the first and last month of the period containing `as_of`, and a label for it.  Year to date
+    #  runs through the end of `as_of`'s month.
+    month = np.datetime64(pd.Timestamp(as_of).strftime('%Y-%m'), 'M')
+    year = month.astype('datetime64[Y]')
+    month_of_year = int((month - year.astype('datetime64[M]')).astype(int))
+    if period == 'month':
+        return month, month, str(month)
+    if period == 'quarter':
+        start = month - month_of_year % 3
+        return start, start + 2, '%s-Q%s' % (year, month_of_year // 3 + 1)
+    if period == 'ytd':
+        return year.astype('datetime64[M]'), month, '%s-YTD' % year
+    raise ValueError("Unknown period %s; expected one of %s" % (period, list(PERIOD_MONTHS.keys())))
+
+
+def previous_period(period, as_of):
+    # A date in the period before the one containing `as_of`: the prior month or quarter, or the same
+    #  months of the prior year for year to date.
+    month = np.datetime64(pd.Timestamp(as_of).strftime('%Y-%m'), 'M')
+    return pd.Timestamp(month - PERIOD_MONTHS[period])
@@ -0,0 +1,112 @@
+from services import bulk_import, money, write_behind
+from services.lazy_imports import lazy_import
+import os
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+TEMPLATES_PATH = './transactions/recurring.csv'
+# Each schedule is a step of so many days or months.  A monthly template started on the 31st falls on the
+#  last day of shorter months.
+SCHEDULES = {
+    'weekly': ('D', 7),
+    'biweekly': ('D', 14),
+    'monthly': ('M', 1),
+    'quarterly': ('M', 3),
+    'yearly': ('M', 12),
+}
+TEMPLATE_COLUMNS = ['Name', 'Schedule', 'Start', 'End', 'From', 'To', 'Memo', 'Amount']
+
+
+class TemplateError(ValueError):
+    pass
+
+
+# Memorized transactions are templates, one CSV row each: a name, a schedule, the first date it falls on, an
+#  optional last date, and the transaction as it is written to the ledger (amount in dollars, and any
+#  categories).  A template is validated once, as a single transaction would be, and every occurrence in a
+#  date range is then generated from it at once, so a year of rent or paychecks doesn't go through the
+#  prompts one transaction at a time.
+
+
+def read_templates(path=TEMPLATES_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=TEMPLATE_COLUMNS)
+    return pd.read_csv(path, dtype=str)
+
+
+def add_template(template, path=TEMPLATES_PATH):
+    # `template` is a dict of TEMPLATE_COLUMNS and categories.  Raises TemplateError for an unknown schedule or
+    #  a name already in use.
+    if template['Schedule'] not in SCHEDULES:
+        raise TemplateError("Unknown schedule %s; expected one of %s" % (template['Schedule'], list(SCHEDULES)))
+    template = dict((key, value) for key, value in template.items() if pd.notnull(value))
+    templates = read_templates(path)
+    if template['Name'] in templates['Name'].tolist():
+        raise TemplateError("A memorized transaction is already named %s" % template['Name'])
+    templates = pd.concat([templates, pd.DataFrame([template], dtype=str)], ignore_index=True)
+    write_behind.write_atomically(path, lambda f: templates.to_csv(f, index=False))
+    return templates
+
+
+def validate_templates(templates, accounts, vocabulary):
+    # Returns the valid templates, with ledger columns as bulk_import.validate_transactions gives them and
+    #  their Schedule, Start and End, and the invalid ones with a Reason column.
+    templates = templates.reset_index(drop=True)
+    reasons = pd.Series('', index=templates.index)
+    reasons[~templates['Schedule'].isin(list(SCHEDULES))] = 'unknown schedule'
+    starts, ends = bulk_import.parse_dates(templates['Start']), bulk_import.parse_dates(templates['End'])
+    reasons[(reasons == '') & templates['End'].notnull() & ends.isnull()] = 'invalid end date'
+    reasons[(reasons == '') & (ends < starts)] = 'ends before it starts'
+    checked = reasons == ''
+    accepted, rejected = bulk_import.validate_transactions(
+        templates[checked].assign(Date=templates['Start']).drop(columns=['Name', 'Schedule', 'Start', 'End']),
+        accounts, vocabulary)
+    reasons[rejected.index] = rejected['Reason']
+    accepted = accepted.assign(Schedule=templates['Schedule'], End=ends).rename(columns={'Date': 'Start'})
+    rejected = templates[reasons != ''].assign(Reason=reasons[reasons != ''])
+    return accepted, rejected
+
+
+def materialize(templates, start, end):
+    # Every occurrence of the valid `templates` from `start` to `end`, inclusive, as ledger rows in date
+    #  order, and in template order within a day.
+    columns = [col for col in templates.columns if col not in ['Schedule', 'Start', 'End']]
+    if templates.empty:
+        return pd.DataFrame(columns=['Date'] + columns)
+    first = np.datetime64(pd.Timestamp(start), 'D')
+    last = np.minimum(templates['End'].fillna(pd.Timestamp(end)).values.astype('datetime64[D]'),
+                      np.datetime64(pd.Timestamp(end), 'D'))
+    starts = templates['Start'].values.astype('datetime64[D]')
+    units, steps = zip(*[SCHEDULES[schedule] for schedule in templates['Schedule']])
+    months, steps = np.array(units) == 'M', np.array(steps)
+    # Occurrence k of a template is k steps after its start.  The range of k is found in whole days or
+    #  months, and the few occurrences it takes in that fall outside the dates are dropped.
+    start_months = starts.astype('datetime64[M]')
+    offsets = np.where(months, (first.astype('datetime64[M]') - start_months).astype(np.int64),
+                       (first - starts).astype(np.int64))
+    spans = np.where(months, (last.astype('datetime64[M]') - start_months).astype(np.int64),
+                     (last - starts).astype(np.int64))
+    low = np.maximum(-(-offsets // steps), 0)
+    counts = np.maximum(spans // steps - low + 1, 0)
+    template = np.repeat(np.arange(len(templates)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + low[template]
+    month = start_months[template] + k * steps[template]
+    days_in_month = ((month + 1).astype('datetime64[D]') - month.astype('datetime64[D]')).astype(np.int64)
+    day_of_month = (starts - start_months.astype('datetime64[D]')).astype(np.int64)[template]
+    dates = np.where(months[template], month.astype('datetime64[D]') + np.minimum(day_of_month, days_in_month - 1),
+                     starts[template] + k * steps[template])
+    keep = (dates >= first) & (dates <= last[template])
+    template, dates = template[keep], dates[keep]
+    order = np.lexsort((template, dates))
+    rows = templates[columns].iloc[template[order]].reset_index(drop=True)
+    rows.insert(0, 'Date', pd.to_datetime(dates[order]))
+    return rows
+
+
+def staged(rows):
+    # As Transaction saves them: a MM/DD/YYYY date, dollars, and only the categories given.
+    rows = rows.assign(Date=rows['Date'].dt.strftime('%m/%d/%Y'), Amount=money.format_dollars(rows['Amount']))
+    return [dict((key, value) for key, value in row.items() if pd.notnull(value) and value != '')
+            for row in rows.to_dict('records')]
@@ -0,0 +1,92 @@
+from services import write_behind
+from services.lazy_imports import lazy_import
+import json
+import os
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+REPORT_CACHE_PATH = './reports/cache'
+# Bumped whenever what is cached, or how a report is built from it, changes.
+VERSION = 2
+# What a report reads from each row, besides the categories.
+REPORT_COLUMNS = ['To', 'Amount']
+
+
+# A report's category tree is kept on disk, one file per report name (its type and filter, as in the name of
+#  the report file), keyed by a fingerprint of the rows it was built from: their count and the sum of a hash
+#  of each row.  A repeated report whose rows haven't changed is served from the file.  Otherwise only the
+#  top-level categories whose own rows changed are rolled up again.  Rows are hashed with their position, and
+#  a ledger row never changes once it is at a position, so a report over rows that were all there before
+#  has the same fingerprint however much was appended after them.
+def row_hashes(transactions):
+    # One uint64 per row of `transactions` over the columns a report reads and the row's index.  A missing
+    #  value, or column, hashes the same whatever its dtype.
+    hashes = pd.util.hash_pandas_object(pd.Series(transactions.index), index=False).values
+    columns = REPORT_COLUMNS + [col for col in transactions.columns if col.startswith('Category')]
+    for col in columns:
+        if col not in transactions.columns:
+            continue
+        values = transactions[col]
+        if col.startswith('Category'):
+            values = values.where(values != '')
+        column = pd.util.hash_pandas_object(values, index=False, hash_key=('%016s' % col)[-16:]).values
+        hashes = hashes + np.where(values.isnull().values, np.uint64(0), column)
+    return pd.util.hash_array(hashes)
+
+
+def fingerprint(hashes):
+    # Sums wrap around at 2 ** 64, so the fingerprint of a set of rows can be kept up to date as rows are added.
+    return _fingerprint(len(hashes), np.sum(hashes, dtype=np.uint64))
+
+
+def group_fingerprints(codes, hashes, groups):
+    # The fingerprint of each of `groups` groups of rows, numbered by `codes` as pd.factorize numbers them;
+    #  rows coded -1 are in no group.
+    grouped = codes >= 0
+    counts = np.bincount(codes[grouped], minlength=groups)
+    sums = np.zeros(groups, dtype=np.uint64)
+    np.add.at(sums, codes[grouped], hashes[grouped])
+    return [_fingerprint(count, total) for count, total in zip(counts.tolist(), sums.tolist())]
+
+
+def _fingerprint(count, total):
+    return '%d-%016x' % (count, int(total))
+
+
+def _path(name):
+    return os.path.join(REPORT_CACHE_PATH, name + '.json')
+
+
+def read(name):
+    # The cached entry for the report `name`, or None.
+    path = _path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        entry = json.load(f)
+    return entry if entry.get('version') == VERSION else None
+
+
+def write(name, entry):
+    # Written in place of the old entry at once, so a report run in a worker process has its entry on disk
+    #  by the time the worker exits.
+    os.makedirs(REPORT_CACHE_PATH, exist_ok=True)
+    entry = dict(entry, version=VERSION)
+    # Encoded in one go; json.dump writes each token separately, which is many times slower.
+    write_behind.write_atomically(_path(name), lambda f: f.write(json.dumps(entry)))
+
+
+def dump_nodes(nodes):
+    # Nodes, keyed by category path, as JSON: amounts as ints and missing To names, NaN, as None.
+    return [[list(path), int(node.amount), list(node.sub_categories),
+             [[to if to == to else None, int(amount)] for to, amount in node.to_amounts]]
+            for path, node in nodes.items()]
+
+
+def load_nodes(dumped, node_type):
+    return dict((tuple(path), node_type(amount=amount, sub_categories=sub_categories,
+                                        to_amounts=[(np.nan if to is None else to, amount)
+                                                    for to, amount in to_amounts]))
+                for path, amount, sub_categories, to_amounts in dumped)
@@ -0,0 +1,95 @@
+from services import report_cache
+from services.reporting_queue import ReportingQueue
+from services.lazy_imports import lazy_import
+from collections import namedtuple
+import os
+
+futures = lazy_import('concurrent.futures')
+multiprocessing = lazy_import('multiprocessing')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+REPORT_TYPES = ['Income', 'Expense']
+
+# `start` and `end` are inclusive dates, or None for an open end; `account` limits the report to money
+#  into (income) or out of (expense) that one account.
+ReportJob = namedtuple("ReportJob", ["category", "label", "start", "end", "account"])
+
+Ledger = namedtuple("Ledger", ["transactions", "days", "masks", "hashes"])
+
+# Set in each worker, and in this process for inline runs, by _set_ledger.
+_LEDGER = None
+
+
+def report_mask(transactions, category, accounts):
+    # Income is money into the accounts from outside them; an expense is money out of them to outside them.
+    into, out_of = transactions['To'].isin(accounts).values, transactions['From'].isin(accounts).values
+    return into & ~out_of if category == 'Income' else out_of & ~into
+
+
+def yearly_jobs(transactions, accounts):
+    # Every report type for the whole ledger, then for each year, then for each account within each year.
+    jobs = [ReportJob(category, None, None, None, None) for category in REPORT_TYPES]
+    if transactions.empty:
+        return jobs
+    years = sorted(set(pd.to_datetime(transactions['Date']).dt.year.tolist()))
+    for year in years:
+        start, end = pd.Timestamp(year=year, month=1, day=1), pd.Timestamp(year=year, month=12, day=31)
+        jobs += [ReportJob(category, str(year), start, end, None) for category in REPORT_TYPES]
+        jobs += [ReportJob(category, '%s_%s' % (year, account), start, end, account)
+                 for account in sorted(accounts) for category in REPORT_TYPES]
+    return jobs
+
+
+def run_reports(transactions, accounts, jobs, workers=None, quiet=False, row_hashes=None):
+    # Runs each job's ReportingQueue and returns the paths of the reports, in the order they were written.
+    #  With more than one worker the jobs are spread over a process pool.  Workers are forked where the
+    #  platform allows it, so they share this process's copy of the ledger instead of each receiving one.
+    #  Reports are memoized in the report cache by their rows' hashes, which are taken from `row_hashes`,
+    #  aligned with `transactions`, when the caller keeps them up to date.
+    if row_hashes is None:
+        row_hashes = report_cache.row_hashes(transactions)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    paths = list()
+    if workers <= 1:
+        _set_ledger(transactions, accounts, row_hashes)
+        for job in jobs:
+            paths.append(_run_job(job))
+            if not quiet:
+                print("Wrote %s" % paths[-1])
+        return paths
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with futures.ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_set_ledger,
+                                     initargs=(transactions, accounts, row_hashes)) as pool:
+        submitted = [pool.submit(_run_job, job) for job in jobs]
+        for future in futures.as_completed(submitted):
+            paths.append(future.result())
+            if not quiet:
+                print("Wrote %s" % paths[-1])
+    return paths
+
+
+def _set_ledger(transactions, accounts, hashes):
+    global _LEDGER
+    days = pd.to_datetime(transactions['Date']).values.astype('datetime64[D]') if not transactions.empty \
+        else np.array([], dtype='datetime64[D]')
+    masks = dict((category, report_mask(transactions, category, accounts)) for category in REPORT_TYPES)
+    _LEDGER = Ledger(transactions=transactions, days=days, masks=masks, hashes=np.asarray(hashes))
+
+
+def _run_job(job):
+    transactions, days, masks, hashes = _LEDGER
+    mask = masks[job.category]
+    if job.start is not None:
+        mask = mask & (days >= np.datetime64(job.start, 'D'))
+    if job.end is not None:
+        mask = mask & (days <= np.datetime64(job.end, 'D'))
+    if job.account is not None:
+        account_column = 'To' if job.category == 'Income' else 'From'
+        mask = mask & (transactions[account_column] == job.account).values
+    return ReportingQueue(transactions[mask], job.category, period=job.label, row_hashes=hashes[mask]).run_report()
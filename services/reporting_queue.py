@@ -1,83 +1,231 @@
-from collections import namedtuple
+from services import instrumentation, money, report_cache
+from services.lazy_imports import lazy_import
+from collections import defaultdict, deque, namedtuple
 from datetime import datetime
-import pandas as pd
+import os
 
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
-QueueElement = namedtuple("QueueElement", ["category", "category_path", "prior_categories", "prior_amounts"])
+
+QueueElement = namedtuple("QueueElement", ["category", "category_path", "path", "ancestors"])
+# Ancestors form a linked chain from the nearest category up to the report type, so siblings share their
+#  parents' chain instead of each carrying its own copy.
+Ancestor = namedtuple("Ancestor", ["category", "amount", "parent"])
+Node = namedtuple("Node", ["amount", "sub_categories", "to_amounts"])
 
 
 class ReportingQueue:
-    def __init__(self, transactions, category):
+    def __init__(self, transactions, category, period=None, row_hashes=None):
+        # With the `row_hashes` of `transactions`, from report_cache.row_hashes, the category tree is memoized
+        #  in the report cache.
         self.REPORT = list()
-        self._DF = transactions.copy()
-        self._QUEUE = self._create_queue(category)
+        # Only read, so the rows are shared with the caller's frame rather than copied.
+        self._DF = transactions.reset_index(drop=True)
         self._TYPE = category
+        self._PERIOD = period
+        self._CACHE_ENTRY = None
+        self._NODES = self._roll_up() if row_hashes is None else self._memoized_roll_up(np.asarray(row_hashes))
+        self._QUEUE = self._create_queue(category)
+
+    def _name(self):
+        return self._TYPE if self._PERIOD is None else '%s_%s' % (self._TYPE, self._PERIOD)
 
     def run_report(self):
-        while self._QUEUE:
-            self._add_level_to_report(self._QUEUE[0])
-            self._QUEUE = self._QUEUE[1:]
-        self.REPORT = pd.DataFrame(self.REPORT)
-        self._order_columns()
-        self.REPORT.to_csv('./reports/%s_%s.csv' %
-                           (self._TYPE, datetime.strftime(datetime.today(), '%Y%m%d')), index=False)
+        with instrumentation.span('report.run', type=self._TYPE, period=self._PERIOD, rows=len(self._DF),
+                                  nodes=len(self._NODES)) as fields:
+            path = self._report_path(self._name())
+            if self._CACHE_ENTRY is not None and self._CACHE_ENTRY.get('path') == path and os.path.exists(path):
+                # The same report, from the same rows, was already written to this path.
+                fields.update(cached=True)
+                return path
+            while self._QUEUE:
+                self._add_level_to_report(self._QUEUE.popleft())
+            self.REPORT = pd.DataFrame(self.REPORT)
+            self._order_columns()
+            self.REPORT.to_csv(path, index=False)
+            fields.update(lines=len(self.REPORT), bytes_written=os.path.getsize(path))
+            if self._CACHE_ENTRY is not None:
+                self._CACHE_ENTRY['path'] = path
+                report_cache.write(self._name(), self._CACHE_ENTRY)
+        return path
+
+    def _memoized_roll_up(self, row_hashes):
+        # Served whole from the report cache when the rows haven't changed.  Otherwise the top-level
+        #  categories whose rows are unchanged keep their cached sub-trees, and the rest of the rows are rolled
+        #  up again; the report type's own node is always redone, as it covers every row.  The entry is saved
+        #  by run_report, once the report is written.
+        key = report_cache.fingerprint(row_hashes)
+        entry = report_cache.read(self._name())
+        with instrumentation.span('report.cache', type=self._TYPE, period=self._PERIOD) as fields:
+            if entry is not None and entry['key'] == key:
+                self._CACHE_ENTRY = entry
+                fields.update(hit='report')
+                return self._load_entry(entry)
+            cached = dict() if entry is None else entry['subtrees']
+            # Top-level categories in order of first appearance, each with the fingerprint of its rows.
+            codes, categories = pd.factorize(self._DF['Category1'].where(self._DF['Category1'] != '')) \
+                if 'Category1' in self._DF.columns else (np.full(len(self._DF), -1), [])
+            keys = dict(zip(categories, report_cache.group_fingerprints(codes, row_hashes, len(categories))))
+            reused = [code for code, category in enumerate(categories)
+                      if category in cached and cached[category]['key'] == keys[category]]
+            fields.update(hit='%s of %s categories' % (len(reused), len(keys)))
+            if not reused:
+                nodes = self._roll_up()
+            else:
+                nodes = self._roll_up(self._DF[~np.isin(codes, reused)].reset_index(drop=True))
+                for code in reused:
+                    nodes.update(report_cache.load_nodes(cached[categories[code]]['nodes'], Node))
+                nodes[()] = nodes[()]._replace(amount=self._DF['Amount'].fillna(0).values.astype(np.int64).sum(),
+                                               sub_categories=list(categories))
+            reused = set(categories[code] for code in reused)
+        # Only the report type's node and the sub-trees are stored; the whole tree is put back together from them.
+        changed = defaultdict(dict)
+        for path, node in nodes.items():
+            if path and path[0] not in reused:
+                changed[path[0]][path] = node
+        subtrees = dict((category, cached[category] if category in reused else
+                         {'key': subtree_key, 'nodes': report_cache.dump_nodes(changed[category])})
+                        for category, subtree_key in keys.items())
+        self._CACHE_ENTRY = {'key': key, 'path': None, 'root': report_cache.dump_nodes({(): nodes[()]}),
+                             'subtrees': subtrees}
+        return nodes
+
+    @staticmethod
+    def _load_entry(entry):
+        nodes = report_cache.load_nodes(entry['root'], Node)
+        for subtree in entry['subtrees'].values():
+            nodes.update(report_cache.load_nodes(subtree['nodes'], Node))
+        return nodes
+
+    def run_comparison(self, previous):
+        # Lists every category's amount next to its amount in `previous`, a report of the same type over an
+        #  earlier period: this report's categories in report order, then those only the earlier one has.
+        paths = self._paths()
+        paths += [path for path in previous._paths() if path not in self._NODES]
+        rows = list()
+        for path in paths:
+            current = self._NODES[path].amount if path in self._NODES else 0
+            prior = previous._NODES[path].amount if path in previous._NODES else 0
+            rows.append({'Category': ' | '.join((self._TYPE,) + path),
+                         self._PERIOD: current / money.CENTS,
+                         previous._PERIOD: prior / money.CENTS,
+                         'Change': (current - prior) / money.CENTS,
+                         '% Change': round((current - prior) / prior * 100, 2) if prior else np.nan})
+        comparison = pd.DataFrame(rows, columns=['Category', self._PERIOD, previous._PERIOD, 'Change', '% Change'])
+        comparison.to_csv(self._report_path('%s_%s_vs_%s' % (self._TYPE, self._PERIOD, previous._PERIOD)),
+                          index=False)
+        return comparison
+
+    def _paths(self):
+        # Category paths in the order the report lists them, level by level.
+        paths = [tuple()]
+        for path in paths:
+            paths.extend(path + (sub_cat,) for sub_cat in self._NODES[path].sub_categories)
+        return paths
+
+    @staticmethod
+    def _report_path(name):
+        return './reports/%s_%s.csv' % (name, datetime.strftime(datetime.today(), '%Y%m%d'))
 
     @staticmethod
     def _create_queue(category):
-        return [QueueElement(category=category, category_path=category, prior_categories=list(),
-                             prior_amounts=list())]
+        return deque([QueueElement(category=category, category_path=category, path=tuple(), ancestors=None)])
+
+    def _roll_up(self, df=None):
+        # Builds every node of the category tree, keyed by its path of categories below the report type.
+        #  Each level is grouped once over the whole frame; a node's amount is summed over its own rows in
+        #  frame order and its sub-categories are listed in order of first appearance.
+        df = self._DF if df is None else df
+        # Amounts are summed in cents, so every total is exact.  Missing amounts count as zero, as they do
+        #  in a pandas sum.
+        amounts = df['Amount'].fillna(0).values.astype(np.int64)
+        to_codes, to_values = pd.factorize(df['To'])
+        to_values = np.asarray(to_values, dtype=object)
+        nodes = dict()
+        node_rows = {(): np.arange(len(df))}
+        level_columns = list()
+        level = 1
+        while node_rows:
+            with instrumentation.span('report.level', level=level, nodes=len(node_rows)):
+                column = 'Category%s' % str(level)
+                if column in df.columns:
+                    level_columns.append(df[column].where(df[column] != ''))
+                    empty = level_columns[-1].isnull().values
+                    groups = self._group_rows(level_columns)
+                else:
+                    empty = np.ones(len(df), dtype=bool)
+                    groups = dict()
+
+                sub_categories = defaultdict(list)
+                for path, rows in groups.items():
+                    sub_categories[path[:-1]].append((rows[0], path[-1]))
+                to_amounts = self._sum_by_to(node_rows, empty, to_codes, to_values, amounts)
+                for path, rows in node_rows.items():
+                    nodes[path] = Node(amount=amounts[rows].sum(),
+                                       sub_categories=[sub_cat for _, sub_cat in sorted(sub_categories[path])],
+                                       to_amounts=to_amounts[path])
+                node_rows = groups
+            level += 1
+        return nodes
+
+    @staticmethod
+    def _group_rows(level_columns):
+        keys = pd.concat(level_columns, axis=1)
+        groups = keys.groupby(list(keys.columns), sort=False, observed=True).indices
+        return {(path if isinstance(path, tuple) else (path,)): np.sort(rows) for path, rows in groups.items()}
+
+    @staticmethod
+    def _sum_by_to(node_rows, empty, to_codes, to_values, amounts):
+        # Rows of a node with nothing at the next category level are reported by their To instead.  All
+        #  nodes of a level are grouped together, by (node, To), in a single pass.
+        paths = list(node_rows.keys())
+        node_of_row = np.full(len(empty), -1)
+        for number, path in enumerate(paths):
+            node_of_row[node_rows[path]] = number
+        rows = np.flatnonzero(empty & (node_of_row >= 0))
+        keys = pd.DataFrame({'node': node_of_row[rows], 'to': to_codes[rows]})
+        to_amounts = defaultdict(list)
+        for (number, code), positions in keys.groupby(['node', 'to'], sort=False).indices.items():
+            group_rows = rows[np.sort(positions)]
+            to_amounts[paths[number]].append((group_rows[0], code, amounts[group_rows].sum()))
+        return {path: [(to_values[code] if code >= 0 else np.nan, amount)
+                       for _, code, amount in sorted(to_amounts[path])] for path in paths}
 
     def _add_level_to_report(self, qe):
         if self.REPORT:
             self.REPORT.append(dict())
 
-        category, category_path, prior_categories, prior_amounts = \
-            qe.category, qe.category_path, qe.prior_categories, qe.prior_amounts
-        df = self._determine_subset(prior_categories, category)
-        level = len(prior_categories) + 1
-        amount = df['Amount'].sum()
-        line_dict = {'Category': '%s: $%s' % (category_path, str(amount))}
+        category, category_path, path = qe.category, qe.category_path, qe.path
+        node = self._NODES[path]
+        line_dict = {'Category': '%s: $%s' % (category_path, self._dollars(node.amount))}
         self.REPORT.append(line_dict)
 
-        if 'Category%s' % str(level) in df.columns:
-            df['Category%s' % str(level)] = df['Category%s' % str(level)].fillna('')
-        else:
-            df['Category%s' % str(level)] = ''
-        sub_categories_full = df['Category%s' % str(level)].unique()
-        sub_categories = [c for c in sub_categories_full if c]
-
-        prior_categories = [category] + prior_categories
-        prior_amounts = [amount] + prior_amounts
+        ancestors = Ancestor(category=category, amount=node.amount, parent=qe.ancestors)
 
-        for sub_cat in sub_categories:
+        for sub_cat in node.sub_categories:
             self._QUEUE.append(QueueElement(category=sub_cat,
                                             category_path='%s | %s' % (category_path, sub_cat),
-                                            prior_categories=prior_categories,
-                                            prior_amounts=prior_amounts))
-
-            alt_level = 1
-            if not prior_categories:
-                break
-            line_dict = {'Category': sub_cat}
-            for prior_cat, prior_amt in zip(prior_categories, prior_amounts):
-                sub_amt = df.loc[df['Category%s' % str(level)] == sub_cat, 'Amount'].sum()
-                sub_prc = round(float(sub_amt) / float(prior_amt) * float(100), 2)
-                line_dict['%s%s' % ('%', str(alt_level))] = '%s%s of %s' % (sub_prc, '%', prior_cat)
-                alt_level += 1
-            self.REPORT.append(line_dict)
-
-        empty_df = df[df['Category%s' % str(level)] == ''].copy()
-        if not empty_df.empty:
-            self._analyze_to(prior_categories, prior_amounts, empty_df)
-
-    def _determine_subset(self, prior_categories, new_category):
-        df = self._DF.copy()
-        prior_categories = [new_category] + prior_categories
-        level = len(prior_categories[:-1])
-        for category in prior_categories[:-1]:
-            df = df[df['Category%s' % level] == category]
-            level -= 1
-        return df
+                                            path=path + (sub_cat,),
+                                            ancestors=ancestors))
+            self._add_percentages({'Category': sub_cat}, self._NODES[path + (sub_cat,)].amount, ancestors)
+
+        if node.to_amounts:
+            self._analyze_to(ancestors, node.to_amounts)
+
+    @staticmethod
+    def _walk_ancestors(ancestors):
+        while ancestors is not None:
+            yield ancestors.category, ancestors.amount
+            ancestors = ancestors.parent
+
+    def _add_percentages(self, line_dict, sub_amt, ancestors):
+        alt_level = 1
+        for prior_cat, prior_amt in self._walk_ancestors(ancestors):
+            sub_prc = round(float(sub_amt) / float(prior_amt) * float(100), 2)
+            line_dict['%s%s' % ('%', str(alt_level))] = '%s%s of %s' % (sub_prc, '%', prior_cat)
+            alt_level += 1
+        self.REPORT.append(line_dict)
 
     def _order_columns(self):
         df = self.REPORT.copy()
@@ -88,16 +236,11 @@ class ReportingQueue:
         df = df[output_columns]
         self.REPORT = df.copy()
 
-    def _analyze_to(self, prior_categories, prior_amounts, df):
-        df = df.copy()
-        sub_categories = list(df["To"].unique())
-        for sub_cat in sub_categories:
-            alt_level = 1
-            line_dict = {'Category':
-                         '{} ${}'.format(sub_cat, str(df.loc[df['To'] == sub_cat, 'Amount'].sum()))}
-            for prior_cat, prior_amt in zip(prior_categories, prior_amounts):
-                sub_amt = df.loc[df['To'] == sub_cat, 'Amount'].sum()
-                sub_prc = round(float(sub_amt) / float(prior_amt) * float(100), 2)
-                line_dict['%s%s' % ('%', str(alt_level))] = '%s%s of %s' % (sub_prc, '%', prior_cat)
-                alt_level += 1
-            self.REPORT.append(line_dict)
+    def _analyze_to(self, ancestors, to_amounts):
+        for sub_cat, sub_amt in to_amounts:
+            self._add_percentages({'Category': '{} ${}'.format(sub_cat, self._dollars(sub_amt))}, sub_amt,
+                                  ancestors)
+
+    @staticmethod
+    def _dollars(cents):
+        return str(cents / money.CENTS)
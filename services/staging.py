@@ -0,0 +1,61 @@
+import json
+import os
+
+
+UNRECONCILED_PATH = './transactions/unreconciled'
+JOURNAL_FILE = 'staged.jsonl'
+RECONCILING_FILE = 'reconciling.jsonl'
+
+
+class StagingJournal:
+    # New transactions are appended as JSON lines to one journal, fsynced once per batch.  Reconciliation
+    #  renames the journal aside (atomically), so anything staged while the ledger is being updated goes
+    #  into a fresh journal, and deletes the renamed file once the ledger has the rows.  One-file-per-
+    #  transaction JSON written by older versions is still picked up.
+    def __init__(self, directory=UNRECONCILED_PATH):
+        self._DIRECTORY = directory
+        self._LEGACY_FILES = list()
+
+    def _path(self, name):
+        return os.path.join(self._DIRECTORY, name)
+
+    def stage(self, transactions):
+        lines = ''.join(json.dumps(transaction) + '\n' for transaction in transactions)
+        with open(self._path(JOURNAL_FILE), 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def begin_reconciliation(self):
+        # A reconciling file left behind by an interrupted reconciliation is picked up again first.
+        if os.path.exists(self._path(JOURNAL_FILE)) and not os.path.exists(self._path(RECONCILING_FILE)):
+            os.replace(self._path(JOURNAL_FILE), self._path(RECONCILING_FILE))
+        self._LEGACY_FILES = sorted(name for name in os.listdir(self._DIRECTORY) if name.endswith('.json'))
+        transactions = self._read_journal(self._path(RECONCILING_FILE))
+        for name in self._LEGACY_FILES:
+            with open(self._path(name)) as f:
+                transactions.append(json.load(f))
+        return transactions
+
+    def end_reconciliation(self):
+        if os.path.exists(self._path(RECONCILING_FILE)):
+            os.remove(self._path(RECONCILING_FILE))
+        for name in self._LEGACY_FILES:
+            os.remove(self._path(name))
+        self._LEGACY_FILES = list()
+
+    @staticmethod
+    def _read_journal(path):
+        if not os.path.exists(path):
+            return list()
+        with open(path) as f:
+            lines = [line for line in f.read().split('\n') if line.strip()]
+        transactions = list()
+        for number, line in enumerate(lines):
+            try:
+                transactions.append(json.loads(line))
+            except ValueError:
+                # Only the last line can be torn, by a crash in the middle of a write.
+                if number != len(lines) - 1:
+                    raise
+        return transactions
@@ -0,0 +1,86 @@
+from services import transaction_ids
+from services.balance_engine import calculate_balances
+from services.ledger_dtypes import DATE_DTYPE, text_values
+from services.lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+DEFAULT_CHUNKSIZE = 100000
+MONTH = 'Month'
+ACCOUNT_COLUMNS = ['From', 'To']
+# Kept for each summary cell so the cells can be put in the order the ledger's own rows would be reported in:
+#  its latest date, its largest amount on that date and the ledger position of the first such row.
+LARGEST = 'Largest'
+FIRST = 'First'
+
+
+# Recalculation and reports for ledgers too large to hold in memory.  The ledger is read `chunksize` rows at
+#  a time and each chunk is folded into running totals, so memory depends on the chunk size and on the
+#  number of distinct accounts and categories, not on the length of the ledger.
+def stream_balances(ledger, balances, chunksize=DEFAULT_CHUNKSIZE):
+    # Applies every row of `ledger` to `balances`, in cents.  Returns the new balances and the rows read.
+    rows = 0
+    for chunk in ledger.iter_chunks(chunksize):
+        balances = calculate_balances(balances, chunk)
+        rows += len(chunk)
+    return balances, rows
+
+
+def report_summary(ledger, chunksize=DEFAULT_CHUNKSIZE):
+    # The ledger summed by (month, From, To, Category1..N), as rows that the income and expense reports, for
+    #  the whole ledger or a year of it, turn into the same reports as the full ledger.  Each row is dated
+    #  with the latest date of its transactions and the rows are in the ledger's report order, latest first,
+    #  so categories are listed in the same order too.  Missing categories are ''.  Void rows and the rows
+    #  they cancel are left out, which takes a first pass over the ledger if anything was ever voided.
+    last_voided = _last_voids(ledger, chunksize) if transaction_ids.VOID in ledger.columns() else dict()
+    cells = None
+    for chunk in ledger.iter_chunks(chunksize):
+        if last_voided:
+            chunk = chunk[transaction_ids.live_mask(chunk, last_voided)]
+        cells = _merge(_summarize(chunk) if cells is None else pd.concat([cells, _summarize(chunk)], sort=False,
+                                                                           ignore_index=True))
+    if cells is None:
+        return pd.DataFrame()
+    cells = cells.sort_values(['Date'] + ACCOUNT_COLUMNS + [LARGEST, FIRST], ascending=[False] * 4 + [True],
+                              kind='mergesort')
+    return cells.drop(columns=[MONTH, LARGEST, FIRST]).reset_index(drop=True)
+
+
+def _last_voids(ledger, chunksize):
+    last_voided = dict()
+    for chunk in ledger.iter_chunks(chunksize):
+        for transaction_id, position in transaction_ids.last_voids(chunk).items():
+            last_voided[transaction_id] = max(position, last_voided.get(transaction_id, position))
+    return last_voided
+
+
+def _categories(columns):
+    categories = [col for col in columns if col.startswith('Category')]
+    return sorted(categories, key=lambda col: int(col[len('Category'):]))
+
+
+def _summarize(chunk):
+    # Chunks are indexed by ledger position.
+    dates = pd.to_datetime(chunk['Date']).values.astype(DATE_DTYPE)
+    amounts = chunk['Amount'].values.astype(np.int64)
+    cells = pd.DataFrame({MONTH: dates.astype('datetime64[M]'), 'Date': dates})
+    for col in ACCOUNT_COLUMNS + _categories(chunk.columns):
+        cells[col] = text_values(chunk[col])
+    cells['Amount'] = amounts
+    cells[LARGEST] = amounts
+    cells[FIRST] = chunk.index.values
+    return cells
+
+
+def _merge(cells):
+    # Collapses cells with the same key into one, keeping the latest date, largest amount and first position
+    #  among them.  A category level first seen in a later chunk is '' in the earlier cells.
+    keys = [MONTH] + ACCOUNT_COLUMNS + _categories(cells.columns)
+    cells[keys[3:]] = cells[keys[3:]].fillna('')
+    cells = cells.sort_values(['Date', LARGEST, FIRST], ascending=[False, False, True], kind='mergesort')
+    grouped = cells.groupby(keys, sort=False)
+    merged = grouped[['Date', LARGEST, FIRST]].first()
+    merged['Amount'] = grouped['Amount'].sum()
+    return merged.reset_index()
@@ -0,0 +1,33 @@
+import unittest
+import pandas as pd
+from services.balance_engine import calculate_balances
+
+
+class TestBalanceEngine(unittest.TestCase):
+    BALANCES = {'Checking': 10000, 'Savings': 5000}
+
+    def test_matches_row_by_row_application(self):
+        transactions = pd.DataFrame({
+            'From': ['Checking', 'Employer', 'Checking', 'Savings'],
+            'To': ['Grocery Store', 'Checking', 'Savings', 'Landlord'],
+            'Amount': [1235, 100000, 20010, 10],
+        })
+        expected = dict(self.BALANCES)
+        for index, trans in transactions.iterrows():
+            if trans['From'] in expected.keys():
+                expected[trans['From']] -= trans['Amount']
+            if trans['To'] in expected.keys():
+                expected[trans['To']] += trans['Amount']
+        self.assertEqual(expected, calculate_balances(self.BALANCES, transactions))
+
+    def test_no_transactions(self):
+        self.assertEqual(self.BALANCES, calculate_balances(self.BALANCES, pd.DataFrame()))
+
+    def test_does_not_mutate_input(self):
+        transactions = pd.DataFrame({'From': ['Checking'], 'To': ['Savings'], 'Amount': [500]})
+        calculate_balances(self.BALANCES, transactions)
+        self.assertEqual(10000, self.BALANCES['Checking'])
+
+
+if __name__ == "__main__":
+    unittest.main()
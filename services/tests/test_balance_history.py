@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+import pandas as pd
+from services.balance_history import BalanceHistory
+
+
+class TestBalanceHistory(unittest.TestCase):
+    ACCOUNTS = ['Checking', 'Savings']
+
+    @staticmethod
+    def make_ledger(rows, seed=0):
+        rng = np.random.RandomState(seed)
+        names = np.array(['Checking', 'Savings', 'Employer', 'Cafe'])
+        return pd.DataFrame({
+            'Date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.randint(0, 60, rows), unit='D'),
+            'From': names[rng.randint(0, 4, rows)],
+            'To': names[rng.randint(0, 4, rows)],
+            'Amount': rng.randint(1, 10000, rows),
+        })
+
+    def expected(self, ledger, account, date):
+        ledger = ledger[ledger['Date'] <= pd.Timestamp(date)]
+        return int(ledger['Amount'][ledger['To'] == account].sum() - ledger['Amount'][ledger['From'] == account].sum())
+
+    def test_balance_on_each_day(self):
+        ledger = self.make_ledger(200)
+        history = BalanceHistory(self.ACCOUNTS, ledger)
+        for date in ['2019-12-31', '2020-01-01', '2020-01-15', '2020-02-29', '2021-01-01']:
+            for account in self.ACCOUNTS:
+                self.assertEqual(self.expected(ledger, account, date), history.balance(account, date))
+        self.assertEqual(0, history.balance('Cafe', '2021-01-01'))
+
+    def test_add_merges_earlier_dates(self):
+        ledger = self.make_ledger(200)
+        history = BalanceHistory(self.ACCOUNTS, ledger.iloc[:150])
+        history.add(ledger.iloc[150:])
+        rebuilt = BalanceHistory(self.ACCOUNTS, ledger)
+        for account in self.ACCOUNTS:
+            for got, expected in zip(history.statement(account), rebuilt.statement(account)):
+                self.assertEqual(np.asarray(expected).tolist(), np.asarray(got).tolist())
+
+    def test_statement(self):
+        ledger = pd.DataFrame({
+            'Date': pd.to_datetime(['2020-01-03', '2020-01-01', '2020-01-02', '2020-01-02']),
+            'From': ['Checking', 'Employer', 'Checking', 'Checking'],
+            'To': ['Cafe', 'Checking', 'Savings', 'Checking'],
+            'Amount': [500, 10000, 2000, 100],
+        })
+        history = BalanceHistory(self.ACCOUNTS, ledger)
+        positions, totals, opening = history.statement('Checking', start='2020-01-02')
+        self.assertEqual([2, 3, 3, 0], positions.tolist())
+        self.assertEqual([8000, 7900, 8000, 7500], totals.tolist())
+        self.assertEqual(10000, opening)
+        positions, totals, opening = history.statement('Savings', end='2020-01-01')
+        self.assertEqual(([], 0), (positions.tolist(), opening))
+
+
+if __name__ == "__main__":
+    unittest.main()
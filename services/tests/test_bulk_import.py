@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from services import bulk_import
+from services.duplicate_index import DuplicateIndex
+from services.vocabulary import Vocabulary
+
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20200103120000<TRNAMT>-25.10<NAME>GROCERY STORE<MEMO>Food
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20200115<TRNAMT>1000.00<NAME>Employer</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>2020011<TRNAMT>-5<NAME>Cafe</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class TestBulkImport(unittest.TestCase):
+    ACCOUNTS = ['Checking', 'Savings']
+    VOCABULARY = Vocabulary(pd.DataFrame({'From': ['Employer'], 'To': ['Grocery Store'],
+                                          'Category1': ['Food']}))
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_ledger_shaped_csv(self):
+        path = self.write('statement.csv', '\n'.join([
+            'Date,From,To,Memo,Amount,Category1',
+            '1/3/2020,checking,Grocery Store,Food,25.10,food',
+            '13/3/2020,Checking,Grocery Store,Food,25.10,Food',
+            '1/4/2020,Checking,Grocery Store,Food,abc,Food',
+            '1/5/2020,Checking,Checking,Food,5,Food',
+            '1/6/2020,Employer,Grocery Store,Food,5,Food',
+            '1/7/2020,Checking,Grocery Store,,5,Food',
+            '1/8/2020,Checking,Grocery Store,Refund,-5,Food',
+            '1/9/2020,Checking transfer,Savings,Move,5,',
+        ]))
+        accepted, rejected = bulk_import.import_statement(path, self.ACCOUNTS, self.VOCABULARY, chunksize=3)
+        self.assertEqual(1, len(accepted))
+        self.assertEqual(['Checking', 'Grocery Store', 'Food', 2510],
+                         list(accepted[['From', 'To', 'Category1', 'Amount']].iloc[0]))
+        self.assertEqual(['invalid date', 'invalid amount', 'From and To are the same',
+                          'neither From nor To is an account', 'missing memo',
+                          'negative amount needs to be confirmed as a refund', 'From looks like an account'],
+                         list(rejected['Reason']))
+        self.assertEqual([2, 3, 4, 5, 6, 7, 8], list(rejected['Line']))
+
+    def test_bank_shaped_ofx(self):
+        path = self.write('statement.ofx', OFX)
+        accepted, rejected = bulk_import.import_statement(path, self.ACCOUNTS, self.VOCABULARY,
+                                                          account='Checking', chunksize=1)
+        self.assertEqual([('Checking', 'Grocery Store', 'Food', 2510), ('Employer', 'Checking', 'Employer', 100000)],
+                         [tuple(row) for row in accepted[['From', 'To', 'Memo', 'Amount']].values])
+        self.assertEqual(pd.Timestamp('2020-01-03'), accepted['Date'].iloc[0])
+        self.assertEqual(['invalid date'], list(rejected['Reason']))
+
+    def test_rejects_duplicates_of_ledger(self):
+        path = self.write('statement.ofx', OFX)
+        ledger = pd.DataFrame({'Date': ['01/15/2020'], 'From': ['Employer'], 'To': ['Checking'],
+                               'Memo': ['Employer'], 'Amount': [100000]})
+        accepted, rejected = bulk_import.import_statement(path, self.ACCOUNTS, self.VOCABULARY,
+                                                          account='Checking', duplicates=DuplicateIndex(ledger),
+                                                          ledger_ids=[7])
+        self.assertEqual(['Grocery Store'], list(accepted['To']))
+        self.assertEqual(['likely duplicate of transaction 7', 'invalid date'], list(rejected['Reason']))
+
+    def test_bank_shaped_csv_needs_account(self):
+        path = self.write('statement.csv', 'Date,Payee,Amount\n1/3/2020,Cafe,-5\n')
+        with self.assertRaises(ValueError):
+            bulk_import.import_statement(path, self.ACCOUNTS, self.VOCABULARY)
+
+
+if __name__ == "__main__":
+    unittest.main()
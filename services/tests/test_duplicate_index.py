@@ -0,0 +1,45 @@
+import datetime
+import unittest
+import pandas as pd
+from services.duplicate_index import DuplicateIndex
+
+
+class TestDuplicateIndex(unittest.TestCase):
+    LEDGER = pd.DataFrame({
+        'Date': [datetime.date(2020, 1, 3), datetime.date(2020, 1, 3), datetime.date(2020, 1, 15)],
+        'From': ['Checking', 'Checking', 'Employer'],
+        'To': ['Grocery Store', 'Cafe', 'Checking'],
+        'Memo': ['Weekly groceries', 'Coffee', 'Pay'],
+        'Amount': [2510, 450, 100000],
+    })
+
+    def test_finds_same_key_and_similar_memo(self):
+        index = DuplicateIndex(self.LEDGER)
+        incoming = pd.DataFrame({
+            'Date': ['01/03/2020', '01/03/2020', '01/03/2020', '01/04/2020'],
+            'From': ['Checking', 'Checking', 'Checking', 'Checking'],
+            'To': ['Grocery Store', 'Grocery Store', 'Cafe', 'Cafe'],
+            'Memo': ['weekly grocery', 'Birthday cake', 'Coffee', 'Coffee'],
+            'Amount': [2510, 2510, 450, 450],
+        }, index=[5, 6, 7, 8])
+        self.assertEqual([0, -1, 1, -1], index.find(incoming).tolist())
+        self.assertEqual([5, 6, 7, 8], index.find(incoming).index.tolist())
+
+    def test_add_continues_positions(self):
+        index = DuplicateIndex(self.LEDGER.iloc[:1])
+        index.add(self.LEDGER.iloc[1:])
+        self.assertEqual(3, len(index))
+        self.assertEqual([2], index.find(self.LEDGER.iloc[2:]).tolist())
+
+    def test_rows_added_after_a_lookup(self):
+        index = DuplicateIndex(self.LEDGER.iloc[:1])
+        self.assertEqual([-1], index.find(self.LEDGER.iloc[1:2]).tolist())
+        index.add(self.LEDGER.iloc[1:])
+        self.assertEqual([1, 2], index.find(self.LEDGER.iloc[1:]).tolist())
+
+    def test_empty(self):
+        self.assertEqual([], DuplicateIndex().find(self.LEDGER.iloc[:0]).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
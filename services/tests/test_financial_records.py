@@ -0,0 +1,74 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import pandas as pd
+from services.financial_records import FinancialRecords
+from services.ledger_cache import LedgerCache
+from services.ledger_store import CsvLedgerStore
+
+
+class TestFinancialRecords(unittest.TestCase):
+    RECORDS = FinancialRecords.__new__(FinancialRecords)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        ledger = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        ledger.write(self.RECORDS._set_transaction_columns(pd.DataFrame({
+            'Date': ['01/02/2020', '01/03/2020', '01/04/2020'],
+            'From': ['Employer', 'Checking', 'Checking'],
+            'To': ['Checking', 'Grocery Store', 'Savings'],
+            'Memo': ['Pay', 'Food', 'Transfer'],
+            'Amount': [100000, 2510, 10000],
+            'Category1': ['Salary', 'Food', 'Transfer'],
+        })))
+        self.RECORDS._CACHE = LedgerCache(ledger, prepare=self.RECORDS._set_transaction_columns)
+        self.RECORDS._SEARCHED_COLUMNS = set()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_set_transaction_columns(self):
+        self.assertEqual(['ID', 'Date', 'From', 'To', 'Memo', 'Amount', 'Category1'],
+                         list(self.RECORDS._TRANSACTIONS.columns))
+        self.assertEqual(2510, self.RECORDS._TRANSACTIONS['Amount'].iloc[1])
+
+    def test_apply_transactions_since_high_water_mark(self):
+        snapshot = pd.DataFrame({'Account': ['Checking', 'Savings'], 'Starting Balance': [1000.0, 0.0]})
+        balances = self.RECORDS._apply_transactions_since(snapshot, 1)
+        balances = dict(zip(balances['Account'], balances['Starting Balance']))
+        self.assertEqual({'Checking': 874.9, 'Savings': 100.0}, balances)
+
+    def test_apply_transactions_since_current_snapshot(self):
+        snapshot = pd.DataFrame({'Account': ['Checking'], 'Starting Balance': [1.0]})
+        self.assertIs(snapshot, self.RECORDS._apply_transactions_since(snapshot, 3))
+
+    def test_flag_duplicates(self):
+        new = self.RECORDS._set_transaction_columns(pd.DataFrame({
+            'Date': ['01/03/2020', '01/03/2020'], 'From': ['Checking', 'Checking'],
+            'To': ['Grocery Store', 'Grocery Store'], 'Memo': ['food', 'Snacks'], 'Amount': [2510, 2510],
+            'Category1': ['Food', 'Food']}))
+        self.assertEqual([1, -1], self.RECORDS._flag_duplicates(new).tolist())
+
+    def test_find_transactions(self):
+        self.assertEqual([(1, 1)], self.RECORDS._find_transactions('Memo', 'Fod'))
+        self.assertEqual([(1, 1)], self.RECORDS._find_transactions('Memo', 'Fod'))
+        self.assertIn('Memo', self.RECORDS._CACHE._SEARCH_INDEXES)
+        self.assertEqual([(0, 0), (1, 2)], self.RECORDS._find_transactions('Amount', '1000.0'))
+        self.assertEqual([], self.RECORDS._find_transactions('To', 'xyz'))
+        self.assertEqual([(0, 0)], self.RECORDS._find_transactions('Amount', '1000.0', limit=1))
+
+    def test_prompt_does_not_load_pandas_or_ledger(self):
+        script = ("import sys; from services.financial_records import FinancialRecords; "
+                  "records = FinancialRecords(); records._ACTIONS = records._set_up_actions(); "
+                  "records._create_prompt(); print('pandas.core' in sys.modules, records._CACHE._TRANSACTIONS)")
+        package = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=self.directory,
+                                         env=dict(os.environ, PYTHONPATH=package), universal_newlines=True)
+        self.assertEqual('False None', output.strip())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import random
+import unittest
+import editdistance
+from services.fuzzy_index import BKTree, FuzzyIndex
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    WORDS = ['Groceries', 'Grocery Store', 'Gas', 'Rent', 'Restaurant', 'Rest', 'Salary', 'Checking']
+
+    def test_bk_tree_matches_full_scan(self):
+        rng = random.Random(0)
+        words = [''.join(rng.choice('abcde') for _ in range(rng.randint(1, 8))) for _ in range(300)]
+        tree = BKTree()
+        for word in words:
+            tree.add(word)
+        self.assertEqual(len(set(words)), len(tree))
+        for query in ['abc', 'e', 'deadbeef', '']:
+            for max_distance in range(4):
+                expected = sorted(set((editdistance.eval(query, word), word) for word in words
+                                      if editdistance.eval(query, word) <= max_distance))
+                self.assertEqual(expected, tree.search(query, max_distance))
+        loaded = BKTree.load(tree.dump())
+        self.assertEqual(len(tree), len(loaded))
+        self.assertEqual(tree.search('abc', 2), loaded.search('abc', 2))
+
+    def test_search_ranks_rows(self):
+        index = FuzzyIndex(['Rent', 'Restaurant', None, 'Rest'])
+        self.assertEqual([(0, 0), (1, 3)], index.search('Rent', 1))
+        self.assertEqual([(0, 2)], index.search('', 0))
+
+    def test_incremental_add(self):
+        index = FuzzyIndex(self.WORDS)
+        index.add(['Rent', 'Gas'])
+        self.assertEqual(len(self.WORDS) + 2, len(index))
+        self.assertEqual([(0, 3), (0, 8)], index.search('Rent', 0))
+        self.assertEqual([(0, 3)], index.search('Rent', 2, limit=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from services import headless
+from services.financial_records import FinancialRecords
+from services.ledger_store import CsvLedgerStore
+from services.staging import StagingJournal
+from services.timing import PhaseTimer
+from services.transactions import Transaction
+
+
+class TestHeadless(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        os.makedirs('balances')
+        os.makedirs('transactions')
+        pd.DataFrame({'Account': ['Checking', 'Savings'],
+                      'Starting Balance': [100.0, 50.0]}).to_csv('balances/initial_balances.csv', index=False)
+        with open('statement.csv', 'w') as f:
+            f.write('Date,From,To,Memo,Amount,Category1\n'
+                    '01/02/2020,Employer,Checking,Pay,1000,Salary\n'
+                    '01/03/2020,Checking,Grocery Store,Food,25.10,Food\n')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def test_operations(self):
+        timer = PhaseTimer()
+        accepted, rejected = headless.import_statement('statement.csv', timer=timer)
+        self.assertEqual((2, 0), (len(accepted), len(rejected)))
+        self.assertEqual(['load', 'import'], [name for name, _ in timer.PHASES])
+        self.assertEqual(2, len(CsvLedgerStore().read()))
+
+        balances = headless.balance()
+        self.assertEqual({'Checking': 1074.9, 'Savings': 50.0},
+                         dict(zip(balances['Account'], balances['Starting Balance'])))
+        balances = headless.recalculate()
+        self.assertEqual(1074.9, balances.set_index('Account')['Starting Balance']['Checking'])
+        balances = headless.balance(as_of='2020-01-02')
+        self.assertEqual(1100.0, balances.set_index('Account')['Starting Balance']['Checking'])
+        path = headless.statement('Checking', start='2020-01-03')
+        self.assertEqual(['Opening balance', 'Food'], list(pd.read_csv(path)['Memo']))
+        self.assertEqual([1100.0, 1074.9], list(pd.read_csv(path)['Balance']))
+
+        found = headless.search('memo', 'Fod')
+        self.assertEqual([1], list(found['Distance']))
+        self.assertEqual(['Grocery Store'], list(found['To']))
+        with self.assertRaises(headless.InputError):
+            headless.search('Payee', 'Fod')
+
+        balances = headless.delete(int(found['ID'].iloc[0]))
+        self.assertEqual(1100.0, balances.set_index('Account')['Starting Balance']['Checking'])
+        self.assertEqual([], list(headless.search('memo', 'Fod')['To']))
+        with self.assertRaises(headless.InputError):
+            headless.delete(1)
+
+        with self.assertRaises(headless.InputError):
+            headless.report(period='week')
+        with self.assertRaises(headless.InputError):
+            headless.import_statement('missing.csv')
+        paths = headless.report(workers=1)
+        self.assertEqual(2, len(paths))
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+    def test_recurring(self):
+        headless.import_statement('statement.csv')
+        headless.memorize(0, 'Pay', 'biweekly')
+        with self.assertRaises(headless.InputError):
+            headless.memorize(0, 'Pay', 'monthly')
+        added, rejected = headless.recurring(start='01/01/2020', end='01/31/2020')
+        self.assertEqual(['2020-01-16', '2020-01-30'], list(added['Date'].dt.strftime('%Y-%m-%d')))
+        self.assertEqual(0, len(rejected))
+        balances = headless.balance()
+        self.assertEqual(3074.9, balances.set_index('Account')['Starting Balance']['Checking'])
+        added, _ = headless.recurring(start='01/01/2020', end='02/13/2020', stage=True)
+        self.assertEqual(['2020-02-13'], list(added['Date'].dt.strftime('%Y-%m-%d')))
+        self.assertEqual(4, len(CsvLedgerStore().read()))
+        balances = headless.balance()
+        self.assertEqual(4074.9, balances.set_index('Account')['Starting Balance']['Checking'])
+        self.assertEqual(5, len(CsvLedgerStore().read()))
+
+    def test_edit_leaves_transactions_staged_meanwhile(self):
+        headless.import_statement('statement.csv')
+
+        def enter(transaction, stage=True):
+            # Another process stages a transaction while the replacement is being entered.
+            StagingJournal().stage([{'Date': '01/05/2020', 'From': 'Checking', 'To': 'Gym', 'Memo': 'Gym',
+                                     'Amount': '30'}])
+            transaction.INFORMATION = {'Date': '01/03/2020', 'From': 'Checking', 'To': 'Cafe', 'Memo': 'Coffee',
+                                       'Amount': '4.50', 'Category1': 'Food'}
+            return True
+
+        records = FinancialRecords()
+        with mock.patch('builtins.input', side_effect=['memo', 'Food', 'y']), \
+                mock.patch.object(Transaction, 'create_new_transaction', enter), mock.patch('builtins.print'):
+            records._search_for_transaction()
+        found = headless.search('memo', 'Coffee', limit=1)
+        self.assertEqual([1], list(found['ID']))
+        self.assertEqual([], list(headless.search('to', 'Gym')['ID']))
+        balances = headless.balance()
+        self.assertEqual(1065.5, balances.set_index('Account')['Starting Balance']['Checking'])
+        self.assertEqual([4], list(headless.search('to', 'Gym')['ID']))
+
+    def test_phase_timer(self):
+        timer = PhaseTimer()
+        with timer.phase('first'):
+            pass
+        with self.assertRaises(KeyError):
+            with timer.phase('second'):
+                raise KeyError
+        self.assertEqual(['first', 'second'], [name for name, _ in timer.PHASES])
+        self.assertEqual(sum(seconds for _, seconds in timer.PHASES), timer.total())
+        self.assertIn('total', timer.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from services import instrumentation
+from services.ledger_store import CsvLedgerStore
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'trace.jsonl')
+
+    def tearDown(self):
+        instrumentation.stop()
+        shutil.rmtree(self.directory)
+
+    def records(self):
+        instrumentation.stop()
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_disabled_spans_are_not_recorded(self):
+        with instrumentation.span('quiet', rows=1) as fields:
+            fields['bytes'] = 2
+        self.assertFalse(instrumentation.enabled())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_nested_spans_and_counts(self):
+        instrumentation.start(self.path, profile='tracemalloc')
+        with instrumentation.span('outer'):
+            with instrumentation.span('inner', rows=3) as fields:
+                fields['bytes_read'] = 10
+                data = list(range(100000))
+            with self.assertRaises(KeyError):
+                with instrumentation.span('failed'):
+                    raise KeyError
+        inner, failed, outer = self.records()
+        self.assertEqual(('inner', 'outer', 3, 10), (inner['span'], inner['parent'], inner['rows'],
+                                                     inner['bytes_read']))
+        self.assertEqual('KeyError', failed['error'])
+        self.assertIsNone(outer['parent'])
+        self.assertGreaterEqual(outer['peak_bytes'], inner['peak_bytes'])
+        self.assertGreater(inner['peak_bytes'], len(data))
+
+    def test_ledger_io_is_traced(self):
+        instrumentation.start(self.path)
+        ledger = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        ledger.write(pd.DataFrame({'Date': ['2020-01-02'], 'From': ['Employer'], 'To': ['Checking'],
+                                   'Amount': [100000]}))
+        self.assertEqual(1, len(ledger.read()))
+        write, read = self.records()
+        self.assertEqual(('ledger.write', 1), (write['span'], write['rows']))
+        self.assertEqual(('ledger.read', 1), (read['span'], read['rows']))
+        self.assertEqual(write['bytes_written'], read['bytes_read'])
+        self.assertGreater(read['bytes_read'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import pandas as pd
+from services import write_behind
+from services.fuzzy_index import BKTree
+from services.ledger_cache import LedgerCache
+from services.ledger_store import CsvLedgerStore
+
+
+class TestLedgerCache(unittest.TestCase):
+    TRANSACTIONS = pd.DataFrame({
+        'Date': ['2020-01-01', '2020-01-02'],
+        'From': ['Checking', 'Employer'],
+        'To': ['Grocery Store', 'Checking'],
+        'Memo': ['Food', 'Pay'],
+        'Amount': [25.1, 1000.0],
+    })
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ledger = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        self.ledger.write(self.TRANSACTIONS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reads_ledger_once(self):
+        cache = LedgerCache(self.ledger)
+        self.assertIs(cache.transactions(), cache.transactions())
+
+    def test_reloads_when_ledger_changes(self):
+        cache = LedgerCache(self.ledger)
+        first = cache.transactions()
+        time.sleep(0.01)
+        self.ledger.append(self.TRANSACTIONS.iloc[:1])
+        self.assertIsNot(first, cache.transactions())
+        self.assertEqual(3, len(cache.transactions()))
+
+    def test_append_updates_copy_and_indexes(self):
+        cache = LedgerCache(self.ledger)
+        index = cache.search_index('Memo')
+        cache.append(self.TRANSACTIONS.iloc[:1])
+        transactions = cache.transactions()
+        self.assertEqual(3, len(transactions))
+        self.assertIs(transactions, cache.transactions())
+        self.assertIs(index, cache.search_index('Memo'))
+        self.assertEqual([(0, 0), (0, 2)], index.search('Food', 0))
+        self.assertEqual(2, cache.vocabulary().count('To', 'Grocery Store'))
+
+    def test_search_trees_are_saved(self):
+        path = os.path.join(self.directory, 'search_index')
+        LedgerCache(self.ledger, search_index_path=path).search_index('Memo')
+        self.ledger.append(self.TRANSACTIONS.iloc[:1].assign(Memo='Snacks'))
+        add = BKTree.add
+        added = list()
+
+        def recording(tree, value):
+            added.append(value)
+            return add(tree, value)
+
+        with mock.patch.object(BKTree, 'add', recording):
+            index = LedgerCache(self.ledger, search_index_path=path).search_index('Memo')
+        self.assertEqual(['Snacks'], added)
+        self.assertEqual([(0, 0)], index.search('Food', 1))
+        self.assertEqual([(1, 2)], index.search('Snack', 1))
+        write_behind.flush()
+
+    def test_void_edits_and_deletes_by_appending(self):
+        cache = LedgerCache(self.ledger)
+        cache.duplicate_index()
+        new = cache.append(self.TRANSACTIONS.iloc[:1])
+        self.assertEqual([2], list(new['ID']))
+        rows = cache.void(0, self.TRANSACTIONS.iloc[1:].assign(Memo='Bonus'))
+        self.assertEqual([0, 0], list(rows['ID']))
+        self.assertEqual([True, False], list(rows['Void'].eq(True)))
+        cache.void(2)
+        for cache in [cache, LedgerCache(self.ledger)]:
+            transactions = cache.transactions()
+            self.assertEqual([1, 0], list(transactions['ID']))
+            self.assertEqual(['Pay', 'Bonus'], list(transactions['Memo']))
+            self.assertEqual(4, cache.transaction_index().position(0))
+            self.assertNotIn(2, cache.transaction_index())
+            self.assertEqual(6, cache.rows())
+            self.assertEqual([3, 4, 5], list(cache.rows_since(3).index))
+            self.assertEqual([-1], cache.duplicate_index().find(self.TRANSACTIONS.iloc[:1]).tolist())
+        self.assertEqual(6, len(self.ledger.read()))
+        with self.assertRaises(KeyError):
+            cache.void(2)
+
+    def test_deleting_every_transaction(self):
+        cache = LedgerCache(self.ledger)
+        cache.void(0)
+        cache.void(1)
+        for cache in [cache, LedgerCache(self.ledger)]:
+            self.assertTrue(cache.transactions().empty)
+            self.assertEqual(4, cache.rows())
+            self.assertEqual(4, cache.next_id())
+        self.assertEqual([4], list(cache.append(self.TRANSACTIONS.iloc[:1])['ID']))
+
+    def test_columns_are_read_only(self):
+        column = LedgerCache(self.ledger).column('Amount')
+        with self.assertRaises(ValueError):
+            column[0] = 1.0
+
+
+if __name__ == "__main__":
+    unittest.main()
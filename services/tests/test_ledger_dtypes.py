@@ -0,0 +1,47 @@
+import unittest
+import pandas as pd
+from services import ledger_dtypes
+
+
+class TestLedgerDtypes(unittest.TestCase):
+    def transactions(self, names, memos=None):
+        return ledger_dtypes.compact(pd.DataFrame({
+            'Date': ['2020-01-0%d' % (i + 1) for i in range(len(names))],
+            'From': ['Checking'] * len(names),
+            'To': names,
+            'Memo': memos if memos is not None else names,
+            'Amount': [100] * len(names),
+            'Category1': ['Food'] * len(names),
+        }))
+
+    def test_compact_encodes_names_and_dates(self):
+        transactions = self.transactions(['Cafe', 'Grocery', 'Cafe'], memos=['a', 'b', 'c'])
+        self.assertEqual(ledger_dtypes.DATE_DTYPE, transactions['Date'].dtype)
+        for col in ['From', 'To', 'Category1']:
+            self.assertIsInstance(transactions[col].dtype, pd.CategoricalDtype)
+        # Memos that don't repeat aren't worth a dictionary.
+        self.assertNotIsInstance(transactions['Memo'].dtype, pd.CategoricalDtype)
+
+    def test_concat_keeps_existing_codes(self):
+        ledger = self.transactions(['Grocery', 'Cafe'])
+        codes = list(ledger['To'].cat.codes)
+        new = self.transactions(['Airline', 'Cafe']).assign(Category2=['Travel', None])
+        combined = ledger_dtypes.concat(ledger, new)
+        self.assertEqual(codes, list(combined['To'].cat.codes[:2]))
+        self.assertEqual(['Grocery', 'Cafe', 'Airline', 'Cafe'], list(combined['To']))
+        self.assertIsInstance(combined['Category2'].dtype, pd.CategoricalDtype)
+        self.assertEqual(['', '', 'Travel', ''], list(ledger_dtypes.text_values(combined['Category2'])))
+
+    def test_lexical_order_sorts_by_name(self):
+        ledger = self.transactions(['Grocery', 'Airline', 'Cafe'])
+        ordered = ledger.sort_values('To', key=ledger_dtypes.lexical_order)
+        self.assertEqual(['Airline', 'Cafe', 'Grocery'], list(ordered['To']))
+
+
+    def test_for_display(self):
+        shown = ledger_dtypes.for_display(self.transactions(['Cafe']).assign(Category2=[None]))
+        self.assertEqual(['2020-01-01', 'Checking', 'Cafe', 'Cafe', 1.0, 'Food', ''], list(shown.iloc[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from services.ledger_store import ColumnarLedgerStore, CsvLedgerStore, add_id_columns, migrate
+
+
+class TestLedgerStore(unittest.TestCase):
+    TRANSACTIONS = pd.DataFrame({
+        'Date': ['2020-02-01', '2020-01-15', '2020-02-03'],
+        'From': ['Checking', 'Employer', 'Checking'],
+        'To': ['Grocery Store', 'Checking', 'Savings'],
+        'Memo': ['Food', 'Pay', 'Transfer'],
+        'Amount': [2510, 100000, 10000],
+        'Category1': ['Food', 'Salary', None],
+    })
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assert_same_transactions(self, expected, actual):
+        self.assertEqual(list(expected.columns), list(actual.columns))
+        self.assertEqual(list(pd.to_datetime(expected['Date'])), list(pd.to_datetime(actual['Date'])))
+        for col in ['From', 'To', 'Memo', 'Amount', 'Category1']:
+            self.assertEqual(list(expected[col].astype(object).fillna('')),
+                             list(actual[col].astype(object).fillna('')))
+
+    def test_columnar_round_trip_keeps_append_order(self):
+        store = ColumnarLedgerStore(os.path.join(self.directory, 'columnar'))
+        self.assertTrue(store.read().empty)
+        store.append(self.TRANSACTIONS.iloc[:2])
+        store.append(self.TRANSACTIONS.iloc[2:])
+        self.assertEqual(['2020-01', '2020-02'], store.partitions())
+        self.assert_same_transactions(self.TRANSACTIONS, store.read())
+
+    def test_columnar_adds_columns(self):
+        store = ColumnarLedgerStore(os.path.join(self.directory, 'columnar'))
+        store.append(self.TRANSACTIONS[['Date', 'From', 'To', 'Memo', 'Amount']])
+        store.append(self.TRANSACTIONS.iloc[:1])
+        df = store.read()
+        self.assertEqual(4, len(df))
+        self.assertEqual(['', '', '', 'Food'], list(df['Category1'].astype(object).fillna('')))
+
+    def test_columnar_reads_subset_of_columns(self):
+        store = ColumnarLedgerStore(os.path.join(self.directory, 'columnar'))
+        store.append(self.TRANSACTIONS)
+        self.assertEqual(['From', 'Amount'], list(store.read(columns=['From', 'Amount']).columns))
+
+    def test_columnar_write_keeps_a_ledger_on_disk(self):
+        path = os.path.join(self.directory, 'columnar')
+        store = ColumnarLedgerStore(path)
+        store.write(self.TRANSACTIONS.iloc[:2])
+        store.write(self.TRANSACTIONS)
+        self.assertEqual(['columnar'], os.listdir(self.directory))
+        self.assert_same_transactions(self.TRANSACTIONS, store.read())
+        # A crash after the old ledger was moved aside, before the new one was moved in.
+        os.replace(path, path + '.old')
+        ColumnarLedgerStore(path + '.tmp').append(self.TRANSACTIONS.iloc[:1])
+        store = ColumnarLedgerStore(path)
+        self.assertTrue(store.exists())
+        self.assert_same_transactions(self.TRANSACTIONS, store.read())
+
+    def test_csv_append_grows_columns(self):
+        store = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        store.append(self.TRANSACTIONS[['Date', 'From', 'To', 'Memo', 'Amount']].iloc[:2])
+        store.append(self.TRANSACTIONS.iloc[2:])
+        self.assertEqual(list(self.TRANSACTIONS.columns), list(store.read().columns))
+        self.assertEqual(3, len(store.read()))
+
+    def test_csv_keeps_dollars_on_disk(self):
+        store = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        store.write(self.TRANSACTIONS)
+        self.assertEqual(['25.10', '1000.00', '100.00'], list(pd.read_csv(store._PATH, dtype=str)['Amount']))
+        self.assertEqual([2510, 100000, 10000], list(store.read()['Amount']))
+
+    def test_csv_drops_torn_row(self):
+        store = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        store.write(self.TRANSACTIONS.iloc[:2])
+        with open(store._PATH, 'a') as f:
+            f.write('2020-02-03,Checking,Sav')
+        size = os.path.getsize(store._PATH)
+        self.assertEqual(2, len(store.read()))
+        self.assertEqual(2, sum(len(chunk) for chunk in store.iter_chunks(1)))
+        self.assertEqual(size, os.path.getsize(store._PATH))
+        store.append(self.TRANSACTIONS.iloc[2:])
+        self.assertEqual([2510, 100000, 10000], list(store.read()['Amount']))
+        with open(store._PATH, 'a') as f:
+            f.write('2020-02-03,Checking,Savings,Transfer,100.00,')
+        self.assertEqual(3, len(store.read()))
+        store.append(self.TRANSACTIONS.iloc[2:])
+        self.assertEqual([2510, 100000, 10000, 10000, 10000], list(store.read()['Amount']))
+
+    def test_columnar_reads_dollar_amounts_as_cents(self):
+        store = ColumnarLedgerStore(os.path.join(self.directory, 'columnar'))
+        store.append(self.TRANSACTIONS)
+        partition = os.path.join(self.directory, 'columnar', '2020-01')
+        np.save(os.path.join(partition, 'Amount.npy'), np.array([1000.0]))
+        self.assertEqual([2510, 100000, 10000], list(store.read()['Amount']))
+
+    def test_add_id_columns(self):
+        store = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        store.write(self.TRANSACTIONS)
+        self.assertEqual(3, add_id_columns(store))
+        self.assertIsNone(add_id_columns(store))
+        self.assertEqual(['ID'] + list(self.TRANSACTIONS.columns) + ['Void'], store.columns())
+        with mock.patch.object(CsvLedgerStore, 'write') as write:
+            store.append(self.TRANSACTIONS.iloc[:1].assign(ID=3, Void=True))
+        write.assert_not_called()
+        self.assertEqual([0, 1, 2, 3], list(store.read()['ID']))
+
+    def test_migrate(self):
+        source = CsvLedgerStore(os.path.join(self.directory, 'transactions.csv'))
+        source.write(self.TRANSACTIONS)
+        destination = ColumnarLedgerStore(os.path.join(self.directory, 'columnar'))
+        self.assertEqual(3, migrate(source, destination, chunksize=2))
+        self.assert_same_transactions(source.read(), destination.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
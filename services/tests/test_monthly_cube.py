@@ -0,0 +1,51 @@
+import datetime
+import unittest
+import numpy as np
+import pandas as pd
+from services import monthly_cube
+from services.monthly_cube import MonthlyCube
+
+
+class TestMonthlyCube(unittest.TestCase):
+    TRANSACTIONS = pd.DataFrame({
+        'Date': [datetime.date(2020, 1, 3), datetime.date(2020, 1, 20), datetime.date(2020, 2, 1),
+                 datetime.date(2020, 4, 2)],
+        'From': ['Checking', 'Checking', 'Checking', 'Checking'],
+        'To': ['Grocery Store', 'Grocery Store', 'Cafe', 'Grocery Store'],
+        'Memo': ['Food', 'Food', 'Coffee', 'Food'],
+        'Amount': [2000, 3000, 450, 1000],
+        'Category1': ['Food', 'Food', 'Food', 'Food'],
+    })
+
+    def test_cells_sum_months(self):
+        cube = MonthlyCube(self.TRANSACTIONS)
+        self.assertEqual(3, len(cube))
+        cells = cube.cells('2020-01', '2020-03')
+        self.assertEqual(['Cafe', 'Grocery Store'], list(cells['To']))
+        self.assertEqual([450, 5000], list(cells['Amount']))
+
+    def test_add_merges_cells_and_new_levels(self):
+        cube = MonthlyCube(self.TRANSACTIONS.iloc[:1])
+        new = self.TRANSACTIONS.iloc[1:2].assign(Category2='Groceries')
+        cube.add(new)
+        cells = cube.cells('2020-01', '2020-01')
+        self.assertEqual([2000, 3000], list(cells['Amount']))
+        self.assertEqual(['', 'Groceries'], list(cells['Category2']))
+
+    def test_period_months(self):
+        self.assertEqual((np.datetime64('2020-02'), np.datetime64('2020-02'), '2020-02'),
+                         monthly_cube.period_months('month', '2020-02-14'))
+        self.assertEqual((np.datetime64('2020-04'), np.datetime64('2020-06'), '2020-Q2'),
+                         monthly_cube.period_months('quarter', '2020-05-14'))
+        self.assertEqual((np.datetime64('2020-01'), np.datetime64('2020-05'), '2020-YTD'),
+                         monthly_cube.period_months('ytd', '2020-05-14'))
+        with self.assertRaises(ValueError):
+            monthly_cube.period_months('week', '2020-05-14')
+
+    def test_previous_period(self):
+        self.assertEqual(pd.Timestamp('2020-02-01'), monthly_cube.previous_period('quarter', '2020-05-14'))
+        self.assertEqual(pd.Timestamp('2019-05-01'), monthly_cube.previous_period('ytd', '2020-05-14'))
+
+
+if __name__ == "__main__":
+    unittest.main()
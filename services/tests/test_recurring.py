@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from services import recurring
+from services.vocabulary import Vocabulary
+
+
+class TestRecurring(unittest.TestCase):
+    ACCOUNTS = ['Checking', 'Savings']
+    VOCABULARY = Vocabulary(pd.DataFrame({'From': ['Employer'], 'To': ['Landlord'], 'Category1': ['Housing']}))
+    TEMPLATES = pd.DataFrame({
+        'Name': ['Rent', 'Pay', 'Gym', 'Typo', 'Loop', 'Daily'],
+        'Schedule': ['monthly', 'biweekly', 'quarterly', 'weekly', 'weekly', 'daily'],
+        'Start': ['01/31/2020', '01/03/2020', '11/15/2019', '01/01/2020', '01/01/2020', '01/01/2020'],
+        'End': [None, '02/14/2020', None, None, None, None],
+        'From': ['checking', 'Employer', 'Checking', 'Checking', 'Checking', 'Checking'],
+        'To': ['Landlord', 'Checking', 'Gym', 'Landlord', 'Checking', 'Cafe'],
+        'Memo': ['Rent', 'Pay', 'Gym', 'Rent', 'Loop', 'Coffee'],
+        'Amount': ['1500', '2000.50', '90', 'abc', '5', '3'],
+        'Category1': ['Housing', None, None, None, None, None],
+    })
+
+    def test_validation_runs_per_template(self):
+        accepted, rejected = recurring.validate_templates(self.TEMPLATES, self.ACCOUNTS, self.VOCABULARY)
+        self.assertEqual(['Checking', 'Employer', 'Checking'], list(accepted['From']))
+        self.assertEqual([150000, 200050, 9000], list(accepted['Amount']))
+        self.assertEqual(['monthly', 'biweekly', 'quarterly'], list(accepted['Schedule']))
+        self.assertEqual(['Typo', 'Loop', 'Daily'], list(rejected['Name']))
+        self.assertEqual(['invalid amount', 'From and To are the same', 'unknown schedule'],
+                         list(rejected['Reason']))
+
+    def test_materialize(self):
+        accepted, _ = recurring.validate_templates(self.TEMPLATES, self.ACCOUNTS, self.VOCABULARY)
+        rows = recurring.materialize(accepted, '01/10/2020', '05/31/2020')
+        self.assertEqual(['2020-01-17', '2020-01-31', '2020-01-31', '2020-02-14', '2020-02-15', '2020-02-29',
+                          '2020-03-31', '2020-04-30', '2020-05-15', '2020-05-31'],
+                         list(rows['Date'].dt.strftime('%Y-%m-%d')))
+        self.assertEqual(['Pay', 'Rent', 'Pay', 'Pay', 'Gym', 'Rent', 'Rent', 'Rent', 'Gym', 'Rent'],
+                         list(rows['Memo']))
+        self.assertEqual(['Date', 'From', 'To', 'Memo', 'Amount', 'Category1'], list(rows.columns))
+        self.assertEqual(0, len(recurring.materialize(accepted, '06/01/2020', '06/14/2020')))
+
+    def test_templates_file(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'recurring.csv')
+        try:
+            recurring.add_template({'Name': 'Rent', 'Schedule': 'monthly', 'Start': '01/31/2020', 'From': 'Checking',
+                                    'To': 'Landlord', 'Memo': 'Rent', 'Amount': '1500.00', 'Category1': 'Housing'},
+                                   path=path)
+            with self.assertRaises(ValueError):
+                recurring.add_template({'Name': 'Rent', 'Schedule': 'monthly'}, path=path)
+            with self.assertRaises(ValueError):
+                recurring.add_template({'Name': 'Gym', 'Schedule': 'hourly'}, path=path)
+            templates = recurring.read_templates(path)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(recurring.TEMPLATE_COLUMNS + ['Category1'], list(templates.columns))
+        self.assertEqual(['Rent', 'monthly', '01/31/2020'], list(templates[['Name', 'Schedule', 'Start']].iloc[0]))
+        self.assertTrue(pd.isnull(templates['End'].iloc[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from services import report_cache
+from services.reporting_queue import ReportingQueue
+
+
+class TestReportCache(unittest.TestCase):
+    TRANSACTIONS = pd.DataFrame({
+        'To': ['Grocery Store', 'Cafe', 'Grocery Store', 'Landlord', 'Cafe'],
+        'Amount': [2000, 500, 3000, 90000, 250],
+        'Category1': ['Food', 'Food', 'Food', 'Rent', ''],
+        'Category2': ['Groceries', 'Dining', None, None, None],
+    })
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.makedirs(os.path.join(self.directory, 'reports'))
+        os.chdir(self.directory)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def queue(transactions):
+        return ReportingQueue(transactions, 'Expense', row_hashes=report_cache.row_hashes(transactions))
+
+    def test_row_hashes_follow_values_and_positions(self):
+        categorical = self.TRANSACTIONS.assign(Category2=self.TRANSACTIONS['Category2'].astype('category'))
+        self.assertEqual(list(report_cache.row_hashes(self.TRANSACTIONS)), list(report_cache.row_hashes(categorical)))
+        reversed_rows = self.TRANSACTIONS.iloc[::-1].reset_index(drop=True)
+        self.assertNotEqual(report_cache.fingerprint(report_cache.row_hashes(self.TRANSACTIONS)),
+                            report_cache.fingerprint(report_cache.row_hashes(reversed_rows)))
+
+    def test_repeated_report_is_served_from_cache(self):
+        with mock.patch.object(report_cache, 'write', wraps=report_cache.write) as write:
+            path = self.queue(self.TRANSACTIONS).run_report()
+        self.assertEqual(1, write.call_count)
+        self.assertNotIn('nodes', report_cache.read('Expense'))
+        with open(path, 'w') as f:
+            f.write('cached')
+        with mock.patch.object(ReportingQueue, '_roll_up') as roll_up:
+            queue = self.queue(self.TRANSACTIONS)
+            self.assertEqual(path, queue.run_report())
+        roll_up.assert_not_called()
+        self.assertEqual(ReportingQueue(self.TRANSACTIONS, 'Expense')._NODES, queue._NODES)
+        with open(path) as f:
+            self.assertEqual('cached', f.read())
+
+    def test_append_recomputes_changed_categories(self):
+        self.queue(self.TRANSACTIONS).run_report()
+        appended = pd.concat([self.TRANSACTIONS, pd.DataFrame({'To': ['Landlord'], 'Amount': [1000],
+                                                               'Category1': ['Rent'], 'Category2': ['Late Fee']})],
+                             ignore_index=True)
+        roll_up = ReportingQueue._roll_up
+        rolled_up = list()
+
+        def recording(queue, df=None):
+            rolled_up.append(list(df['To']))
+            return roll_up(queue, df)
+
+        with mock.patch.object(ReportingQueue, '_roll_up', recording):
+            nodes = self.queue(appended)._NODES
+        self.assertEqual([['Landlord', 'Cafe', 'Landlord']], rolled_up)
+        self.assertEqual(ReportingQueue(appended, 'Expense')._NODES, nodes)
+
+
+if __name__ == "__main__":
+    unittest.main()
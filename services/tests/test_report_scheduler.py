@@ -0,0 +1,63 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from services import report_scheduler
+from services.report_scheduler import ReportJob
+
+
+class TestReportScheduler(unittest.TestCase):
+    ACCOUNTS = ['Checking', 'Savings']
+    TRANSACTIONS = pd.DataFrame({
+        'Date': [datetime.date(2020, 1, 2), datetime.date(2020, 1, 3), datetime.date(2021, 1, 5),
+                 datetime.date(2021, 2, 1)],
+        'From': ['Employer', 'Checking', 'Savings', 'Checking'],
+        'To': ['Checking', 'Grocery Store', 'Cafe', 'Savings'],
+        'Memo': ['Pay', 'Food', 'Coffee', 'Transfer'],
+        'Amount': [100000, 2510, 450, 10000],
+        'Category1': ['Salary', 'Food', 'Food', 'Transfer'],
+    })
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        os.makedirs('reports')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def read(path):
+        with open(path) as f:
+            return f.read()
+
+    def test_report_mask(self):
+        self.assertEqual([True, False, False, False],
+                         list(report_scheduler.report_mask(self.TRANSACTIONS, 'Income', self.ACCOUNTS)))
+        self.assertEqual([False, True, True, False],
+                         list(report_scheduler.report_mask(self.TRANSACTIONS, 'Expense', self.ACCOUNTS)))
+
+    def test_yearly_jobs(self):
+        jobs = report_scheduler.yearly_jobs(self.TRANSACTIONS, self.ACCOUNTS)
+        self.assertEqual(2 + 2 * (2 + 2 * 2), len(jobs))
+        self.assertIn(ReportJob('Expense', '2021_Savings', pd.Timestamp('2021-01-01'), pd.Timestamp('2021-12-31'),
+                                'Savings'), jobs)
+
+    def test_pool_writes_same_reports_as_inline(self):
+        jobs = report_scheduler.yearly_jobs(self.TRANSACTIONS, self.ACCOUNTS)
+        inline = report_scheduler.run_reports(self.TRANSACTIONS, self.ACCOUNTS, jobs, workers=1, quiet=True)
+        contents = dict((path, self.read(path)) for path in inline)
+        shutil.rmtree('reports')
+        os.makedirs('reports')
+        pooled = report_scheduler.run_reports(self.TRANSACTIONS, self.ACCOUNTS, jobs, workers=2, quiet=True)
+        self.assertEqual(sorted(inline), sorted(pooled))
+        self.assertEqual(contents, dict((path, self.read(path)) for path in pooled))
+        self.assertIn('Food: $4.5', contents[[path for path in inline if 'Expense_2021_Savings' in path][0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from services.reporting_queue import ReportingQueue
+
+
+class TestReportingQueue(unittest.TestCase):
+    TRANSACTIONS = pd.DataFrame({
+        'To': ['Grocery Store', 'Cafe', 'Grocery Store', 'Landlord', 'Cafe'],
+        'Amount': [2000, 500, 3000, 90000, 250],
+        'Category1': ['Food', 'Food', 'Food', 'Rent', ''],
+        'Category2': ['Groceries', 'Dining', None, None, None],
+    })
+
+    def test_roll_up_totals(self):
+        nodes = ReportingQueue(self.TRANSACTIONS, 'Expense')._NODES
+        self.assertEqual(95750, nodes[()].amount)
+        self.assertEqual(['Food', 'Rent'], nodes[()].sub_categories)
+        self.assertEqual([('Cafe', 250)], nodes[()].to_amounts)
+        self.assertEqual(5500, nodes[('Food',)].amount)
+        self.assertEqual(['Groceries', 'Dining'], nodes[('Food',)].sub_categories)
+        self.assertEqual([('Grocery Store', 3000)], nodes[('Food',)].to_amounts)
+        self.assertEqual([('Cafe', 500)], nodes[('Food', 'Dining')].to_amounts)
+
+    def test_report_lines(self):
+        queue = ReportingQueue(self.TRANSACTIONS, 'Expense')
+        while queue._QUEUE:
+            queue._add_level_to_report(queue._QUEUE.popleft())
+        self.assertEqual({'Category': 'Expense: $957.5'}, queue.REPORT[0])
+        self.assertIn({'Category': 'Groceries', '%1': '36.36% of Food', '%2': '2.09% of Expense'}, queue.REPORT)
+        self.assertIn({'Category': 'Cafe $2.5', '%1': '0.26% of Expense'}, queue.REPORT)
+
+    def test_comparison(self):
+        directory = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.makedirs(os.path.join(directory, 'reports'))
+        os.chdir(directory)
+        try:
+            current = ReportingQueue(self.TRANSACTIONS, 'Expense', period='2020-02')
+            previous = ReportingQueue(self.TRANSACTIONS.iloc[:2].assign(Category1='Travel'), 'Expense',
+                                      period='2020-01')
+            comparison = current.run_comparison(previous)
+            self.assertEqual(1, len(os.listdir('reports')))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(directory)
+        self.assertEqual(['Expense', 'Expense | Food', 'Expense | Rent', 'Expense | Food | Groceries',
+                          'Expense | Food | Dining', 'Expense | Travel', 'Expense | Travel | Groceries',
+                          'Expense | Travel | Dining'], list(comparison['Category']))
+        self.assertEqual([932.5, 55.0, 900.0, 20.0, 5.0, -25.0], list(comparison['Change'].iloc[:6]))
+        self.assertEqual(3730.0, comparison['% Change'].iloc[0])
+        self.assertTrue(np.isnan(comparison['% Change'].iloc[1]))
+        self.assertEqual(-100.0, comparison['% Change'].iloc[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
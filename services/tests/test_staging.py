@@ -0,0 +1,48 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from services.staging import JOURNAL_FILE, StagingJournal
+
+
+class TestStagingJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = StagingJournal(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_stage_and_reconcile(self):
+        self.journal.stage([{'Memo': 'one'}, {'Memo': 'two'}])
+        self.journal.stage([{'Memo': 'three'}])
+        self.assertEqual(['one', 'two', 'three'], [t['Memo'] for t in self.journal.begin_reconciliation()])
+        self.journal.end_reconciliation()
+        self.assertEqual([], os.listdir(self.directory))
+        self.assertEqual([], self.journal.begin_reconciliation())
+
+    def test_staging_during_reconciliation_is_kept(self):
+        self.journal.stage([{'Memo': 'one'}])
+        self.journal.begin_reconciliation()
+        self.journal.stage([{'Memo': 'two'}])
+        self.journal.end_reconciliation()
+        self.assertEqual([{'Memo': 'two'}], self.journal.begin_reconciliation())
+
+    def test_reads_legacy_files(self):
+        with open(os.path.join(self.directory, '01-01-2020Checking_Store11.json'), 'w') as f:
+            json.dump({'Memo': 'legacy'}, f)
+        self.journal.stage([{'Memo': 'new'}])
+        self.assertEqual(['new', 'legacy'], [t['Memo'] for t in self.journal.begin_reconciliation()])
+        self.journal.end_reconciliation()
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_ignores_torn_last_line(self):
+        self.journal.stage([{'Memo': 'one'}])
+        with open(os.path.join(self.directory, JOURNAL_FILE), 'a') as f:
+            f.write('{"Memo": "tw')
+        self.assertEqual([{'Memo': 'one'}], self.journal.begin_reconciliation())
+
+
+if __name__ == "__main__":
+    unittest.main()
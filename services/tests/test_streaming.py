@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from services import streaming
+from services.financial_records import FinancialRecords
+from services.ledger_store import ColumnarLedgerStore, CsvLedgerStore, migrate
+
+
+class TestStreaming(unittest.TestCase):
+    NAMES = ['Checking', 'Savings', 'Employer', 'Cafe']
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        os.makedirs('balances')
+        pd.DataFrame({'Account': ['Checking', 'Savings'],
+                      'Starting Balance': [100.0, 50.0]}).to_csv('balances/initial_balances.csv', index=False)
+        FinancialRecords()
+        CsvLedgerStore().write(self.make_ledger(300))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def make_ledger(self, rows):
+        # Few dates and amounts, so many rows tie on the report order.
+        rng = np.random.RandomState(0)
+        categories = np.array(['Food', 'Rent', 'Salary', None], dtype=object)
+        days = rng.randint(0, 10, rows)
+        return pd.DataFrame({
+            'Date': (pd.Timestamp('2019-12-27') + pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d'),
+            'From': np.array(self.NAMES)[rng.randint(0, len(self.NAMES), rows)],
+            'To': np.array(self.NAMES)[rng.randint(0, len(self.NAMES), rows)],
+            'Memo': 'Memo',
+            'Amount': rng.choice([500, 1000, 2510], rows),
+            'Category1': categories[rng.randint(0, 3, rows)],
+            'Category2': categories[rng.randint(0, 4, rows)],
+        })
+
+    @staticmethod
+    def run_records(chunksize):
+        records = FinancialRecords(report_workers=1, chunksize=chunksize)
+        balances = records._recalculate_transactions(quiet=True)
+        reports = dict()
+        for path in records._run_yearly_reports(quiet=True):
+            with open(path) as f:
+                reports[path] = f.read()
+        return balances, reports
+
+    def assert_streams_like_memory(self):
+        balances, reports = self.run_records(None)
+        streamed_balances, streamed_reports = self.run_records(7)
+        pd.testing.assert_frame_equal(balances, streamed_balances)
+        self.assertEqual(reports, streamed_reports)
+
+    def test_csv_streams_like_memory(self):
+        self.assert_streams_like_memory()
+
+    def test_columnar_streams_like_memory(self):
+        migrate(CsvLedgerStore(), ColumnarLedgerStore())
+        os.remove('transactions/transactions.csv')
+        self.assert_streams_like_memory()
+
+    def void_transactions(self):
+        records = FinancialRecords()
+        replacement = records._set_transaction_columns(self.make_ledger(1).assign(Amount=[777]))
+        records._void_transaction(5, replacement)
+        records._void_transaction(5)
+        records._void_transaction(40, replacement)
+        records._void_transaction(41)
+
+    def test_csv_voided_rows_stream_like_memory(self):
+        self.void_transactions()
+        self.assert_streams_like_memory()
+
+    def test_columnar_voided_rows_stream_like_memory(self):
+        migrate(CsvLedgerStore(), ColumnarLedgerStore())
+        os.remove('transactions/transactions.csv')
+        self.void_transactions()
+        self.assert_streams_like_memory()
+
+    def test_stream_balances(self):
+        balances, rows = streaming.stream_balances(CsvLedgerStore(), {'Checking': 0}, chunksize=50)
+        ledger = CsvLedgerStore().read()
+        expected = ledger['Amount'][ledger['To'] == 'Checking'].sum() - \
+            ledger['Amount'][ledger['From'] == 'Checking'].sum()
+        self.assertEqual(({'Checking': expected}, 300), (balances, rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
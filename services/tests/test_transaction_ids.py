@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+import pandas as pd
+from services import transaction_ids
+from services.transaction_ids import TransactionIndex
+
+
+class TestTransactionIds(unittest.TestCase):
+    # Transaction 0 edited twice and transaction 1 deleted, in a ledger whose first rows have no IDs.
+    RECORDS = pd.DataFrame({
+        'ID': [np.nan, np.nan, 0, 0, 1, 0, 0],
+        'Amount': [100, 200, 100, 150, 200, 150, 175],
+        'Void': [np.nan, np.nan, True, np.nan, True, True, np.nan],
+    })
+
+    def test_missing_ids_are_positions(self):
+        self.assertEqual([0, 1, 0, 0, 1, 0, 0], transaction_ids.ids(self.RECORDS).tolist())
+
+    def test_prepare_splits_live_rows(self):
+        live, voided = transaction_ids.prepare(self.RECORDS)
+        self.assertEqual([6], list(live.index))
+        self.assertEqual(['ID', 'Amount'], list(live.columns))
+        self.assertEqual([0, 1, 2, 3, 4, 5], list(voided.index))
+        self.assertEqual({0: 5, 1: 4}, transaction_ids.last_voids(self.RECORDS))
+
+    def test_nothing_voided(self):
+        live, voided = transaction_ids.prepare(pd.DataFrame({'Amount': [1, 2]}))
+        self.assertEqual([0, 1], list(live['ID']))
+        self.assertTrue(voided.empty)
+
+    def test_transaction_index(self):
+        index = TransactionIndex(pd.DataFrame({'ID': [7, 3]}, index=[0, 1]))
+        self.assertEqual(1, index.position(3))
+        index.add(pd.DataFrame({'ID': [3]}, index=[2]))
+        index.remove(7)
+        self.assertEqual(2, index.position(3))
+        self.assertNotIn(7, index)
+        with self.assertRaises(KeyError):
+            index.position(8)
+
+    def test_duplicate_live_ids(self):
+        index = TransactionIndex(pd.DataFrame({'ID': [2, 3, 2]}, index=[0, 1, 2]))
+        self.assertEqual(1, index.position(3))
+        with self.assertRaises(ValueError):
+            index.position(2)
+
+
+if __name__ == "__main__":
+    unittest.main()
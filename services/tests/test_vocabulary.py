@@ -0,0 +1,38 @@
+import unittest
+import pandas as pd
+from services.vocabulary import Vocabulary
+
+
+class TestVocabulary(unittest.TestCase):
+    TRANSACTIONS = pd.DataFrame({
+        'Date': ['2020-01-01', '2020-01-02', '2020-01-03', '2020-01-04'],
+        'From': ['Checking', 'Checking', 'Savings', 'Employer'],
+        'To': ['Grocery Store', 'grocery store', 'Grocery Store', 'Checking'],
+        'Amount': [1.0, 2.0, 3.0, 4.0],
+        'Category1': ['Food', 'Food', None, 'Salary'],
+    })
+
+    def test_counts_and_membership(self):
+        vocabulary = Vocabulary(self.TRANSACTIONS)
+        self.assertFalse(vocabulary.empty())
+        self.assertTrue(vocabulary.contains('Category1', 'Food'))
+        self.assertFalse(vocabulary.contains('Category2', 'Food'))
+        self.assertFalse(vocabulary.contains('Amount', 1.0))
+        self.assertEqual(2, vocabulary.count('Category1', 'Food'))
+        self.assertEqual(3, vocabulary.account_frequency('Checking'))
+
+    def test_case_variants_ranked_by_frequency(self):
+        vocabulary = Vocabulary(self.TRANSACTIONS)
+        self.assertEqual(['Grocery Store', 'grocery store'], vocabulary.case_variants('To', 'GROCERY STORE'))
+        self.assertEqual([], vocabulary.case_variants('Memo', 'anything'))
+
+    def test_add_transaction(self):
+        vocabulary = Vocabulary(pd.DataFrame())
+        self.assertTrue(vocabulary.empty())
+        vocabulary.add_transaction({'Date': '1/1/2020', 'To': 'Landlord', 'Category1': 'Rent'})
+        self.assertTrue(vocabulary.contains('To', 'Landlord'))
+        self.assertEqual(['Rent'], vocabulary.case_variants('Category1', 'rent'))
+
+
+if __name__ == "__main__":
+    unittest.main()
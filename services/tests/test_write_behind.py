@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from services import write_behind
+from services.write_behind import WriteBehind
+
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.writer = WriteBehind()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def read(path):
+        with open(path) as f:
+            return f.read()
+
+    def test_relative_paths_are_resolved_when_written(self):
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            self.writer.write('balances.csv', lambda f: f.write('balances'))
+            os.chdir(cwd)
+            self.writer.flush(self.path('balances.csv'))
+        finally:
+            os.chdir(cwd)
+        self.assertEqual('balances', self.read(self.path('balances.csv')))
+
+    def test_repeated_writes_are_coalesced(self):
+        started, release = threading.Event(), threading.Event()
+        rendered = list()
+
+        def blocked(f):
+            started.set()
+            release.wait()
+            f.write('first')
+
+        def render(contents):
+            def write(f):
+                rendered.append(contents)
+                f.write(contents)
+            return write
+
+        self.writer.write(self.path('a.csv'), blocked)
+        started.wait()
+        self.writer.write(self.path('b.csv'), render('old'))
+        self.writer.write(self.path('b.csv'), render('new'))
+        release.set()
+        self.writer.flush()
+        self.assertEqual(['new'], rendered)
+        self.assertEqual(('first', 'new'), (self.read(self.path('a.csv')), self.read(self.path('b.csv'))))
+
+    def test_failed_write_keeps_old_file(self):
+        write_behind.write_atomically(self.path('a.csv'), lambda f: f.write('old'))
+
+        def failing(f):
+            f.write('partial')
+            raise IOError('disk full')
+
+        self.writer.write(self.path('a.csv'), failing)
+        with self.assertRaises(IOError):
+            self.writer.flush()
+        self.assertEqual('old', self.read(self.path('a.csv')))
+        self.writer.flush()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+from services import instrumentation
+from contextlib import contextmanager
+from timeit import default_timer
+
+
+class PhaseTimer:
+    # Wall-clock time of each named phase of an operation, in the order the phases ran.  Each phase is also
+    #  a 'phase.<name>' span when a trace is running.
+    def __init__(self):
+        self.PHASES = list()
+
+    @contextmanager
+    def phase(self, name):
+        start = default_timer()
+        try:
+            with instrumentation.span('phase.%s' % name):
+                yield
+        finally:
+            self.PHASES.append((name, default_timer() - start))
+
+    def total(self):
+        return sum(seconds for _, seconds in self.PHASES)
+
+    def summary(self):
+        lines = ['%-12s %9.3f s' % (name, seconds) for name, seconds in self.PHASES]
+        lines.append('%-12s %9.3f s' % ('total', self.total()))
+        return '\n'.join(lines)
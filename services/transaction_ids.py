@@ -0,0 +1,117 @@
+from services.lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+ID = 'ID'
+VOID = 'Void'
+
+
+# Every ledger row carries the ID of the transaction it records, which is the ledger position the transaction
+#  was first appended at.  The ledger is never rewritten to change a transaction.  Deleting one appends a
+#  void row: a copy of its current row that cancels it.  Editing one appends a void row and then the new row
+#  under the same ID.  A row is live unless it is a void row or a later void row has the same ID, so any
+#  prefix of the ledger, and so the balances caught up to it, is consistent.
+
+
+def ids(records):
+    # IDs of `records`, indexed by ledger position.  Rows written before IDs were recorded have their
+    #  positions as IDs, which is what they would have been given.
+    positions = records.index.values.astype(np.int64)
+    if ID not in records.columns:
+        return positions
+    values = pd.to_numeric(records[ID]).values
+    # Missing IDs are NaN in a CSV and -1 in a columnar ledger.
+    missing = np.isnan(values) | (values < 0) if values.dtype.kind == 'f' else values < 0
+    return np.where(missing, positions, values).astype(np.int64)
+
+
+def voids(records):
+    if VOID not in records.columns:
+        return np.zeros(len(records), dtype=bool)
+    return records[VOID].eq(True).values
+
+
+def number(transactions, position, first_id):
+    # New transactions, indexed by the ledger positions from `position` they are being appended at, with IDs
+    #  counting from `first_id`.
+    positions = np.arange(position, position + len(transactions), dtype=np.int64)
+    transactions = transactions.set_axis(pd.Index(positions), axis=0)
+    new_ids = positions - position + first_id
+    if ID in transactions.columns:
+        transactions[ID] = new_ids
+    else:
+        transactions.insert(0, ID, new_ids)
+    return transactions
+
+
+def prepare(records):
+    # Fills in missing IDs and splits `records`, indexed by ledger position, into the live transactions and
+    #  the rest: void rows and the rows they cancel.  The live transactions are `records` itself when
+    #  nothing was ever voided.
+    records = records.assign(**{ID: ids(records)})
+    if ID != records.columns[0]:
+        records = records[[ID] + [col for col in records.columns if col != ID]]
+    void = voids(records)
+    if not void.any():
+        return records.drop(columns=[VOID], errors='ignore'), records.iloc[:0].drop(columns=[VOID], errors='ignore')
+    records[VOID] = void
+    live = live_mask(records, last_voids(records))
+    return records[live].drop(columns=[VOID]), records[~live]
+
+
+def last_voids(records):
+    # The ledger position of the last void row of each voided ID.
+    void = voids(records)
+    if not void.any():
+        return dict()
+    positions = pd.Series(records.index.values[void], index=ids(records)[void])
+    return positions.groupby(level=0).max().to_dict()
+
+
+def live_mask(records, last_voided):
+    # Rows of `records` that are live, given the last void row of each ID from `last_voids` of the whole
+    #  ledger.
+    live = ~voids(records)
+    if last_voided:
+        last = pd.Series(ids(records)).map(last_voided).values
+        live &= ~(records.index.values < last)
+    return live
+
+
+class TransactionIndex:
+    # Hash index from transaction ID to the ledger position of its live row.  It is built once from the
+    #  ledger with a vectorized hash table; edits and appends after that go into a dict over it, so keeping
+    #  it current costs O(1) per transaction.
+    def __init__(self, transactions):
+        self._BASE = pd.Index(ids(transactions))
+        self._POSITIONS = transactions.index.values
+        self._CHANGES = dict()
+
+    def __contains__(self, transaction_id):
+        try:
+            self.position(transaction_id)
+        except KeyError:
+            return False
+        return True
+
+    def position(self, transaction_id):
+        # Raises KeyError for an unknown or deleted transaction, and ValueError for one the ledger has more
+        #  than one live row for, which only a corrupted ledger has.
+        if transaction_id in self._CHANGES:
+            position = self._CHANGES[transaction_id]
+            if position is None:
+                raise KeyError(transaction_id)
+            return position
+        location = self._BASE.get_loc(transaction_id)
+        if not isinstance(location, int):
+            raise ValueError("Transaction %s has more than one live row in the ledger" % transaction_id)
+        return int(self._POSITIONS[location])
+
+    def add(self, transactions):
+        for transaction_id, position in zip(ids(transactions).tolist(), transactions.index.tolist()):
+            self._CHANGES[transaction_id] = position
+
+    def remove(self, transaction_id):
+        self._CHANGES[transaction_id] = None
@@ -1,8 +1,8 @@
 from datetime import datetime
+from services import instrumentation, ledger_store
+from services.ledger_cache import LedgerCache
+from services.staging import StagingJournal
 import editdistance
-import os
-import json
-import pandas as pd
 
 
 class Transaction:
@@ -22,11 +22,25 @@ class Transaction:
         'Category': 'Category'
     }
 
-    def __init__(self, accounts):
+    DATE_FORMATS = [
+        '%m/%d/%y',
+        '%m/%d/%Y'
+    ]
+
+    def __init__(self, accounts, ledger_cache=None, staging=None):
         self.INFORMATION = dict()
         self.ACCOUNTS = self._check_accounts(accounts)
-        self.OTHER_TRANSACTIONS = pd.read_csv('./transactions/transactions.csv') if os.path.exists(
-            './transactions/transactions.csv') else pd.DataFrame()
+        if ledger_cache is None:
+            ledger_cache = LedgerCache(ledger_store.open_ledger())
+        self._LEDGER_CACHE = ledger_cache
+        self.STAGING = staging if staging is not None else StagingJournal()
+        self._SIMILAR_ACCOUNTS = dict()
+        self._STAGE = True
+
+    @property
+    def VOCABULARY(self):
+        # Only read once a step needs it, so the first question is asked without waiting for the ledger.
+        return self._LEDGER_CACHE.vocabulary()
 
     def _check_accounts(self, accounts):
         for account in accounts:
@@ -46,7 +60,9 @@ class Transaction:
             self._save
         ]
 
-    def create_new_transaction(self):
+    def create_new_transaction(self, stage=True):
+        # Without `stage`, the transaction is only collected in INFORMATION, for the caller to record.
+        self._STAGE = stage
         self._create_process()
         return self._run_process()
 
@@ -108,17 +124,11 @@ class Transaction:
     @staticmethod
     def _validate_date(date):
         date = date.replace('-', '/').replace('_', '/')
-        try:
-            datetime.strptime(date, '%m/%d/%y')
-            return True
-        except ValueError as e:
-            if "does not match format" in str(e):
-                pass
-        try:
-            datetime.strptime(date, '%m/%d/%Y')
-            return True
-        except ValueError as e:
-            if 'does not match format' in str(e):
+        for date_format in Transaction.DATE_FORMATS:
+            try:
+                datetime.strptime(date, date_format)
+                return True
+            except ValueError:
                 pass
         return False
 
@@ -149,16 +159,25 @@ class Transaction:
         if frm in self.ACCOUNTS or frm in self.KEYWORDS:
             return frm
 
-        distances = [editdistance.eval(frm, account) for account in self.ACCOUNTS]
-        for account, distance in zip(self.ACCOUNTS, distances):
-            if self._similar_to_an_account(frm, account, distance):
-                yn = self._get_yn_response("Did you mean: %s?" % account)
-                if yn in self.KEYWORDS:
-                    return self._back_to_repeat(yn)
-                if yn == 'y':
-                    return account
+        for account in self._similar_accounts(frm):
+            yn = self._get_yn_response("Did you mean: %s?" % account)
+            if yn in self.KEYWORDS:
+                return self._back_to_repeat(yn)
+            if yn == 'y':
+                return account
         return frm
 
+    def _similar_accounts(self, frm):
+        # Most used accounts are suggested first.
+        if frm not in self._SIMILAR_ACCOUNTS:
+            with instrumentation.span('transaction.similar_accounts', rows=len(self.ACCOUNTS)):
+                distances = [editdistance.eval(frm, account) for account in self.ACCOUNTS]
+                similar = [account for account, distance in zip(self.ACCOUNTS, distances)
+                           if self._similar_to_an_account(frm, account, distance)]
+                self._SIMILAR_ACCOUNTS[frm] = sorted(
+                    similar, key=lambda account: -self.VOCABULARY.account_frequency(account))
+        return self._SIMILAR_ACCOUNTS[frm]
+
     @staticmethod
     def _similar_to_an_account(frm, account, distance):
         if distance <= max(abs(len(frm) - len(account)) - 1.0, min(len(frm), len(account)) / 2):
@@ -319,17 +338,12 @@ class Transaction:
             prev = list()
         if nxt is None:
             nxt = list()
-        name_decorator = 1
-        name = self.INFORMATION[self.INFO_KEYS['Date']].replace('/', '-') + \
-            self.INFORMATION[self.INFO_KEYS['From']] + '_' + \
-            self.INFORMATION[self.INFO_KEYS['To']] + str(name_decorator)
-        while name + str(name_decorator) + '.json' in os.listdir('./transactions/unreconciled/'):
-            name_decorator += 1
-        name = name.replace('/', '_') + str(name_decorator) + '.json'
         if self._interpret_result(previous_steps=prev, current_step=self._save, next_steps=nxt,
                                   validation=self._validate_save, info='', key=''):
-            with open(os.path.join('./transactions/unreconciled/', name), 'w') as f:
-                json.dump(self.INFORMATION, f)
+            with instrumentation.span('transaction.save', rows=1):
+                if self._STAGE:
+                    self.STAGING.stage([self.INFORMATION])
+                self.VOCABULARY.add_transaction(self.INFORMATION)
             return True
         print("returning false from _save")
         return False
@@ -351,16 +365,16 @@ class Transaction:
         return yn
 
     def _infer_name(self, cat, col_name):
-        if self.OTHER_TRANSACTIONS.empty:
+        if self.VOCABULARY.empty():
             return cat
-        if cat.capitalize() in list(self.OTHER_TRANSACTIONS[col_name]) and \
-                cat != cat.capitalize() and cat not in self.ACCOUNTS:
-            yn = self._get_yn_response("Did you mean {}? ".format(cat.capitalize()))
+        variants = self.VOCABULARY.case_variants(col_name, cat)
+        if variants and variants[0] != cat and cat not in self.ACCOUNTS:
+            yn = self._get_yn_response("Did you mean {}? ".format(variants[0]))
             if yn == 'y':
-                cat = cat.capitalize()
+                cat = variants[0]
             if yn in self.KEYWORDS:
                 return yn
-        if cat not in list(self.OTHER_TRANSACTIONS[col_name]) and cat not in self.KEYWORDS and \
+        if not self.VOCABULARY.contains(col_name, cat) and cat not in self.KEYWORDS and \
                 (cat.lower() != 'done' or "category" not in col_name.lower()):
             yn = self._get_yn_response("Value of {} never seen before; really add? ".format(col_name))
             if yn in self.KEYWORDS:
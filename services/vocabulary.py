@@ -0,0 +1,53 @@
+from services.transaction_ids import ID
+from collections import Counter, defaultdict
+
+
+UNCOUNTED_COLUMNS = ['Date', 'Amount', ID]
+
+
+class Vocabulary:
+    # Distinct values of each ledger column with how often each was used, plus a lower-case map from which
+    #  differently-cased spellings of a value can be found without scanning the ledger.
+    def __init__(self, transactions=None):
+        self._COUNTS = defaultdict(Counter)
+        self._CASES = defaultdict(lambda: defaultdict(set))
+        if transactions is not None:
+            self.add_transactions(transactions)
+
+    def empty(self):
+        return not any(self._COUNTS.values())
+
+    def add_transactions(self, transactions):
+        for col in transactions.columns:
+            if col not in UNCOUNTED_COLUMNS:
+                counts = transactions[col].value_counts()
+                self._add_counts(col, counts[counts > 0].items())
+
+    def add_transaction(self, information):
+        for col, value in information.items():
+            if col not in UNCOUNTED_COLUMNS:
+                self._add_counts(col, [(value, 1)])
+
+    def _add_counts(self, col, counts):
+        for value, count in counts:
+            if value not in self._COUNTS[col] and isinstance(value, str):
+                self._CASES[col][value.lower()].add(value)
+            self._COUNTS[col][value] += count
+
+    def contains(self, col, value):
+        return col in self._COUNTS and value in self._COUNTS[col]
+
+    def count(self, col, value):
+        if col not in self._COUNTS:
+            return 0
+        return self._COUNTS[col][value]
+
+    def case_variants(self, col, value):
+        # Every known spelling of `value` ignoring case, most used first.
+        if col not in self._CASES:
+            return list()
+        variants = self._CASES[col].get(value.lower(), set())
+        return sorted(variants, key=lambda variant: (-self._COUNTS[col][variant], variant))
+
+    def account_frequency(self, account):
+        return self.count('From', account) + self.count('To', account)
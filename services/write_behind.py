@@ -0,0 +1,98 @@
+from collections import OrderedDict
+import atexit
+import os
+import threading
+
+
+# Small files that are rewritten whole, such as the balances, are handed to a background thread instead of
+#  being written while the user waits.  A file written again before the thread gets to it is only written
+#  once, with the latest contents.  Every write, in the background or not, goes to a temporary file that
+#  replaces the real one only once it is complete, so a crash leaves either the old file or the new one.
+
+
+def write_atomically(path, render):
+    # `render` writes the file's contents to the file object it is given.
+    temporary = path + '.tmp'
+    with open(temporary, 'w', newline='') as f:
+        render(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+class WriteBehind:
+    def __init__(self):
+        self._CONDITION = threading.Condition()
+        # Path to the `render` of its latest contents, oldest first.
+        self._PENDING = OrderedDict()
+        self._WRITING = None
+        self._ERROR = None
+        self._THREAD = None
+
+    def write(self, path, render):
+        # Paths are resolved now, so a relative path still means the same file if the working directory
+        #  changes before it is written.
+        path = os.path.abspath(path)
+        with self._CONDITION:
+            self._raise_error()
+            self._PENDING[path] = render
+            if self._THREAD is None:
+                self._THREAD = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._THREAD.start()
+                atexit.register(self.flush)
+            self._CONDITION.notify_all()
+
+    def flush(self, path=None):
+        # Waits until `path`, or every file, has been written.  Read a file through here first if it may
+        #  have been written in the background.
+        path = os.path.abspath(path) if path is not None else None
+        with self._CONDITION:
+            self._CONDITION.wait_for(lambda: self._ERROR is not None or not self._waiting_on(path))
+            self._raise_error()
+
+    def _waiting_on(self, path):
+        if path is None:
+            return bool(self._PENDING) or self._WRITING is not None
+        return path in self._PENDING or self._WRITING == path
+
+    def _raise_error(self):
+        # A failed background write is reported to the next caller, and not again.
+        error, self._ERROR = self._ERROR, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        while True:
+            with self._CONDITION:
+                self._CONDITION.wait_for(lambda: self._PENDING)
+                path, render = self._PENDING.popitem(last=False)
+                self._WRITING = path
+            try:
+                write_atomically(path, render)
+            except Exception as error:
+                with self._CONDITION:
+                    self._ERROR = error
+            finally:
+                with self._CONDITION:
+                    self._WRITING = None
+                    self._CONDITION.notify_all()
+
+
+_WRITER = WriteBehind()
+
+
+def _reset_after_fork():
+    # A forked child has no writer thread, and what is pending is the parent's to write.
+    global _WRITER
+    _WRITER = WriteBehind()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def write(path, render):
+    _WRITER.write(path, render)
+
+
+def flush(path=None):
+    _WRITER.flush(path)